@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,7 +9,115 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
     DATABASE_URL: str
 
+    # Async mode: routes run on an AsyncEngine instead of the threadpool.
+    # ASYNC_DATABASE_URL defaults to DATABASE_URL with an async driver.
+    DB_ASYNC_MODE: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Optional read replica for the read-only routes. A caller's reads stay
+    # on the primary for READ_YOUR_WRITES_SECONDS after they commit, and all
+    # reads do while the replica lags more than MAX_LAG (checked every
+    # LAG_CHECK_INTERVAL). ASYNC_READ_REPLICA_URL is derived like above.
+    READ_REPLICA_URL: Optional[str] = None
+    ASYNC_READ_REPLICA_URL: Optional[str] = None
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    REPLICA_MAX_LAG_SECONDS: float = 1.0
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = 1.0
+
+    # Authenticated principal cache, per process (0 TTL disables caching). The TTL
+    # bounds how long other workers may serve a user row changed elsewhere
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0
+
+    # Bounded bcrypt executor; requests beyond WORKERS + MAX_QUEUE get a 503
+    PASSWORD_HASH_POOL_ENABLED: bool = True
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_USE_PROCESSES: bool = False
+
+    # Multi-deck shoe; 0 decks keeps the infinite (with replacement) deck
+    SHOE_DECKS: int = 0
+    SHOE_PENETRATION: float = 0.75
+
+    # Serialized dealer-outcome tables for /advice; built at startup if missing
+    DEALER_TABLE_PATH: Optional[str] = None
+
+    # Wallet snapshot compactor (0 interval disables; run it on one instance).
+    # Ledger entries are folded once LAG seconds old so in-flight inserts
+    # with lower ids have committed.
+    WALLET_SNAPSHOT_INTERVAL_SECONDS: float = 30.0
+    WALLET_SNAPSHOT_LAG_SECONDS: float = 60.0
+    WALLET_SNAPSHOT_BATCH_SIZE: int = 10_000
+
+    # Finished-game archival (python -m app.services.game_archive): finished
+    # games older than AFTER_DAYS move to gzipped NDJSON under DIR and are
+    # deleted CHUNK_SIZE at a time. On Postgres blackjack_games is
+    # range-partitioned by id, PARTITION_SIZE ids per partition.
+    GAME_ARCHIVE_DIR: str = "archive"
+    GAME_ARCHIVE_AFTER_DAYS: int = 90
+    GAME_ARCHIVE_CHUNK_SIZE: int = 5_000
+    GAME_PARTITION_SIZE: int = 1_000_000
+
+    # Group commit for settled hands: one transaction per batch of up to
+    # BATCH_SIZE settlements, collected for at most MAX_DELAY_MS
+    SETTLEMENT_GROUP_COMMIT: bool = False
+    SETTLEMENT_BATCH_SIZE: int = 64
+    SETTLEMENT_MAX_DELAY_MS: float = 2.0
+
+    # Idempotency-Key replay for deposit/start/hit/stand. "memory" only sees
+    # retries that reach the same process; use "database" with several workers.
+    IDEMPOTENCY_BACKEND: str = "memory"
+    IDEMPOTENCY_TTL_SECONDS: float = 24 * 60 * 60
+    IDEMPOTENCY_MAX_ENTRIES: int = 10_000
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0  # how long a duplicate waits for the first
+
+    # Admission control per route group, checked before any DB work: a token
+    # bucket per user (per IP when anonymous) refilling RATE/s up to BURST,
+    # and at most CONCURRENCY requests in flight per process. 0 disables a
+    # check. Wallet + blackjack concurrency matches the 20 + 10 DB pool.
+    # BACKEND "sqlite" shares buckets between the workers on one host.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    RATE_LIMIT_SQLITE_PATH: str = "/tmp/casino-rate-limit.db"
+    RATE_LIMIT_AUTH_RATE: float = 1.0
+    RATE_LIMIT_AUTH_BURST: int = 10
+    RATE_LIMIT_AUTH_CONCURRENCY: int = 16
+    RATE_LIMIT_WALLET_RATE: float = 10.0
+    RATE_LIMIT_WALLET_BURST: int = 20
+    RATE_LIMIT_WALLET_CONCURRENCY: int = 10
+    RATE_LIMIT_BLACKJACK_RATE: float = 10.0
+    RATE_LIMIT_BLACKJACK_BURST: int = 30
+    RATE_LIMIT_BLACKJACK_CONCURRENCY: int = 20
+
+    # JSON logs written by a background thread from a bounded queue (records
+    # are dropped, not waited for, when it is full). Successful requests are
+    # access-logged at SAMPLE_RATE; errors and slow requests always are.
+    LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_SIZE: int = 10_000
+    LOG_ACCESS_SAMPLE_RATE: float = 0.1
+    LOG_SLOW_REQUEST_MS: float = 500.0
+
     model_config = SettingsConfigDict(env_file=".env")
 
+    @property
+    def async_database_url(self) -> str:
+        return self.ASYNC_DATABASE_URL or _async_url(self.DATABASE_URL)
+
+    @property
+    def async_read_replica_url(self) -> Optional[str]:
+        if self.ASYNC_READ_REPLICA_URL:
+            return self.ASYNC_READ_REPLICA_URL
+        return _async_url(self.READ_REPLICA_URL) if self.READ_REPLICA_URL else None
+
+
+def _async_url(url: str) -> str:
+    """Same database through the async driver."""
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
 
 settings = Settings()
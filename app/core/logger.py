@@ -1,11 +1,97 @@
+"""
+Logging pipeline. Loggers only put records on a bounded queue; a
+QueueListener thread formats them as JSON lines and does the file and
+console I/O (including rotation) off the request path. When the queue is
+full, records are dropped and counted rather than blocking the caller.
+
+Request context (request id, method, path) is bound once per request with
+`bind_context()` and copied onto every record logged inside it.
+"""
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import traceback
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Optional
+
+import orjson
+
+from .config import settings
+
+log_context: ContextVar[dict] = ContextVar("log_context", default={})
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, context and extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Runs in the caller's thread: binds the request context, renders the
+    message and traceback (the arguments may change after the call), and
+    enqueues without blocking. JSON encoding happens on the listener.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        for key, value in log_context.get().items():
+            record.__dict__.setdefault(key, value)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info))
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Blocking, so stop() still lands on a full queue
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[QueueListener] = None
+queue_handler: Optional[DroppingQueueHandler] = None
 
 
 def setup_logger():
+    global _listener, queue_handler
     logger = logging.getLogger("fastapi_app")
-    logger.setLevel(logging.INFO)
+    logger.setLevel(settings.LOG_LEVEL)
 
     # Prevent duplicate logs if setup_logger is called multiple times
     if not logger.handlers:
@@ -15,9 +101,7 @@ def setup_logger():
         log_dir.mkdir(parents=True, exist_ok=True)
         log_file = log_dir / "app.log"
 
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
+        formatter = JsonFormatter()
 
         # 1. File Handler (Rotates at 5MB, keeps 5 backup files)
         file_handler = RotatingFileHandler(
@@ -29,12 +113,45 @@ def setup_logger():
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
 
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        # Both run on the listener thread; the logger only enqueues
+        queue_handler = DroppingQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+        _listener = _Listener(
+            queue_handler.queue,
+            file_handler,
+            console_handler,
+            respect_handler_level=True,
+        )
+        _listener.start()
+        # At exit rather than at app shutdown, so nothing logged later is lost
+        atexit.register(stop_listener)
+        logger.addHandler(queue_handler)
 
     return logger
 
 
+def stop_listener() -> None:
+    """Flushes queued records and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def bind_context(**fields) -> object:
+    """Adds fields to every record in the current context; returns a reset token."""
+    return log_context.set({**log_context.get(), **fields})
+
+
+def reset_context(token) -> None:
+    log_context.reset(token)
+
+
+def sample_access_log() -> bool:
+    """Whether to log a successful request (LOG_ACCESS_SAMPLE_RATE)."""
+    rate = settings.LOG_ACCESS_SAMPLE_RATE
+    return rate >= 1 or random.random() < rate
+
+
 def get_logger(name: str) -> logging.Logger:
     """Return a child logger for the given module (e.g. __name__)."""
     return logging.getLogger(
@@ -0,0 +1,273 @@
+"""
+Minimal in-process Prometheus metrics (text exposition format 0.0.4).
+
+Kept dependency-free and cheap: an observation is a dict lookup, a bisect
+and a few additions under a lock. Exposed at GET /metrics.
+"""
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(n, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for n, v in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Gauge whose value is read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, fn: Callable[[], float]):
+        super().__init__(name, documentation)
+        self._fn = fn
+
+    def collect(self) -> List[str]:
+        return self.header() + [f"{self.name} {float(self._fn())}"]
+
+
+class CallbackCounter(Gauge):
+    """Counter maintained elsewhere (e.g. cache hits), read at scrape time."""
+
+    kind = "counter"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    def count(self, *labels: str) -> int:
+        """Observations so far for one label set."""
+        with self._lock:
+            row = self._values.get(labels)
+            return int(sum(row[:-1])) if row else 0
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        names = self.labelnames + ("le",)
+        for labels, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {cumulative}"
+                )
+            cumulative += row[len(self.buckets)]
+            lines.append(
+                f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {cumulative}"
+            )
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+            lines.append(f"{self.name}_sum{label_str} {row[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route template.",
+        ("method", "route", "status"),
+    )
+)
+DB_QUERIES_PER_REQUEST = registry.register(
+    Histogram(
+        "db_queries_per_request",
+        "SQL statements executed per HTTP request.",
+        ("route",),
+        buckets=COUNT_BUCKETS,
+    )
+)
+DB_TIME_PER_REQUEST = registry.register(
+    Histogram(
+        "db_time_per_request_seconds",
+        "Cumulative SQL execution time per HTTP request.",
+        ("route",),
+    )
+)
+DB_CHECKOUT_PER_REQUEST = registry.register(
+    Histogram(
+        "db_pool_checkout_per_request_seconds",
+        "Cumulative time an HTTP request waited for pooled connections.",
+        ("route",),
+    )
+)
+DB_QUERY_SECONDS = registry.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "SQL statement latency by kind; lock waits show up under "
+        "select_for_update and update.",
+        ("kind",),
+    )
+)
+DB_POOL_CHECKOUT_SECONDS = registry.register(
+    Histogram(
+        "db_pool_checkout_seconds",
+        "Time spent waiting for a pooled connection.",
+        ("engine",),
+    )
+)
+DB_READ_SESSIONS = registry.register(
+    Counter(
+        "db_read_sessions_total",
+        "Sessions opened for read-only routes, by the engine they used.",
+        ("target",),
+    )
+)
+SERVICE_METHOD_SECONDS = registry.register(
+    Histogram(
+        "service_method_duration_seconds",
+        "Service method latency.",
+        ("method",),
+    )
+)
+
+
+class RequestStats:
+    """Mutable per-request DB counters, shared with the threadpool via contextvars."""
+
+    __slots__ = ("queries", "db_time", "checkout_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.checkout_time = 0.0
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def observe_request(
+    method: str, route: str, status: str, elapsed: float, stats: RequestStats
+) -> None:
+    HTTP_REQUEST_SECONDS.observe(elapsed, method, route, status)
+    DB_QUERIES_PER_REQUEST.observe(stats.queries, route)
+    DB_TIME_PER_REQUEST.observe(stats.db_time, route)
+    DB_CHECKOUT_PER_REQUEST.observe(stats.checkout_time, route)
+
+
+def statement_kind(statement: str) -> str:
+    head = statement.lstrip()[:6].upper()
+    if head == "SELECT":
+        return "select_for_update" if " FOR UPDATE" in statement.upper() else "select"
+    if head in ("UPDATE", "INSERT", "DELETE"):
+        return head.lower()
+    return "other"
+
+
+def timed(method: str):
+    """Records the wrapped (sync or async) service method in SERVICE_METHOD_SECONDS."""
+
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    SERVICE_METHOD_SECONDS.observe(time.perf_counter() - start, method)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                SERVICE_METHOD_SECONDS.observe(time.perf_counter() - start, method)
+
+        return wrapper
+
+    return decorator
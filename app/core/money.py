@@ -0,0 +1,36 @@
+"""
+The API speaks float currency units; the wallet ledger and game bets store
+integer minor units so sums are exact. Amounts coming in are validated to
+whole minor units (`Amount`), so converting them never rounds.
+"""
+import math
+from decimal import ROUND_DOWN, ROUND_HALF_EVEN, Decimal
+from typing import Annotated
+
+from pydantic import AfterValidator
+
+MINOR_UNITS = 100  # cents per unit
+
+
+def to_minor(amount: float) -> int:
+    # Via str() so 0.1 + 0.2 style float noise doesn't move the rounding
+    return int((Decimal(str(amount)) * MINOR_UNITS).quantize(Decimal(1), ROUND_HALF_EVEN))
+
+
+def from_minor(amount: int) -> float:
+    return amount / MINOR_UNITS
+
+
+def scale_minor(amount: int, factor: float) -> int:
+    """amount * factor in minor units; a fraction of a cent is never paid out."""
+    return int((amount * Decimal(str(factor))).to_integral_value(ROUND_DOWN))
+
+
+def _whole_minor_units(amount: float) -> float:
+    if not math.isfinite(amount) or from_minor(to_minor(amount)) != amount:
+        raise ValueError("Amount must be a whole number of cents")
+    return amount
+
+
+# Request field for money: rejects fractions of a cent such as 0.005
+Amount = Annotated[float, AfterValidator(_whole_minor_units)]
@@ -0,0 +1,198 @@
+"""
+Token buckets for admission control. A bucket holds up to `burst` tokens and
+refills at `rate` per second; each request takes one. A bucket idle long
+enough to refill completely is the same as a missing one, so backends may
+drop idle buckets freely.
+"""
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable
+
+from . import metrics
+from .config import settings
+
+# A bucket idle this long has refilled for any rate >= burst / IDLE_SECONDS
+IDLE_SECONDS = 60.0
+
+BACKEND_ERRORS = metrics.registry.register(
+    metrics.Counter(
+        "rate_limit_backend_errors_total",
+        "Bucket lookups that failed and let the request through, by backend.",
+        ("backend",),
+    )
+)
+
+
+@dataclass(frozen=True)
+class Limit:
+    rate: float  # tokens per second (0 disables the bucket)
+    burst: int
+    concurrency: int  # requests in flight per process (0 disables)
+
+
+def _refill(tokens: float, updated: float, now: float, limit: Limit) -> float:
+    return min(limit.burst, tokens + (now - updated) * limit.rate)
+
+
+def _retry_after(tokens: float, limit: Limit) -> float:
+    return (1 - tokens) / limit.rate
+
+
+class InMemoryRateLimitBackend:
+    """
+    Per-process buckets in an LRU dict: O(1) per request, at most `max_keys`
+    buckets, least recently used evicted first. Only called from the event
+    loop, so it takes no lock.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, list]" = OrderedDict()
+        self.evictions = 0
+
+    def take_now(self, key: Hashable, limit: Limit) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(limit.burst), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = _refill(bucket[0], bucket[1], now, limit)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return _retry_after(bucket[0], limit)
+
+    async def take(self, key: Hashable, limit: Limit) -> float:
+        """0.0 if a token was taken, otherwise seconds until one is available."""
+        return self.take_now(key, limit)
+
+
+class SQLiteRateLimitBackend:
+    """
+    Shared buckets for several workers on one host, in a SQLite file outside
+    the application database. A local stand-in for a networked store such as
+    Redis: anything with the same `take` coroutine can replace it. Each take
+    is one short write transaction in a worker thread. If the file stays
+    locked past the busy timeout, the request is let through (fail open)
+    and counted in rate_limit_backend_errors_total.
+    """
+
+    def __init__(self, path: str, max_keys: int):
+        self.path = path
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._takes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Losing buckets in a crash only resets limits
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def take_now(self, key: Hashable, limit: Limit) -> float:
+        conn = self._connect()
+        now = time.time()  # wall clock, shared across processes
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (str(key),)
+            ).fetchone()
+            tokens = float(limit.burst) if row is None else _refill(*row, now, limit)
+            admitted = tokens >= 1
+            if admitted:
+                tokens -= 1
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) "
+                "VALUES (?, ?, ?)",
+                (str(key), tokens, now),
+            )
+            self._takes += 1
+            if self._takes % self.max_keys == 0:
+                conn.execute(
+                    "DELETE FROM buckets WHERE updated < ?", (now - IDLE_SECONDS,)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass  # keep the original error
+            raise
+        return 0.0 if admitted else _retry_after(tokens, limit)
+
+    async def take(self, key: Hashable, limit: Limit) -> float:
+        try:
+            return await asyncio.to_thread(self.take_now, key, limit)
+        except sqlite3.OperationalError:
+            # A limiter that can't answer must not fail the request itself
+            BACKEND_ERRORS.inc("sqlite")
+            return 0.0
+
+
+class ConcurrencyLimiter:
+    """In-flight request counts per route group; the DB pool is per process too."""
+
+    def __init__(self):
+        self.in_flight: Dict[str, int] = {}
+
+    def try_acquire(self, group: str, limit: Limit) -> bool:
+        count = self.in_flight.get(group, 0)
+        if limit.concurrency and count >= limit.concurrency:
+            return False
+        self.in_flight[group] = count + 1
+        return True
+
+    def release(self, group: str) -> None:
+        self.in_flight[group] -= 1
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+def build_backend(backend: str):
+    if backend == "memory":
+        return InMemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+    if backend == "sqlite":
+        return SQLiteRateLimitBackend(
+            settings.RATE_LIMIT_SQLITE_PATH, settings.RATE_LIMIT_MAX_KEYS
+        )
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {backend!r} (memory or sqlite)")
+
+
+ROUTE_GROUP_LIMITS: Dict[str, Limit] = {
+    "auth": Limit(
+        settings.RATE_LIMIT_AUTH_RATE,
+        settings.RATE_LIMIT_AUTH_BURST,
+        settings.RATE_LIMIT_AUTH_CONCURRENCY,
+    ),
+    "wallet": Limit(
+        settings.RATE_LIMIT_WALLET_RATE,
+        settings.RATE_LIMIT_WALLET_BURST,
+        settings.RATE_LIMIT_WALLET_CONCURRENCY,
+    ),
+    "blackjack": Limit(
+        settings.RATE_LIMIT_BLACKJACK_RATE,
+        settings.RATE_LIMIT_BLACKJACK_BURST,
+        settings.RATE_LIMIT_BLACKJACK_CONCURRENCY,
+    ),
+}
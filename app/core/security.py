@@ -1,6 +1,11 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Callable, Optional, Union
+from fastapi import HTTPException, status
 from jose import jwt
+from starlette.concurrency import run_in_threadpool
 from passlib.context import CryptContext
 from .config import settings
 
@@ -19,3 +24,107 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+class PasswordHashPool:
+    """
+    Dedicated executor for bcrypt so login/register spikes can't take over the
+    request threadpool. At most `max_workers` hashes run at once and at most
+    `max_queue` wait behind them; anything beyond that is shed with a 503.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue: int,
+        use_processes: bool = False,
+        enabled: bool = True,
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self.enabled = enabled
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        # Built lazily so importing this module never forks or spawns threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.use_processes:
+                        self._executor = ProcessPoolExecutor(self.max_workers)
+                    else:
+                        # bcrypt releases the GIL while hashing
+                        self._executor = ThreadPoolExecutor(
+                            self.max_workers, thread_name_prefix="pwhash"
+                        )
+        return self._executor
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication is busy, please retry",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, fn: Callable, *args):
+        self._acquire()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def hash(self, password: str) -> str:
+        if not self.enabled:
+            return get_password_hash(password)
+        return self._submit(get_password_hash, password).result()
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        if not self.enabled:
+            return verify_password(plain_password, hashed_password)
+        return self._submit(verify_password, plain_password, hashed_password).result()
+
+    async def hash_async(self, password: str) -> str:
+        if not self.enabled:
+            return await run_in_threadpool(get_password_hash, password)
+        return await asyncio.wrap_future(self._submit(get_password_hash, password))
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        if not self.enabled:
+            return await run_in_threadpool(
+                verify_password, plain_password, hashed_password
+            )
+        return await asyncio.wrap_future(
+            self._submit(verify_password, plain_password, hashed_password)
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHashPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    use_processes=settings.PASSWORD_HASH_USE_PROCESSES,
+    enabled=settings.PASSWORD_HASH_POOL_ENABLED,
+)
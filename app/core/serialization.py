@@ -0,0 +1,99 @@
+"""
+Response encoding. Routes pass `respond()` the plain dict they already built
+for their response_model; returning a Response makes FastAPI skip validating
+and re-serializing it (response_model still drives the OpenAPI schema). The
+body is encoded once, by orjson, or by msgpack for clients that send
+`Accept: application/msgpack`.
+"""
+from contextvars import ContextVar
+from typing import Any, Optional, Tuple
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import msgpack
+except ImportError:  # binary responses are optional
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = (b"application/msgpack", b"application/x-msgpack")
+
+# Set per request by ContentNegotiationMiddleware
+wants_msgpack: ContextVar[bool] = ContextVar("wants_msgpack", default=False)
+
+
+def _default(obj: Any) -> Any:
+    # Services hand back a few schema objects (WalletOut); everything else
+    # is already plain JSON types
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+class ORJSONResponse(JSONResponse):
+    """Default response class: same contract as JSONResponse, encoded by orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPES[0].decode()
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_default)
+
+
+def respond(
+    content: Any, status_code: int = 200, headers: Optional[dict] = None
+) -> Response:
+    """Encodes `content` as-is in the format the client negotiated."""
+    response_class = MsgPackResponse if wants_msgpack.get() else ORJSONResponse
+    response = response_class(content, status_code=status_code, headers=headers)
+    if msgpack is not None:
+        response.headers["vary"] = "Accept"
+    return response
+
+
+def renegotiate(body: bytes, content_type: str) -> Tuple[bytes, str]:
+    """
+    A body encoded earlier by respond(), re-encoded in the format the current
+    request negotiated. Anything that isn't JSON or msgpack is returned as-is.
+    """
+    media_type = content_type.split(";")[0].strip().encode()
+    if media_type in MSGPACK_MEDIA_TYPES and msgpack is not None:
+        if wants_msgpack.get():
+            return body, content_type
+        return dumps(msgpack.unpackb(body)), ORJSONResponse.media_type
+    if media_type == ORJSONResponse.media_type.encode() and wants_msgpack.get():
+        return msgpack.packb(orjson.loads(body)), MsgPackResponse.media_type
+    return body, content_type
+
+
+def accepts_msgpack(accept: bytes) -> bool:
+    return msgpack is not None and any(t in accept for t in MSGPACK_MEDIA_TYPES)
+
+
+class ContentNegotiationMiddleware:
+    """Pure ASGI so negotiation costs one header scan, not a middleware task."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = next((v for k, v in scope["headers"] if k == b"accept"), b"")
+        token = wants_msgpack.set(accepts_msgpack(accept))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            wants_msgpack.reset(token)
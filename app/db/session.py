@@ -1,17 +1,207 @@
-from sqlalchemy import create_engine
+import time
+from typing import Optional
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core import metrics
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    metrics_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.DB_POOL_CHECKOUT_SECONDS.observe(elapsed, self.metrics_label)
+            stats = metrics.current_request_stats.get()
+            if stats is not None:
+                stats.checkout_time += elapsed
+
+
+def instrument_engine(sync_engine) -> None:
+    """Per-statement timing into the global histogram and the request's stats."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        metrics.DB_QUERY_SECONDS.observe(elapsed, metrics.statement_kind(statement))
+        stats = metrics.current_request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+
 
 # In production, use pooled connections for high concurrency
 DATABASE_URL = settings.DATABASE_URL
 engine = create_engine(
     DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
     pool_pre_ping=True,  # Checks connection health before using
     pool_size=20,  # Number of permanent connections
     max_overflow=10,  # Extra connections during spikes
 )
+instrument_engine(engine)
+
+# Sessions are request-scoped, so objects don't need reloading after commit;
+# this saves a SELECT per action when the response is built from the game.
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
+
+class InstrumentedReplicaPool(InstrumentedQueuePool):
+    metrics_label = "replica"
+
+
+class ReplicaRouter:
+    """
+    Decides per request whether read-only routes may use the replica: not
+    while its measured lag exceeds `max_lag`, and not for `read_your_writes`
+    seconds after the caller's last commit on the primary, so a player
+    never reads a balance or game older than their own last action.
+    Recent writers are tracked per process.
+    """
+
+    def __init__(self, read_your_writes: float, max_lag: float):
+        self.max_lag = max_lag
+        self.lag = 0.0  # seconds, updated by ReplicaLagMonitor
+        self._recent_writers = TTLCache(maxsize=100_000, ttl=read_your_writes)
+
+    def mark_write(self, user_id: Optional[int]) -> None:
+        if user_id is not None:
+            self._recent_writers.set(user_id, True)
+
+    def use_replica(self, user_id: Optional[int]) -> bool:
+        if self.lag > self.max_lag:
+            return False
+        return user_id is None or self._recent_writers.get(user_id) is None
+
+
+# Lag as seen by the replica; 0 while it has replayed everything it received
+# (an idle primary makes pg_last_xact_replay_timestamp() look old otherwise)
+REPLICA_LAG_SQL = {
+    "postgresql": text(
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+        "THEN 0 ELSE COALESCE(EXTRACT(EPOCH FROM "
+        "now() - pg_last_xact_replay_timestamp()), 0) END"
+    ),
+}
+
+replica_router = ReplicaRouter(
+    read_your_writes=settings.READ_YOUR_WRITES_SECONDS,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+)
+
+# Replica engine is optional; without it read-only routes use the primary.
+# A second SQLite file (or the same one) works as a local stand-in.
+replica_engine = None
+ReplicaSessionLocal = None
+
+if settings.READ_REPLICA_URL:
+    replica_engine = create_engine(
+        settings.READ_REPLICA_URL,
+        poolclass=InstrumentedReplicaPool,
+        pool_pre_ping=True,
+        pool_size=20,
+        max_overflow=10,
+    )
+    instrument_engine(replica_engine)
+    ReplicaSessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=replica_engine
+    )
+
+    @event.listens_for(Session, "after_commit")
+    def _mark_write(session):
+        # Primary sessions carry the caller's id (set by deps); any commit on
+        # them starts the read-your-writes window. Covers AsyncSession too.
+        replica_router.mark_write(session.info.get("user_id"))
+
+
+def read_session_factory(user_id: Optional[int]) -> sessionmaker:
+    """Replica sessions when configured and fresh enough for this caller."""
+    if ReplicaSessionLocal is not None and replica_router.use_replica(user_id):
+        metrics.DB_READ_SESSIONS.inc("replica")
+        return ReplicaSessionLocal
+    metrics.DB_READ_SESSIONS.inc("primary")
+    return SessionLocal
+
+
+def measure_replica_lag() -> float:
+    """Seconds the replica is behind; raises if it can't be reached."""
+    sql = REPLICA_LAG_SQL.get(replica_engine.dialect.name)
+    if sql is None:  # stand-ins replicate nothing, so never lag
+        return 0.0
+    with replica_engine.connect() as conn:
+        return float(conn.execute(sql).scalar() or 0.0)
+
+
+# Async engine is only built in async mode so the async driver
+# (asyncpg / aiosqlite) stays an optional dependency.
+async_engine = None
+AsyncSessionLocal = None
+async_replica_engine = None
+AsyncReplicaSessionLocal = None
+
+if settings.DB_ASYNC_MODE:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+        metrics_label = "async"
+
+    async_engine = create_async_engine(
+        settings.async_database_url,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_pre_ping=True,
+        pool_size=20,
+        max_overflow=10,
+    )
+    instrument_engine(async_engine.sync_engine)
+    # expire_on_commit=False: attributes are read after commit to build the
+    # response, and lazy refreshes are not allowed on an AsyncSession.
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+    if settings.READ_REPLICA_URL:
+
+        class InstrumentedAsyncReplicaPool(
+            InstrumentedQueuePool, AsyncAdaptedQueuePool
+        ):
+            metrics_label = "async_replica"
+
+        async_replica_engine = create_async_engine(
+            settings.async_read_replica_url,
+            poolclass=InstrumentedAsyncReplicaPool,
+            pool_pre_ping=True,
+            pool_size=20,
+            max_overflow=10,
+        )
+        instrument_engine(async_replica_engine.sync_engine)
+        AsyncReplicaSessionLocal = async_sessionmaker(
+            bind=async_replica_engine, autoflush=False, expire_on_commit=False
+        )
+
+
+def async_read_session_factory(user_id: Optional[int]):
+    """Async counterpart of read_session_factory."""
+    if AsyncReplicaSessionLocal is not None and replica_router.use_replica(user_id):
+        metrics.DB_READ_SESSIONS.inc("replica")
+        return AsyncReplicaSessionLocal
+    metrics.DB_READ_SESSIONS.inc("primary")
+    return AsyncSessionLocal
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
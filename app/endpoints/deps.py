@@ -1,15 +1,29 @@
-from typing import Generator
-from fastapi import Depends, HTTPException, status
+from typing import TYPE_CHECKING, AsyncGenerator, Generator, Optional
+from urllib.parse import parse_qs
+from fastapi import Depends, HTTPException, Request, WebSocket, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
+from starlette.types import Scope
+from app.core.cache import principal_cache
+from app.db import session as db_session
 from app.db.session import SessionLocal
 from app.core.config import settings
 from app.models.user import User
+from app.schemas.user_schema import UserOut
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 # Standard FastAPI OAuth2 helper
 security = HTTPBearer()
 
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
 
 def get_db() -> Generator:
     """Provides a database session for the duration of a single request."""
@@ -20,17 +34,38 @@ def get_db() -> Generator:
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    auth: HTTPAuthorizationCredentials = Depends(security),
-) -> User:
-    """Decodes JWT and returns the User object from DB."""
-    token = auth.credentials
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+async def get_async_db() -> AsyncGenerator:
+    """Async counterpart of get_db, only available when DB_ASYNC_MODE is on."""
+    if db_session.AsyncSessionLocal is None:
+        raise RuntimeError("Async database session requested but DB_ASYNC_MODE is off")
+    async with db_session.AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_db(request: Request) -> Generator:
+    """
+    Session for read-only routes: on the read replica when one is configured
+    and the caller hasn't written within READ_YOUR_WRITES_SECONDS, otherwise
+    on the primary.
+    """
+    db = db_session.read_session_factory(scope_user_id(request.scope))()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator:
+    """Async counterpart of get_read_db."""
+    factory = db_session.async_read_session_factory(scope_user_id(request.scope))
+    if factory is None:
+        raise RuntimeError("Async database session requested but DB_ASYNC_MODE is off")
+    async with factory() as db:
+        yield db
+
+
+def decode_user_id(token: str) -> int:
+    """Validates the JWT and returns the user id stored in 'sub'."""
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
@@ -38,10 +73,140 @@ def get_current_user(
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
-    except JWTError:
+        return int(user_id)
+    except (JWTError, ValueError, TypeError):
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    auth: HTTPAuthorizationCredentials = Depends(security),
+) -> User:
+    """Decodes JWT and returns the User object from DB."""
+    user_id = decode_user_id(auth.credentials)
+    db.info["user_id"] = user_id
+
+    user = db.query(User).filter(User.id == user_id).first()
     if user is None:
         raise credentials_exception
     return user
+
+
+async def get_current_user_async(
+    db: "AsyncSession" = Depends(get_async_db),
+    auth: HTTPAuthorizationCredentials = Depends(security),
+) -> User:
+    """Async counterpart of get_current_user."""
+    user_id = decode_user_id(auth.credentials)
+    db.info["user_id"] = user_id
+
+    user = await db.get(User, user_id)
+    if user is None:
+        raise credentials_exception
+    return user
+
+
+def get_current_principal(
+    db: Session = Depends(get_db),
+    auth: HTTPAuthorizationCredentials = Depends(security),
+) -> UserOut:
+    """
+    Like get_current_user, but returns a cached UserOut so routes that only
+    need the caller's id skip the users-table query while the entry is fresh.
+    Tags the session with the caller so its commits start the replica
+    read-your-writes window.
+    """
+    user_id = decode_user_id(auth.credentials)
+    db.info["user_id"] = user_id
+    return load_principal(db, user_id)
+
+
+def get_read_principal(
+    db: Session = Depends(get_read_db),
+    auth: HTTPAuthorizationCredentials = Depends(security),
+) -> UserOut:
+    """get_current_principal for read-only routes, on the same read session."""
+    return load_principal(db, decode_user_id(auth.credentials))
+
+
+def load_principal(db: Session, user_id: int) -> UserOut:
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        generation = principal_cache.generation()
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            raise credentials_exception
+        principal = UserOut.model_validate(user)
+        principal_cache.set(user_id, principal, generation=generation)
+    return principal
+
+
+async def get_current_principal_async(
+    db: "AsyncSession" = Depends(get_async_db),
+    auth: HTTPAuthorizationCredentials = Depends(security),
+) -> UserOut:
+    """Async counterpart of get_current_principal."""
+    user_id = decode_user_id(auth.credentials)
+    db.info["user_id"] = user_id
+    return await load_principal_async(db, user_id)
+
+
+async def get_read_principal_async(
+    db: "AsyncSession" = Depends(get_async_read_db),
+    auth: HTTPAuthorizationCredentials = Depends(security),
+) -> UserOut:
+    """Async counterpart of get_read_principal."""
+    return await load_principal_async(db, decode_user_id(auth.credentials))
+
+
+async def load_principal_async(db: "AsyncSession", user_id: int) -> UserOut:
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        generation = principal_cache.generation()
+        user = await db.get(User, user_id)
+        if user is None:
+            raise credentials_exception
+        principal = UserOut.model_validate(user)
+        principal_cache.set(user_id, principal, generation=generation)
+    return principal
+
+
+def scope_user_id(scope: Scope) -> Optional[int]:
+    """
+    User id from the request's bearer token for ASGI middleware, or None if
+    it is missing or invalid (the route then answers 401). Decoded once per
+    request and kept in request.state. WebSocket handshakes may pass the
+    token as `?token=` instead, as in websocket_token.
+    """
+    state = scope.setdefault("state", {})
+    if "user_id" not in state:
+        token = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, credentials = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and credentials:
+                    token = credentials
+                break
+        if token is None and scope["type"] == "websocket":
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            token = query.get("token", [None])[0]
+        user_id = None
+        if token:
+            try:
+                user_id = decode_user_id(token)
+            except HTTPException:
+                pass
+        state["user_id"] = user_id
+    return state["user_id"]
+
+
+def websocket_token(websocket: WebSocket) -> Optional[str]:
+    """
+    Bearer token from the Authorization header, or the `token` query parameter
+    for clients (browsers) that can't set headers on a WebSocket handshake.
+    """
+    header = websocket.headers.get("authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token
+    return websocket.query_params.get("token")
@@ -0,0 +1,174 @@
+"""
+Idempotency-Key support for the money-moving POSTs (deposit, start, hit,
+stand). The first request with a key runs normally and its response is
+stored per user; retries with the same key get that response replayed
+without touching wallets or games, and a duplicate that arrives while the
+first is still running waits for it.
+"""
+import hashlib
+import re
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.serialization import ORJSONResponse, msgpack, renegotiate
+from app.endpoints import deps
+from app.services.idempotency import (
+    IdempotencyError,
+    StoredResponse,
+    idempotency_store,
+)
+
+IDEMPOTENT_PATHS = re.compile(
+    r"^/api/(wallet/deposit|blackjack/start|blackjack/\d+/(hit|stand))$"
+)
+MAX_KEY_LENGTH = 255
+# Not stored, so a retry runs again: auth failures, conflicts and throttling
+# say nothing about what the request itself would do
+UNSTORED_STATUSES = frozenset({401, 403, 408, 409, 429})
+
+IDEMPOTENT_REPLAYS = metrics.registry.register(
+    metrics.Counter(
+        "idempotent_replays_total",
+        "Retries answered from the Idempotency-Key store.",
+    )
+)
+
+
+async def _read_body(receive: Receive) -> Optional[bytes]:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+def _fingerprint(scope: Scope, body: bytes) -> str:
+    digest = hashlib.sha256(scope["method"].encode())
+    digest.update(b"\0" + scope["path"].encode() + b"\0")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+async def _send_error(status_code: int, detail: str, scope, receive, send) -> None:
+    await ORJSONResponse({"detail": detail}, status_code=status_code)(
+        scope, receive, send
+    )
+
+
+async def _replay(stored: StoredResponse, send: Send) -> None:
+    body, content_type = stored.body, stored.content_type
+    # Error bodies are always JSON; a success body follows this retry's Accept
+    if content_type and 200 <= stored.status_code < 300:
+        body, content_type = renegotiate(body, content_type)
+    headers = [(b"content-length", str(len(body)).encode())]
+    if content_type:
+        headers.append((b"content-type", content_type.encode()))
+    if msgpack is not None:
+        headers.append((b"vary", b"Accept"))
+    headers.append((b"idempotent-replayed", b"true"))
+    await send(
+        {
+            "type": "http.response.start",
+            "status": stored.status_code,
+            "headers": headers,
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI, so it can hold the request body and tee the response body."""
+
+    def __init__(self, app: ASGIApp, store=None):
+        self.app = app
+        self.store = store or idempotency_store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not IDEMPOTENT_PATHS.match(scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = next(
+            (v for k, v in scope["headers"] if k == b"idempotency-key"), None
+        )
+        # Without a key (or a valid token to scope it) the request runs as usual
+        user_id = deps.scope_user_id(scope) if key is not None else None
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+        key = key.decode("latin-1")
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_error(
+                400,
+                f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters",
+                scope,
+                receive,
+                send,
+            )
+            return
+
+        body = await _read_body(receive)
+        if body is None:
+            return
+        try:
+            stored = await self.store.begin(user_id, key, _fingerprint(scope, body))
+        except IdempotencyError as exc:
+            await _send_error(exc.status_code, exc.detail, scope, receive, send)
+            return
+        if stored is not None:
+            IDEMPOTENT_REPLAYS.inc()
+            await _replay(stored, send)
+            return
+
+        await self._run(scope, receive, send, body, user_id, key)
+
+    async def _run(self, scope, receive, send, body, user_id, key) -> None:
+        body_sent = False
+        status_code = None
+        content_type = None
+        chunks = []
+
+        async def receive_body() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def send_and_capture(message: Message) -> None:
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-type":
+                        content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        stored = False
+        try:
+            await self.app(scope, receive_body, send_and_capture)
+            if (
+                status_code is not None
+                and status_code < 500
+                and status_code not in UNSTORED_STATUSES
+            ):
+                await self.store.complete(
+                    user_id,
+                    key,
+                    StoredResponse(status_code, content_type, b"".join(chunks)),
+                )
+                stored = True
+        finally:
+            if not stored:
+                await self.store.abandon(user_id, key)
@@ -0,0 +1,159 @@
+"""
+Admission control in front of the routers: a token bucket per user (per IP
+when anonymous) and a cap on requests in flight, both per route group.
+Rejections are a 429 with Retry-After, sent before any route dependency
+opens a DB session.
+
+A WebSocket handshake is admitted the same way (a rejected one is closed
+with 1013), holding its concurrency slot until the socket is accepted.
+Each action on the socket then goes through the session's
+WebSocketLimiter, found in scope["state"][WS_LIMITER], which charges the
+same bucket and cap as an HTTP request would.
+"""
+from typing import Dict, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.rate_limit import (
+    ROUTE_GROUP_LIMITS,
+    ConcurrencyLimiter,
+    Limit,
+    build_backend,
+    retry_after_header,
+)
+from app.core.serialization import ORJSONResponse
+from app.endpoints import deps
+
+ROUTE_GROUP_PREFIXES = (
+    ("/api/auth/", "auth"),
+    ("/api/wallet/", "wallet"),
+    ("/api/blackjack/", "blackjack"),
+)
+
+WS_LIMITER = "rate_limiter"
+WS_1013_TRY_AGAIN_LATER = 1013
+
+RATE_LIMITED = metrics.registry.register(
+    metrics.Counter(
+        "rate_limited_total",
+        "Requests rejected with a 429, by route group and check.",
+        ("group", "reason"),
+    )
+)
+
+
+def route_group(path: str) -> Optional[str]:
+    for prefix, group in ROUTE_GROUP_PREFIXES:
+        if path.startswith(prefix):
+            return group
+    return None
+
+
+class WebSocketLimiter:
+    """Admits the actions of one WebSocket session (see RateLimitMiddleware)."""
+
+    def __init__(self, middleware: "RateLimitMiddleware", group: str, client: str):
+        self.middleware = middleware
+        self.group = group
+        self.client = client
+
+    async def acquire(self) -> float:
+        """
+        0.0 if the action may run (call release() after it), otherwise
+        seconds to wait before retrying.
+        """
+        rejection = await self.middleware.admit(self.group, self.client)
+        return 0.0 if rejection is None else rejection[1]
+
+    def release(self) -> None:
+        self.middleware.concurrency.release(self.group)
+
+
+class RateLimitMiddleware:
+    """Pure ASGI; unlisted paths (docs, /metrics) pass."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        backend=None,
+        limits: Optional[Dict[str, Limit]] = None,
+    ):
+        self.app = app
+        self.backend = backend or build_backend(settings.RATE_LIMIT_BACKEND)
+        self.limits = limits or ROUTE_GROUP_LIMITS
+        self.concurrency = ConcurrencyLimiter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        group = route_group(scope["path"])
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        user_id = deps.scope_user_id(scope)
+        if user_id is not None:
+            client = f"user:{user_id}"
+        else:
+            client = f"ip:{scope['client'][0] if scope.get('client') else '-'}"
+        rejection = await self.admit(group, client)
+        if rejection is not None:
+            await self._reject(rejection[1], scope, receive, send)
+            return
+
+        if scope["type"] == "websocket":
+            await self._handshake(group, client, scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.concurrency.release(group)
+
+    async def admit(self, group: str, client: str) -> Optional[Tuple[str, float]]:
+        """
+        None if admitted, with a concurrency slot taken for the caller to
+        release; otherwise (reason, seconds to wait), already counted.
+        """
+        limit = self.limits[group]
+        if limit.rate > 0:
+            wait = await self.backend.take(f"{group}:{client}", limit)
+            if wait:
+                RATE_LIMITED.inc(group, "rate")
+                return "rate", wait
+        if not self.concurrency.try_acquire(group, limit):
+            RATE_LIMITED.inc(group, "concurrency")
+            return "concurrency", 1.0
+        return None
+
+    async def _handshake(self, group, client, scope, receive, send) -> None:
+        # The slot covers authenticating the socket, not the idle session;
+        # its actions are admitted one by one through the WebSocketLimiter
+        held = True
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal held
+            if held and message["type"] in ("websocket.accept", "websocket.close"):
+                held = False
+                self.concurrency.release(group)
+            await send(message)
+
+        scope["state"][WS_LIMITER] = WebSocketLimiter(self, group, client)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if held:
+                self.concurrency.release(group)
+
+    async def _reject(self, wait, scope, receive, send) -> None:
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": WS_1013_TRY_AGAIN_LATER})
+            return
+        response = ORJSONResponse(
+            {"detail": "Too many requests, slow down"},
+            status_code=429,
+            headers={"Retry-After": retry_after_header(wait)},
+        )
+        await response(scope, receive, send)
@@ -1,37 +1,87 @@
+from typing import TYPE_CHECKING
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from app.core.serialization import respond
 from app.endpoints import deps
 from app.schemas.user_schema import UserCreate, LoginRequest, AuthResponse, Token
-from app.services.auth_service import AuthService
+from app.services.auth_service import AsyncAuthService, AuthService
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# The sync-mode routes are still coroutines: they await the bcrypt pool, and
+# AuthService runs each DB step in the threadpool with its own session
 router = APIRouter()
+# Mounted ahead of `router` when DB_ASYNC_MODE is on; `router` stays the sync fallback
+async_router = APIRouter()
 
 
 @router.post("/register", response_model=AuthResponse)
-def register(payload: UserCreate, db: Session = Depends(deps.get_db)):
-    auth_service = AuthService(db)
-    token_data = auth_service.register_user(payload)
+async def register(payload: UserCreate):
+    auth_service = AuthService()
+    token_data = await auth_service.register_user(payload)
 
-    return {
-        "success": True,
-        "message": "User registered successfully with starter balance",
-        "data": {
-            "access_token": token_data.access_token,
-            "token_type": token_data.token_type,
-        },
-    }
+    return respond(
+        {
+            "success": True,
+            "message": "User registered successfully with starter balance",
+            "data": {
+                "access_token": token_data.access_token,
+                "token_type": token_data.token_type,
+            },
+        }
+    )
 
 
 @router.post("/login", response_model=AuthResponse)
-def login(payload: LoginRequest, db: Session = Depends(deps.get_db)):
-    auth_service = AuthService(db)
-    token_data = auth_service.authenticate(payload.username, payload.password)
-
-    return {
-        "success": True,
-        "message": "Login successful",
-        "data": {
-            "access_token": token_data.access_token,
-            "token_type": token_data.token_type,
-        },
-    }
+async def login(payload: LoginRequest):
+    auth_service = AuthService()
+    token_data = await auth_service.authenticate(payload.username, payload.password)
+
+    return respond(
+        {
+            "success": True,
+            "message": "Login successful",
+            "data": {
+                "access_token": token_data.access_token,
+                "token_type": token_data.token_type,
+            },
+        }
+    )
+
+
+@async_router.post("/register", response_model=AuthResponse)
+async def register_async(
+    payload: UserCreate, db: "AsyncSession" = Depends(deps.get_async_db)
+):
+    auth_service = AsyncAuthService(db)
+    token_data = await auth_service.register_user(payload)
+
+    return respond(
+        {
+            "success": True,
+            "message": "User registered successfully with starter balance",
+            "data": {
+                "access_token": token_data.access_token,
+                "token_type": token_data.token_type,
+            },
+        }
+    )
+
+
+@async_router.post("/login", response_model=AuthResponse)
+async def login_async(
+    payload: LoginRequest, db: "AsyncSession" = Depends(deps.get_async_db)
+):
+    auth_service = AsyncAuthService(db)
+    token_data = await auth_service.authenticate(payload.username, payload.password)
+
+    return respond(
+        {
+            "success": True,
+            "message": "Login successful",
+            "data": {
+                "access_token": token_data.access_token,
+                "token_type": token_data.token_type,
+            },
+        }
+    )
@@ -1,70 +1,544 @@
-from fastapi import APIRouter, Depends
+import json
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional, get_args
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core import metrics, serialization
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.serialization import respond
+from app.db import session as db_session
 from app.endpoints import deps
-from app.schemas.blackjack_schema import GameStartRequest, GameResponse
-from app.services.blackjack_service import BlackjackService
-from app.models.user import User
+from app.endpoints.rate_limit import WS_LIMITER, WebSocketLimiter
+from app.schemas.blackjack_schema import (
+    AdviceResponse,
+    GameHistoryResponse,
+    GameResponse,
+    GameStartRequest,
+    PlayerStatsResponse,
+    WsAction,
+)
+from app.services import game_export
+from app.services.blackjack_service import AsyncBlackjackService, BlackjackService
+from app.services.game_archive import read_archive
+from app.schemas.user_schema import UserOut
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
+# Mounted ahead of `router` when DB_ASYNC_MODE is on; `router` stays the sync fallback
+async_router = APIRouter()
 
 
 @router.post("/start", response_model=GameResponse)
 def start_game(
     payload: GameStartRequest,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: UserOut = Depends(deps.get_current_principal),
 ):
     service = BlackjackService(db)
     game = service.start_game(current_user.id, payload.bet_amount)
     data = service.get_game_state_formatted(game)
 
-    return {
-        "success": True,
-        "message": "Game started" if not game.is_over else f"Game ended: {game.status}",
-        "data": data,
-    }
+    return respond(
+        {
+            "success": True,
+            "message": "Game started" if not game.is_over else f"Game ended: {game.status}",
+            "data": data,
+        }
+    )
 
 
 @router.post("/{game_id}/hit", response_model=GameResponse)
 def hit(
     game_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: UserOut = Depends(deps.get_current_principal),
 ):
     service = BlackjackService(db)
     game = service.hit(current_user.id, game_id)
     data = service.get_game_state_formatted(game)
 
-    return {
-        "success": True,
-        "message": "Player draws a card" if not game.is_over else "Player busted",
-        "data": data,
-    }
+    return respond(
+        {
+            "success": True,
+            "message": "Player draws a card" if not game.is_over else "Player busted",
+            "data": data,
+        }
+    )
 
 
 @router.post("/{game_id}/stand", response_model=GameResponse)
 def stand(
     game_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: UserOut = Depends(deps.get_current_principal),
 ):
     service = BlackjackService(db)
     game = service.stand(current_user.id, game_id)
     data = service.get_game_state_formatted(game)
 
-    return {"success": True, "message": f"Game settled: {game.status}", "data": data}
+    return respond(
+        {"success": True, "message": f"Game settled: {game.status}", "data": data}
+    )
+
+
+@router.get("/history", response_model=GameHistoryResponse)
+def get_history(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[int] = Query(
+        None, description="next_cursor from the previous page"
+    ),
+    db: Session = Depends(deps.get_read_db),
+    current_user: UserOut = Depends(deps.get_read_principal),
+):
+    """Newest-first game history, cursor-paginated."""
+    service = BlackjackService(db)
+    data = service.get_history(current_user.id, limit, cursor)
+    return respond({"success": True, "data": data})
+
+
+def _export_archived(include_archived: bool, user_id: int):
+    if not include_archived:
+        return None
+    return read_archive(settings.GAME_ARCHIVE_DIR, user_id)
+
+
+def _export_response(stream, fmt: str, user_id: int) -> StreamingResponse:
+    _, media_type, _ = game_export.EXPORT_FORMATS[fmt]
+    filename = f"blackjack-history-{user_id}.{fmt}"
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/history/export", response_class=StreamingResponse)
+def export_history(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    include_archived: bool = Query(
+        False, description="also stream games moved to the cold archive"
+    ),
+    current_user: UserOut = Depends(deps.get_read_principal),
+):
+    """Every game the user has played, oldest first, as NDJSON or CSV."""
+    stream = game_export.stream_history(
+        current_user.id, fmt, _export_archived(include_archived, current_user.id)
+    )
+    return _export_response(stream, fmt, current_user.id)
+
+
+@router.get("/stats", response_model=PlayerStatsResponse)
+def get_stats(
+    db: Session = Depends(deps.get_read_db),
+    current_user: UserOut = Depends(deps.get_read_principal),
+):
+    """Lifetime totals, kept up to date as each hand settles."""
+    service = BlackjackService(db)
+    return respond({"success": True, "data": service.get_stats(current_user.id)})
+
+
+@router.get("/{game_id}/advice", response_model=AdviceResponse)
+def get_advice(
+    game_id: int,
+    db: Session = Depends(deps.get_read_db),
+    current_user: UserOut = Depends(deps.get_read_principal),
+):
+    """Exact expected value of hitting vs. standing on the current hand."""
+    service = BlackjackService(db)
+    data = service.get_advice(current_user.id, game_id)
+    return respond(
+        {
+            "success": True,
+            "message": f"Recommended: {data['recommendation']}",
+            "data": data,
+        }
+    )
 
 
 @router.get("/{game_id}", response_model=GameResponse)
 def get_game(
     game_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_read_db),
+    current_user: UserOut = Depends(deps.get_read_principal),
 ):
     service = BlackjackService(db)
     game = service.repo.get_by_id(game_id)
     if not game or game.user_id != current_user.id:
-        return {"success": False, "message": "Game not found", "data": None}
+        return respond({"success": False, "message": "Game not found", "data": None})
+
+    data = service.get_game_state_formatted(game)
+    return respond({"success": True, "data": data})
+
+
+@async_router.post("/start", response_model=GameResponse)
+async def start_game_async(
+    payload: GameStartRequest,
+    db: "AsyncSession" = Depends(deps.get_async_db),
+    current_user: UserOut = Depends(deps.get_current_principal_async),
+):
+    service = AsyncBlackjackService(db)
+    game = await service.start_game(current_user.id, payload.bet_amount)
+    data = service.get_game_state_formatted(game)
+
+    return respond(
+        {
+            "success": True,
+            "message": "Game started" if not game.is_over else f"Game ended: {game.status}",
+            "data": data,
+        }
+    )
+
+
+@async_router.post("/{game_id}/hit", response_model=GameResponse)
+async def hit_async(
+    game_id: int,
+    db: "AsyncSession" = Depends(deps.get_async_db),
+    current_user: UserOut = Depends(deps.get_current_principal_async),
+):
+    service = AsyncBlackjackService(db)
+    game = await service.hit(current_user.id, game_id)
+    data = service.get_game_state_formatted(game)
+
+    return respond(
+        {
+            "success": True,
+            "message": "Player draws a card" if not game.is_over else "Player busted",
+            "data": data,
+        }
+    )
+
+
+@async_router.post("/{game_id}/stand", response_model=GameResponse)
+async def stand_async(
+    game_id: int,
+    db: "AsyncSession" = Depends(deps.get_async_db),
+    current_user: UserOut = Depends(deps.get_current_principal_async),
+):
+    service = AsyncBlackjackService(db)
+    game = await service.stand(current_user.id, game_id)
+    data = service.get_game_state_formatted(game)
+
+    return respond(
+        {"success": True, "message": f"Game settled: {game.status}", "data": data}
+    )
+
+
+@async_router.get("/history", response_model=GameHistoryResponse)
+async def get_history_async(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[int] = Query(
+        None, description="next_cursor from the previous page"
+    ),
+    db: "AsyncSession" = Depends(deps.get_async_read_db),
+    current_user: UserOut = Depends(deps.get_read_principal_async),
+):
+    service = AsyncBlackjackService(db)
+    data = await service.get_history(current_user.id, limit, cursor)
+    return respond({"success": True, "data": data})
+
+
+@async_router.get("/history/export", response_class=StreamingResponse)
+async def export_history_async(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    include_archived: bool = Query(
+        False, description="also stream games moved to the cold archive"
+    ),
+    current_user: UserOut = Depends(deps.get_read_principal_async),
+):
+    stream = game_export.stream_history_async(
+        current_user.id, fmt, _export_archived(include_archived, current_user.id)
+    )
+    return _export_response(stream, fmt, current_user.id)
+
+
+@async_router.get("/stats", response_model=PlayerStatsResponse)
+async def get_stats_async(
+    db: "AsyncSession" = Depends(deps.get_async_read_db),
+    current_user: UserOut = Depends(deps.get_read_principal_async),
+):
+    service = AsyncBlackjackService(db)
+    data = await service.get_stats(current_user.id)
+    return respond({"success": True, "data": data})
+
+
+@async_router.get("/{game_id}/advice", response_model=AdviceResponse)
+async def get_advice_async(
+    game_id: int,
+    db: "AsyncSession" = Depends(deps.get_async_read_db),
+    current_user: UserOut = Depends(deps.get_read_principal_async),
+):
+    service = AsyncBlackjackService(db)
+    data = await service.get_advice(current_user.id, game_id)
+    return respond(
+        {
+            "success": True,
+            "message": f"Recommended: {data['recommendation']}",
+            "data": data,
+        }
+    )
+
+
+@async_router.get("/{game_id}", response_model=GameResponse)
+async def get_game_async(
+    game_id: int,
+    db: "AsyncSession" = Depends(deps.get_async_read_db),
+    current_user: UserOut = Depends(deps.get_read_principal_async),
+):
+    service = AsyncBlackjackService(db)
+    game = await service.repo.get_by_id(game_id)
+    if not game or game.user_id != current_user.id:
+        return respond({"success": False, "message": "Game not found", "data": None})
 
     data = service.get_game_state_formatted(game)
-    return {"success": True, "data": data}
+    return respond({"success": True, "data": data})
+
+
+# --- WebSocket sessions ------------------------------------------------------
+# One authenticated connection per client; each message is one action:
+#   {"op": "start", "bet_amount": 10, "id": 1}
+#   {"op": "hit" | "stand" | "get", "game_id": 42, "id": 2}
+# Replies are compact JSON frames echoing "id":
+#   {"id":1,"ok":true,"message":"Game started","data":{...GameData}}
+#   {"id":2,"ok":false,"status":400,"error":"Invalid game state"}
+#   {"id":3,"ok":false,"status":429,"error":"...","retry_after":0.4}
+# Every action runs in its own short DB session, so an idle socket holds no
+# pooled connection. With rate limiting on, each action takes a token from
+# the player's blackjack bucket and a blackjack concurrency slot, like an
+# HTTP request.
+
+WS_ROUTE = "/api/blackjack/ws"
+WS_OPS = get_args(WsAction.model_fields["op"].annotation)
+
+logger = get_logger(__name__)
+
+
+class _WsFatal(Exception):
+    """An action failed unexpectedly; `frame` is sent before closing with 1011."""
+
+    def __init__(self, frame: str):
+        super().__init__(frame)
+        self.frame = frame
+
+
+def _ws_message(op: str, game) -> Optional[str]:
+    if op == "start":
+        return "Game started" if not game.is_over else f"Game ended: {game.status}"
+    if op == "hit":
+        return "Player draws a card" if not game.is_over else "Player busted"
+    if op == "stand":
+        return f"Game settled: {game.status}"
+    return None
+
+
+def _ws_frame(payload: dict, request_id) -> str:
+    if request_id is not None:
+        payload = {"id": request_id, **payload}
+    return serialization.dumps(payload).decode()
+
+
+def _ws_errors(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, e['loc']))}: {e['msg']}" if e["loc"] else e["msg"]
+        for e in exc.errors(include_url=False, include_context=False)
+    )
+
+
+def _ws_action(user_id: int, msg: WsAction) -> dict:
+    """Runs one action against BlackjackService in a fresh session (threadpool)."""
+    with db_session.SessionLocal() as db:
+        db.info["user_id"] = user_id
+        service = BlackjackService(db)
+        if msg.op == "start":
+            game = service.start_game(user_id, msg.bet_amount)
+        elif msg.op == "hit":
+            game = service.hit(user_id, msg.game_id)
+        elif msg.op == "stand":
+            game = service.stand(user_id, msg.game_id)
+        else:
+            game = service.repo.get_by_id(msg.game_id)
+            if not game or game.user_id != user_id:
+                raise HTTPException(status_code=404, detail="Game not found")
+        return {
+            "message": _ws_message(msg.op, game),
+            "data": service.get_game_state_formatted(game),
+        }
+
+
+async def _ws_action_async(user_id: int, msg: WsAction) -> dict:
+    async with db_session.AsyncSessionLocal() as db:
+        db.info["user_id"] = user_id
+        service = AsyncBlackjackService(db)
+        if msg.op == "start":
+            game = await service.start_game(user_id, msg.bet_amount)
+        elif msg.op == "hit":
+            game = await service.hit(user_id, msg.game_id)
+        elif msg.op == "stand":
+            game = await service.stand(user_id, msg.game_id)
+        else:
+            game = await service.repo.get_by_id(msg.game_id)
+            if not game or game.user_id != user_id:
+                raise HTTPException(status_code=404, detail="Game not found")
+        return {
+            "message": _ws_message(msg.op, game),
+            "data": service.get_game_state_formatted(game),
+        }
+
+
+def _ws_authenticate(token: Optional[str]) -> int:
+    if not token:
+        raise deps.credentials_exception
+    user_id = deps.decode_user_id(token)
+    with db_session.SessionLocal() as db:
+        return deps.load_principal(db, user_id).id
+
+
+async def _ws_authenticate_async(token: Optional[str]) -> int:
+    if not token:
+        raise deps.credentials_exception
+    user_id = deps.decode_user_id(token)
+    async with db_session.AsyncSessionLocal() as db:
+        return (await deps.load_principal_async(db, user_id)).id
+
+
+async def _ws_reply(
+    text: str,
+    user_id: int,
+    action: Callable[..., Awaitable[dict]],
+    limiter: Optional[WebSocketLimiter] = None,
+) -> str:
+    request_id, op, status_code = None, "invalid", 200
+    stats = metrics.RequestStats()
+    token = metrics.current_request_stats.set(stats)
+    start = time.perf_counter()
+    try:
+        # Only a malformed frame is the client's fault (422); anything raised
+        # while running the action is a server error unless it's an HTTPException
+        try:
+            raw = json.loads(text)
+        except json.JSONDecodeError as exc:
+            status_code = 422
+            return _ws_frame({"ok": False, "status": 422, "error": str(exc)}, None)
+        if isinstance(raw, dict):
+            request_id = raw.get("id")
+            if raw.get("op") not in WS_OPS:
+                status_code = 400
+                error = f"op must be one of {WS_OPS}"
+                return _ws_frame(
+                    {"ok": False, "status": 400, "error": error}, request_id
+                )
+        try:
+            msg = WsAction.model_validate(raw)
+        except ValidationError as exc:
+            status_code = 422
+            return _ws_frame(
+                {"ok": False, "status": 422, "error": _ws_errors(exc)}, request_id
+            )
+        op = msg.op
+        wait = await limiter.acquire() if limiter is not None else 0.0
+        if wait:
+            status_code = 429
+            return _ws_frame(
+                {
+                    "ok": False,
+                    "status": 429,
+                    "error": "Too many requests, slow down",
+                    "retry_after": round(wait, 3),
+                },
+                request_id,
+            )
+        try:
+            result = await action(user_id, msg)
+        finally:
+            if limiter is not None:
+                limiter.release()
+        return _ws_frame({"ok": True, **result}, request_id)
+    except HTTPException as exc:
+        status_code = exc.status_code
+        return _ws_frame(
+            {"ok": False, "status": exc.status_code, "error": exc.detail}, request_id
+        )
+    except Exception as exc:
+        status_code = 500
+        logger.error(
+            "WebSocket action failed: %s | Error: %s",
+            op,
+            str(exc),
+            extra={"user_id": user_id, "path": f"{WS_ROUTE}:{op}", "ws_id": request_id},
+            exc_info=True,
+        )
+        raise _WsFatal(
+            _ws_frame(
+                {"ok": False, "status": 500, "error": "Internal server error"},
+                request_id,
+            )
+        ) from exc
+    finally:
+        metrics.current_request_stats.reset(token)
+        metrics.observe_request(
+            "WS",
+            f"{WS_ROUTE}:{op}",
+            str(status_code),
+            time.perf_counter() - start,
+            stats,
+        )
+
+
+async def _ws_session(
+    websocket: WebSocket,
+    user_id: int,
+    action: Callable[..., Awaitable[dict]],
+) -> None:
+    limiter = websocket.scope.get("state", {}).get(WS_LIMITER)
+    await websocket.accept()
+    try:
+        while True:
+            text = await websocket.receive_text()
+            reply = await _ws_reply(text, user_id, action, limiter)
+            await websocket.send_text(reply)
+    except WebSocketDisconnect:
+        pass
+    except _WsFatal as exc:
+        # The session's state is unknown after an unexpected error
+        await websocket.send_text(exc.frame)
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+
+
+@router.websocket("/ws")
+async def game_socket(websocket: WebSocket):
+    try:
+        user_id = await run_in_threadpool(
+            _ws_authenticate, deps.websocket_token(websocket)
+        )
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    async def action(user_id: int, msg: WsAction) -> dict:
+        return await run_in_threadpool(_ws_action, user_id, msg)
+
+    await _ws_session(websocket, user_id, action)
+
+
+@async_router.websocket("/ws")
+async def game_socket_async(websocket: WebSocket):
+    try:
+        user_id = await _ws_authenticate_async(deps.websocket_token(websocket))
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await _ws_session(websocket, user_id, _ws_action_async)
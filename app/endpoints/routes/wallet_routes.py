@@ -1,34 +1,70 @@
+from typing import TYPE_CHECKING
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
+from app.core.serialization import respond
 from app.endpoints import deps
 from app.schemas.wallet_schema import WalletResponse, WalletDeposit
-from app.services.wallet_service import WalletService
-from app.models.user import User
+from app.services.wallet_service import AsyncWalletService, WalletService
+from app.schemas.user_schema import UserOut
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
+# Mounted ahead of `router` when DB_ASYNC_MODE is on; `router` stays the sync fallback
+async_router = APIRouter()
 
 
 @router.get("/me", response_model=WalletResponse)
 def get_my_balance(
-    current_user: User = Depends(deps.get_current_user),
-    db: Session = Depends(deps.get_db),
+    current_user: UserOut = Depends(deps.get_read_principal),
+    db: Session = Depends(deps.get_read_db),
 ):
     service = WalletService(db)
     wallet = service.get_user_balance(current_user.id)
-    return {"success": True, "message": "Balance retrieved", "data": wallet}
+    return respond({"success": True, "message": "Balance retrieved", "data": wallet})
 
 
 @router.post("/deposit", response_model=WalletResponse)
 def deposit_funds(
     payload: WalletDeposit,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: UserOut = Depends(deps.get_current_principal),
     db: Session = Depends(deps.get_db),
 ):
     """Simple endpoint to add funds for testing/demo."""
     service = WalletService(db)
     wallet = service.deposit(current_user.id, payload.amount)
-    return {
-        "success": True,
-        "message": f"Successfully deposited {payload.amount}",
-        "data": wallet,
-    }
+    return respond(
+        {
+            "success": True,
+            "message": f"Successfully deposited {payload.amount}",
+            "data": wallet,
+        }
+    )
+
+
+@async_router.get("/me", response_model=WalletResponse)
+async def get_my_balance_async(
+    current_user: UserOut = Depends(deps.get_read_principal_async),
+    db: "AsyncSession" = Depends(deps.get_async_read_db),
+):
+    service = AsyncWalletService(db)
+    wallet = await service.get_user_balance(current_user.id)
+    return respond({"success": True, "message": "Balance retrieved", "data": wallet})
+
+
+@async_router.post("/deposit", response_model=WalletResponse)
+async def deposit_funds_async(
+    payload: WalletDeposit,
+    current_user: UserOut = Depends(deps.get_current_principal_async),
+    db: "AsyncSession" = Depends(deps.get_async_db),
+):
+    service = AsyncWalletService(db)
+    wallet = await service.deposit(current_user.id, payload.amount)
+    return respond(
+        {
+            "success": True,
+            "message": f"Successfully deposited {payload.amount}",
+            "data": wallet,
+        }
+    )
@@ -1,26 +1,70 @@
 import time
-from fastapi import FastAPI, Request
+import uuid
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from app.endpoints import deps
+from app.endpoints.idempotency import IdempotencyMiddleware
+from app.endpoints.rate_limit import RateLimitMiddleware
 from app.endpoints.routes import auth_routes, wallet_routes, blackjack_routes
-from app.core.logger import logger
+from sqlalchemy import text
+from app.core import metrics
+from app.core.serialization import ContentNegotiationMiddleware, ORJSONResponse
+from app.core.cache import principal_cache
+from app.core.config import settings
+from app.core.logger import (
+    bind_context,
+    logger,
+    queue_handler as log_queue_handler,
+    reset_context,
+    sample_access_log,
+)
+from app.core.security import password_hasher
+from app.db import session as db_session
 from app.db.session import engine
+from app.services import blackjack_advisor
+from app.services.replica_monitor import replica_monitor
+from app.services.settlement_queue import settlement_queue
+from app.services.wallet_snapshots import wallet_compactor
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Application started.")
+    blackjack_advisor.load_dealer_table(settings.DEALER_TABLE_PATH)
     try:
         with engine.connect() as conn:
             logger.info("DB connected successfully.")
     except Exception as e:
         logger.error("Error connecting to DB: %s", e)
 
+    if db_session.async_engine is not None:
+        try:
+            async with db_session.async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                logger.info("Async DB connected successfully.")
+        except Exception as e:
+            logger.error("Error connecting to async DB: %s", e)
+
+    wallet_compactor.start()
+    replica_monitor.start()
+
     yield  # BEFORE: startup, AFTER: shutdown
     logger.info("Application shut down.")
 
+    await wallet_compactor.stop()
+    await replica_monitor.stop()
+    settlement_queue.shutdown()  # drains queued settlements
+    password_hasher.shutdown()
+
     # db connection close
     engine.dispose()
+    if db_session.async_engine is not None:
+        await db_session.async_engine.dispose()
+    if db_session.replica_engine is not None:
+        db_session.replica_engine.dispose()
+    if db_session.async_replica_engine is not None:
+        await db_session.async_replica_engine.dispose()
     logger.info("DB connection closed.")
 
 
@@ -30,10 +74,16 @@ app = FastAPI(
     docs_url="/api/docs",
     openapi_url="/api/openapi.json",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 origins = ["*"]
 
+# Inside CORS so replayed and 429 responses get CORS headers too; throttled
+# requests never claim an idempotency key
+app.add_middleware(IdempotencyMiddleware)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -41,37 +91,100 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ContentNegotiationMiddleware)
 
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
+    """
+    Binds the request context for every log record in the request, then
+    writes one access record: always for errors and slow requests, sampled
+    (LOG_ACCESS_SAMPLE_RATE) otherwise. The caller's token is decoded here,
+    once; the middleware and dependencies below reuse it from request.state.
+    """
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    token = bind_context(
+        request_id=request_id,
+        method=request.method,
+        path=request.url.path,
+        user_id=deps.scope_user_id(request.scope),
+    )
     start = time.perf_counter()
     try:
         response = await call_next(request)
         duration_ms = (time.perf_counter() - start) * 1000
-        client = request.client.host if request.client else "unknown"
-        logger.info(
-            "%s %s %s | %s | %.2fms",
-            request.method,
-            request.url.path,
-            response.status_code,
-            client,
-            duration_ms,
-        )
+        if (
+            response.status_code >= 400
+            or duration_ms >= settings.LOG_SLOW_REQUEST_MS
+            or sample_access_log()
+        ):
+            logger.info(
+                "%s %s %s",
+                request.method,
+                request.url.path,
+                response.status_code,
+                extra={
+                    "status": response.status_code,
+                    "duration_ms": round(duration_ms, 2),
+                    "client": request.client.host if request.client else "unknown",
+                },
+            )
+        response.headers["x-request-id"] = request_id
         return response
     except Exception as e:
         duration_ms = (time.perf_counter() - start) * 1000
-        client = request.client.host if request.client else "unknown"
         logger.error(
-            "Request failed: %s %s | %s | %.2fms | Error: %s",
+            "Request failed: %s %s | Error: %s",
             request.method,
             request.url.path,
-            client,
-            duration_ms,
             str(e),
+            extra={
+                "duration_ms": round(duration_ms, 2),
+                "client": request.client.host if request.client else "unknown",
+            },
             exc_info=True,
         )
         raise
+    finally:
+        reset_context(token)
+
+
+def _route_template(request: Request) -> str:
+    """
+    Matched route template (e.g. /api/blackjack/{game_id}/hit) so metric labels
+    stay bounded. The route object may carry only the router-relative path, so
+    the router prefix is recovered from the raw path.
+    """
+    route = request.scope.get("route")
+    if route is None:
+        return "unmatched"
+    path = request.scope["path"]
+    for i, char in enumerate(path):
+        if char == "/" and route.path_regex.match(path[i:]):
+            return path[:i] + route.path
+    return route.path
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """Request latency plus the SQL count/time the engine hooks collected."""
+    stats = metrics.RequestStats()
+    token = metrics.current_request_stats.set(stats)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        metrics.current_request_stats.reset(token)
+        metrics.observe_request(
+            request.method,
+            _route_template(request),
+            str(status_code),
+            time.perf_counter() - start,
+            stats,
+        )
 
 
 @app.middleware("http")
@@ -91,6 +204,17 @@ async def exception_handler(request: Request, call_next):
         raise
 
 
+# Async routers are matched first; anything they don't define falls through
+# to the sync routers below.
+if settings.DB_ASYNC_MODE:
+    app.include_router(
+        auth_routes.async_router, prefix="/api/auth", tags=["Authentication"]
+    )
+    app.include_router(wallet_routes.async_router, prefix="/api/wallet", tags=["Wallet"])
+    app.include_router(
+        blackjack_routes.async_router, prefix="/api/blackjack", tags=["Blackjack"]
+    )
+
 app.include_router(auth_routes.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(wallet_routes.router, prefix="/api/wallet", tags=["Wallet"])
 app.include_router(blackjack_routes.router, prefix="/api/blackjack", tags=["Blackjack"])
@@ -99,3 +223,55 @@ app.include_router(blackjack_routes.router, prefix="/api/blackjack", tags=["Blac
 @app.get("/")
 def health_check():
     return {"success": True, "message": "Casino API is online"}
+
+
+# Scrape-time readings of state the app already tracks
+_callback_metrics = [
+    metrics.CallbackCounter(
+        "principal_cache_hits_total", "Principal cache hits.",
+        lambda: principal_cache.hits,
+    ),
+    metrics.CallbackCounter(
+        "principal_cache_misses_total", "Principal cache misses.",
+        lambda: principal_cache.misses,
+    ),
+    metrics.Gauge(
+        "password_hash_pending", "Password hash jobs running or queued.",
+        lambda: password_hasher.pending,
+    ),
+    metrics.CallbackCounter(
+        "password_hash_rejected_total", "Password hash jobs shed with a 503.",
+        lambda: password_hasher.rejected,
+    ),
+    metrics.CallbackCounter(
+        "log_records_dropped_total", "Log records dropped on a full log queue.",
+        lambda: log_queue_handler.dropped,
+    ),
+    metrics.Gauge(
+        "db_pool_checked_out", "Connections checked out of the sync pool.",
+        lambda: engine.pool.checkedout(),
+    ),
+]
+if db_session.async_engine is not None:
+    _callback_metrics.append(
+        metrics.Gauge(
+            "db_async_pool_checked_out", "Connections checked out of the async pool.",
+            lambda: db_session.async_engine.pool.checkedout(),
+        )
+    )
+if db_session.replica_engine is not None:
+    _callback_metrics.append(
+        metrics.Gauge(
+            "db_replica_lag_seconds", "Last measured read replica lag.",
+            lambda: db_session.replica_router.lag,
+        )
+    )
+for _metric in _callback_metrics:
+    metrics.registry.register(_metric)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(
+        metrics.registry.render(), media_type="text/plain; version=0.0.4"
+    )
@@ -1,22 +1,110 @@
-from sqlalchemy import Column, Integer, Float, String, ForeignKey, JSON, Boolean
+from typing import List
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Column,
+    DateTime,
+    Integer,
+    String,
+    ForeignKey,
+    Boolean,
+    Index,
+    LargeBinary,
+    SmallInteger,
+    event,
+    func,
+)
 from sqlalchemy.orm import relationship
+from app.core.money import from_minor
 from app.db.session import Base
+from app.services.blackjack_engine import BlackjackEngine
 
 
 class BlackjackGame(Base):
     __tablename__ = "blackjack_games"
+    # Range-partitioned by id on Postgres (see the partition_blackjack_games
+    # migration); finished games are moved out by app.services.game_archive
+    __table_args__ = {"postgresql_partition_by": "RANGE (id)"}
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    bet_amount = Column(Float, nullable=False)
+    # Exactly what the bet debited from the wallet, in minor units
+    bet_minor = Column(BigInteger, nullable=False)
 
-    # Stored as lists of strings, e.g., ["A", "10"]
-    player_hand = Column(JSON, default=list, nullable=False)
-    dealer_hand = Column(JSON, default=list, nullable=False)
+    # One byte per card (index into BlackjackEngine.CARDS), e.g. b"\x0c\x08"
+    # for ["A", "10"]. Scores are kept alongside and updated per draw so they
+    # never have to be recomputed from the whole hand.
+    player_cards = Column(LargeBinary, default=b"", nullable=False)
+    player_score = Column(SmallInteger, default=0, nullable=False)
+    player_soft_aces = Column(SmallInteger, default=0, nullable=False)
+    dealer_cards = Column(LargeBinary, default=b"", nullable=False)
+    dealer_score = Column(SmallInteger, default=0, nullable=False)
+    dealer_soft_aces = Column(SmallInteger, default=0, nullable=False)
 
     # Statuses: active, player_win, dealer_win, push, blackjack, player_bust
     status = Column(String, default="active", nullable=False)
     is_over = Column(Boolean, default=False, nullable=False)
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
 
     # Link back to user
     player = relationship("User", back_populates="games")
+
+    @property
+    def bet_amount(self) -> float:
+        return from_minor(self.bet_minor)
+
+    @property
+    def player_hand(self) -> List[str]:
+        return BlackjackEngine.decode_hand(self.player_cards or b"")
+
+    @player_hand.setter
+    def player_hand(self, hand: List[str]) -> None:
+        self.player_cards = BlackjackEngine.encode_hand(hand)
+        self.player_score, self.player_soft_aces = BlackjackEngine.score_state(hand)
+
+    @property
+    def dealer_hand(self) -> List[str]:
+        return BlackjackEngine.decode_hand(self.dealer_cards or b"")
+
+    @dealer_hand.setter
+    def dealer_hand(self, hand: List[str]) -> None:
+        self.dealer_cards = BlackjackEngine.encode_hand(hand)
+        self.dealer_score, self.dealer_soft_aces = BlackjackEngine.score_state(hand)
+
+    def add_player_card(self, card: str) -> None:
+        """Appends one card and folds it into the running score."""
+        self.player_cards = (self.player_cards or b"") + bytes(
+            [BlackjackEngine.CARD_CODES[card]]
+        )
+        self.player_score, self.player_soft_aces = BlackjackEngine.add_to_score(
+            self.player_score or 0, self.player_soft_aces or 0, card
+        )
+
+
+# Serves get_active_game. Not unique: a partitioned table can't enforce it
+# across partitions, so start_game checks under the wallet row lock instead.
+Index(
+    "ix_blackjack_games_active_user",
+    BlackjackGame.user_id,
+    postgresql_where=BlackjackGame.is_over == False,
+    sqlite_where=BlackjackGame.is_over == False,
+)
+# Per-user history in id order (keyset pagination)
+Index(
+    "ix_blackjack_games_user_id_id_desc",
+    BlackjackGame.user_id,
+    BlackjackGame.id.desc(),
+)
+
+# create_all on Postgres: a catch-all partition so inserts work before
+# app.services.game_archive has created the id-range partitions
+event.listen(
+    BlackjackGame.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE IF NOT EXISTS blackjack_games_default "
+        "PARTITION OF blackjack_games DEFAULT"
+    ).execute_if(dialect="postgresql"),
+)
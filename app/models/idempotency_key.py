@@ -0,0 +1,32 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+)
+from app.db.session import Base
+
+
+class IdempotencyKey(Base):
+    """
+    One Idempotency-Key per user. A row with a NULL status_code is claimed by
+    a request still running; once it finishes the response is stored here
+    and replayed to retries until expires_at.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of method, path, body
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(64), nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+
+# Expired-row purge
+Index("ix_idempotency_keys_expires_at", IdempotencyKey.expires_at)
@@ -0,0 +1,22 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer
+from app.db.session import Base
+
+
+class PlayerStats(Base):
+    """
+    Running totals per player, bumped in the transaction that settles each
+    hand so "my stats" is a primary-key read. Money is in minor units, as in
+    the ledger. Rebuild with `python -m app.services.player_stats`.
+    """
+
+    __tablename__ = "player_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    hands_played = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)  # player_win
+    losses = Column(Integer, nullable=False, default=0)  # dealer_win (incl. busts)
+    pushes = Column(Integer, nullable=False, default=0)
+    blackjacks = Column(Integer, nullable=False, default=0)  # naturals, paid 3:2
+    total_wagered = Column(BigInteger, nullable=False, default=0)
+    net_result = Column(BigInteger, nullable=False, default=0)  # payouts - bets
+    biggest_win = Column(BigInteger, nullable=False, default=0)  # best single hand
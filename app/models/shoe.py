@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, ForeignKey, LargeBinary
+from app.db.session import Base
+
+
+class BlackjackShoe(Base):
+    __tablename__ = "blackjack_shoes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
+    decks = Column(Integer, nullable=False)
+
+    # One byte per card (rank index), pre-shuffled; only `position` changes
+    # between reshuffles, so resuming a shoe is a single small UPDATE.
+    cards = Column(LargeBinary, nullable=False)
+    position = Column(Integer, default=0, nullable=False)
+    cut_index = Column(Integer, nullable=False)
@@ -1,7 +1,11 @@
-from sqlalchemy import Column, Integer, String
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, event
+from sqlalchemy.orm import Session, object_session, relationship
+from app.core.cache import principal_cache
 from app.db.session import Base
 
+# session.info key: ids of users changed in the session's open transaction
+_CHANGED_USERS = "changed_user_ids"
+
 
 class User(Base):
     __tablename__ = "users"
@@ -13,3 +17,26 @@ class User(Base):
         "Wallet", back_populates="owner", uselist=False, cascade="all, delete-orphan"
     )
     games = relationship("BlackjackGame", back_populates="player")
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _track_changed_user(mapper, connection, target: User):
+    """Note the change; the cached principal is dropped once it commits."""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_USERS, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_principals(session: Session):
+    # Dropping the entry before the commit would let a concurrent request
+    # re-cache the old row. Only this process's cache is reached; other
+    # workers serve theirs until PRINCIPAL_CACHE_TTL_SECONDS runs out.
+    for user_id in session.info.pop(_CHANGED_USERS, ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session):
+    session.info.pop(_CHANGED_USERS, None)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, ForeignKey
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -8,7 +8,12 @@ class Wallet(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
-    balance = Column(Float, default=0.0)
+
+    # The balance is snapshot_balance plus every wallet_transactions entry
+    # after snapshot_txn_id (minor units). The row is only written when the
+    # snapshot compactor rolls the snapshot forward.
+    snapshot_balance = Column(BigInteger, default=0, nullable=False)
+    snapshot_txn_id = Column(BigInteger, default=0, nullable=False)
 
     # Relationship back to User
     owner = relationship("User", back_populates="wallet")
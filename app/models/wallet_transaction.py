@@ -0,0 +1,66 @@
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql.functions import FunctionElement
+from app.db.session import Base
+
+
+class insert_time(FunctionElement):
+    """
+    Time of the INSERT itself. Postgres' now() is the transaction's start,
+    which can be long before the entry's id is drawn.
+    """
+
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+
+@compiles(insert_time)
+def _insert_time(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(insert_time, "postgresql")
+def _insert_time_postgresql(element, compiler, **kw):
+    return "clock_timestamp()"
+
+
+class WalletTransaction(Base):
+    """Append-only ledger entry; rows are never updated or deleted."""
+
+    __tablename__ = "wallet_transactions"
+
+    # SQLite only auto-increments INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    amount = Column(BigInteger, nullable=False)  # minor units, negative for debits
+    kind = Column(String(16), nullable=False)  # opening, deposit, bet, payout, migration
+    # No foreign key: ledger entries outlive games moved to the archive
+    game_id = Column(Integer, nullable=True)
+    # Snapshot compaction relies on it being stamped at INSERT
+    created_at = Column(
+        DateTime(timezone=True), server_default=insert_time(), nullable=False
+    )
+
+    # Lets an entry be appended before its game is flushed; the unit of work
+    # inserts the game first and fills in game_id.
+    game = relationship(
+        "BlackjackGame",
+        primaryjoin="foreign(WalletTransaction.game_id) == BlackjackGame.id",
+    )
+
+
+# Balance reads sum a user's entries after their snapshot id
+Index(
+    "ix_wallet_transactions_user_id_id",
+    WalletTransaction.user_id,
+    WalletTransaction.id,
+)
@@ -1,6 +1,43 @@
+from sqlalchemy import and_, delete, select, update
 from sqlalchemy.orm import Session
 from app.models.blackjack_game import BlackjackGame
-from typing import Optional, List
+from typing import TYPE_CHECKING, Optional, List
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Result
+    from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
+
+
+# Plain rows for exports; no ORM objects are built
+HISTORY_COLUMNS = (
+    BlackjackGame.id,
+    BlackjackGame.user_id,
+    BlackjackGame.created_at,
+    BlackjackGame.player_cards,
+    BlackjackGame.player_score,
+    BlackjackGame.dealer_cards,
+    BlackjackGame.dealer_score,
+    BlackjackGame.status,
+    BlackjackGame.is_over,
+    BlackjackGame.bet_minor,
+)
+
+
+def _history_rows(user_id: int, batch_size: int):
+    return (
+        select(*HISTORY_COLUMNS)
+        .where(BlackjackGame.user_id == user_id)
+        .order_by(BlackjackGame.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+
+def _playable(game_id: int, user_id: int):
+    return and_(
+        BlackjackGame.id == game_id,
+        BlackjackGame.user_id == user_id,
+        BlackjackGame.is_over == False,
+    )
 
 
 class BlackjackRepository:
@@ -15,23 +52,49 @@ class BlackjackRepository:
     def get_by_id(self, game_id: int) -> Optional[BlackjackGame]:
         return self.db.query(BlackjackGame).filter(BlackjackGame.id == game_id).first()
 
-    def get_active_game(self, user_id: int) -> Optional[BlackjackGame]:
-        """Check if the user has an unfinished game."""
+    def get_playable_for_update(
+        self, game_id: int, user_id: int
+    ) -> Optional[BlackjackGame]:
+        """
+        Loads and row-locks the game in one statement, with ownership and
+        is_over checks done in SQL. None means not found, not the caller's,
+        or already finished. The lock serializes concurrent actions on a game.
+        """
         return (
             self.db.query(BlackjackGame)
-            .filter(BlackjackGame.user_id == user_id, BlackjackGame.is_over == False)
+            .filter(_playable(game_id, user_id))
+            .with_for_update()
             .first()
         )
 
-    def get_user_history(self, user_id: int, limit: int = 10) -> List[BlackjackGame]:
+    def get_active_game(self, user_id: int) -> Optional[BlackjackGame]:
+        """Check if the user has an unfinished game."""
         return (
             self.db.query(BlackjackGame)
-            .filter(BlackjackGame.user_id == user_id)
-            .order_by(BlackjackGame.id.desc())
-            .limit(limit)
-            .all()
+            .filter(BlackjackGame.user_id == user_id, BlackjackGame.is_over == False)
+            .first()
         )
 
+    def get_user_history(
+        self, user_id: int, limit: int = 10, before_id: Optional[int] = None
+    ) -> List[BlackjackGame]:
+        """
+        Newest-first page of the user's games. Pass the last id of the previous
+        page as `before_id` (keyset pagination on the (user_id, id DESC) index).
+        """
+        query = self.db.query(BlackjackGame).filter(BlackjackGame.user_id == user_id)
+        if before_id is not None:
+            query = query.filter(BlackjackGame.id < before_id)
+        return query.order_by(BlackjackGame.id.desc()).limit(limit).all()
+
+    def stream_user_history(self, user_id: int, batch_size: int) -> "Result":
+        """
+        All of the user's games, oldest first, as plain rows fetched
+        `batch_size` at a time through a server-side cursor; iterate
+        `.partitions()` while the session is open.
+        """
+        return self.db.execute(_history_rows(user_id, batch_size))
+
     def update(self, game: BlackjackGame) -> BlackjackGame:
         """
         Updates the game state.
@@ -40,3 +103,94 @@ class BlackjackRepository:
         self.db.add(game)
         self.db.flush()
         return game
+
+    def finish_if_unchanged(
+        self, game_id: int, expected_player_cards: bytes, values: dict
+    ) -> bool:
+        """
+        Writes a settled game only if it is still active with the player hand
+        the settlement was computed from (cards only grow, so the hand doubles
+        as a version). False means another action got there first.
+        """
+        result = self.db.execute(
+            update(BlackjackGame)
+            .where(
+                BlackjackGame.id == game_id,
+                BlackjackGame.is_over == False,
+                BlackjackGame.player_cards == expected_player_cards,
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    def get_after(self, after_id: int, limit: int) -> List[BlackjackGame]:
+        """Next games in id order (which is creation order), for archival."""
+        return (
+            self.db.query(BlackjackGame)
+            .filter(BlackjackGame.id > after_id)
+            .order_by(BlackjackGame.id)
+            .limit(limit)
+            .all()
+        )
+
+    def delete_many(self, game_ids: List[int]) -> int:
+        result = self.db.execute(
+            delete(BlackjackGame)
+            .where(BlackjackGame.id.in_(game_ids))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+
+class AsyncBlackjackRepository:
+    """Async counterpart of BlackjackRepository (DB_ASYNC_MODE)."""
+
+    def __init__(self, db: "AsyncSession"):
+        self.db = db
+
+    async def create(self, game: BlackjackGame) -> BlackjackGame:
+        self.db.add(game)
+        await self.db.flush()
+        return game
+
+    async def get_by_id(self, game_id: int) -> Optional[BlackjackGame]:
+        return await self.db.get(BlackjackGame, game_id)
+
+    async def get_playable_for_update(
+        self, game_id: int, user_id: int
+    ) -> Optional[BlackjackGame]:
+        result = await self.db.execute(
+            select(BlackjackGame).where(_playable(game_id, user_id)).with_for_update()
+        )
+        return result.scalars().first()
+
+    async def get_active_game(self, user_id: int) -> Optional[BlackjackGame]:
+        """Check if the user has an unfinished game."""
+        result = await self.db.execute(
+            select(BlackjackGame)
+            .where(BlackjackGame.user_id == user_id, BlackjackGame.is_over == False)
+            .limit(1)
+        )
+        return result.scalars().first()
+
+    async def get_user_history(
+        self, user_id: int, limit: int = 10, before_id: Optional[int] = None
+    ) -> List[BlackjackGame]:
+        query = select(BlackjackGame).where(BlackjackGame.user_id == user_id)
+        if before_id is not None:
+            query = query.where(BlackjackGame.id < before_id)
+        result = await self.db.execute(
+            query.order_by(BlackjackGame.id.desc()).limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def stream_user_history(
+        self, user_id: int, batch_size: int
+    ) -> "AsyncResult":
+        return await self.db.stream(_history_rows(user_id, batch_size))
+
+    async def update(self, game: BlackjackGame) -> BlackjackGame:
+        self.db.add(game)
+        await self.db.flush()
+        return game
@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.idempotency_key import IdempotencyKey
+
+
+def _insert_ignore(db: Session):
+    """INSERT ... ON CONFLICT DO NOTHING (Postgres, or the SQLite stand-in)."""
+    dialect = sqlite if db.get_bind().dialect.name == "sqlite" else postgresql
+    return dialect.insert(IdempotencyKey).on_conflict_do_nothing()
+
+
+def _key(user_id: int, key: str):
+    return (IdempotencyKey.user_id == user_id) & (IdempotencyKey.key == key)
+
+
+class IdempotencyRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def claim(
+        self, user_id: int, key: str, fingerprint: str, expires_at: datetime
+    ) -> bool:
+        """Inserts an in-progress row; False if the key already exists."""
+        result = self.db.execute(
+            _insert_ignore(self.db).values(
+                user_id=user_id,
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=expires_at,
+            )
+        )
+        return result.rowcount == 1
+
+    def get(self, user_id: int, key: str) -> Optional[IdempotencyKey]:
+        return self.db.execute(
+            select(IdempotencyKey).where(_key(user_id, key))
+        ).scalar_one_or_none()
+
+    def complete(
+        self,
+        user_id: int,
+        key: str,
+        status_code: int,
+        content_type: Optional[str],
+        body: bytes,
+        expires_at: datetime,
+    ) -> None:
+        self.db.execute(
+            update(IdempotencyKey)
+            .where(_key(user_id, key))
+            .values(
+                status_code=status_code,
+                content_type=content_type,
+                body=body,
+                expires_at=expires_at,
+            )
+        )
+
+    def release(self, user_id: int, key: str) -> None:
+        """Drops an unfinished claim so a retry can run the request again."""
+        self.db.execute(
+            delete(IdempotencyKey).where(
+                _key(user_id, key), IdempotencyKey.status_code.is_(None)
+            )
+        )
+
+    def delete_expired(
+        self, now: datetime, user_id: Optional[int] = None, key: Optional[str] = None
+    ) -> int:
+        stmt = delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now)
+        if user_id is not None:
+            stmt = stmt.where(_key(user_id, key))
+        return self.db.execute(stmt).rowcount
@@ -0,0 +1,105 @@
+import re
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+PARENT = "blackjack_games"
+ID_SEQUENCE = "blackjack_games_id_seq"
+
+_BOUNDS = re.compile(r"FROM \('?(-?\d+)'?\) TO \('?(-?\d+)'?\)")
+
+
+class Partition(NamedTuple):
+    name: str
+    start: Optional[int]  # None for the DEFAULT partition
+    end: Optional[int]
+
+
+class GamePartitionRepository:
+    """Range partitions of blackjack_games by id (Postgres only)."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def is_partitioned(self) -> bool:
+        if self.db.get_bind().dialect.name != "postgresql":
+            return False
+        return bool(
+            self.db.execute(
+                text(
+                    "SELECT 1 FROM pg_partitioned_table "
+                    "WHERE partrelid = to_regclass(:parent)"
+                ),
+                {"parent": PARENT},
+            ).scalar()
+        )
+
+    def get_all(self) -> List[Partition]:
+        rows = self.db.execute(
+            text(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+                "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:parent)"
+            ),
+            {"parent": PARENT},
+        ).all()
+        partitions = []
+        for name, bound in rows:
+            match = _BOUNDS.search(bound)
+            if match is None:
+                partitions.append(Partition(name, None, None))
+            else:
+                start, end = map(int, match.groups())
+                partitions.append(Partition(name, start, end))
+        return sorted(partitions, key=lambda p: (p.start is None, p.start))
+
+    def last_id(self) -> int:
+        """Last id handed out by the sequence (ids only grow)."""
+        return self.db.execute(text(f"SELECT last_value FROM {ID_SEQUENCE}")).scalar()
+
+    def create(
+        self, start: int, end: int, default: Optional[str], lock_timeout_ms: int
+    ) -> str:
+        """
+        Creates the partition for ids [start, end). Postgres refuses while the
+        DEFAULT partition holds rows in that range, so those are moved over
+        with DEFAULT detached; all in the caller's transaction.
+        """
+        name = f"{PARENT}_p{start}"
+        bounds = {"start": start, "end": end}
+        in_range = "id >= :start AND id < :end"
+        self.db.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+        strays = default is not None and (
+            self.db.execute(
+                text(f"SELECT 1 FROM {default} WHERE {in_range} LIMIT 1"), bounds
+            ).first()
+            is not None
+        )
+        if strays:
+            self.db.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {default}"))
+        self.db.execute(
+            text(
+                f"CREATE TABLE {name} PARTITION OF {PARENT} "
+                f"FOR VALUES FROM ({start}) TO ({end})"
+            )
+        )
+        if strays:
+            self.db.execute(
+                text(f"INSERT INTO {name} SELECT * FROM {default} WHERE {in_range}"),
+                bounds,
+            )
+            self.db.execute(text(f"DELETE FROM {default} WHERE {in_range}"), bounds)
+            self.db.execute(
+                text(f"ALTER TABLE {PARENT} ATTACH PARTITION {default} DEFAULT")
+            )
+        return name
+
+    def is_empty(self, name: str) -> bool:
+        return self.db.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is None
+
+    def drop(self, name: str, lock_timeout_ms: int) -> None:
+        # Takes a brief exclusive lock on the parent; give up rather than
+        # queue behind (and so block) live game traffic
+        self.db.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+        self.db.execute(text(f"DROP TABLE {name}"))
@@ -0,0 +1,131 @@
+from typing import TYPE_CHECKING, Dict, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.blackjack_game import BlackjackGame
+from app.models.player_stats import PlayerStats
+from app.models.wallet import Wallet
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Result
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+COUNTERS = (
+    "hands_played",
+    "wins",
+    "losses",
+    "pushes",
+    "blackjacks",
+    "total_wagered",
+    "net_result",
+)
+RESULT_COUNTER = {
+    "player_win": "wins",
+    "dealer_win": "losses",
+    "push": "pushes",
+    "blackjack": "blackjacks",
+}
+
+
+def empty_stats() -> Dict[str, int]:
+    return {**dict.fromkeys(COUNTERS, 0), "biggest_win": 0}
+
+
+def stats_delta(result: str, bet: int, payout: int) -> Dict[str, int]:
+    """What one settled hand adds to its player's stats (minor units)."""
+    net = payout - bet
+    delta = empty_stats()
+    delta.update(
+        hands_played=1, total_wagered=bet, net_result=net, biggest_win=max(net, 0)
+    )
+    delta[RESULT_COUNTER[result]] = 1
+    return delta
+
+
+def merge_stats(total: Dict[str, int], delta: Dict[str, int]) -> None:
+    for name in COUNTERS:
+        total[name] += delta[name]
+    total["biggest_win"] = max(total["biggest_win"], delta["biggest_win"])
+
+
+def _upsert(db, user_id: int, values: Dict[str, int], replace: bool = False):
+    """INSERT ... ON CONFLICT (user_id) DO UPDATE (Postgres, or SQLite)."""
+    dialect = sqlite if db.get_bind().dialect.name == "sqlite" else postgresql
+    stmt = dialect.insert(PlayerStats).values(user_id=user_id, **values)
+    new = stmt.excluded
+    if replace:
+        updates = {name: new[name] for name in values}
+    else:
+        updates = {name: PlayerStats.__table__.c[name] + new[name] for name in COUNTERS}
+        updates["biggest_win"] = case(
+            (new.biggest_win > PlayerStats.biggest_win, new.biggest_win),
+            else_=PlayerStats.biggest_win,
+        )
+    return stmt.on_conflict_do_update(index_elements=["user_id"], set_=updates)
+
+
+class PlayerStatsRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, user_id: int) -> Optional[PlayerStats]:
+        return self.db.get(PlayerStats, user_id)
+
+    def record(self, user_id: int, result: str, bet: int, payout: int) -> None:
+        """Adds a settled hand; one upsert in the caller's transaction."""
+        self.db.execute(_upsert(self.db, user_id, stats_delta(result, bet, payout)))
+
+    # Backfill
+
+    def lock_player(self, user_id: int) -> None:
+        """
+        Holds off the player's settlements until commit: new games lock the
+        wallet row and running ones their game row, so stats rebuilt in this
+        transaction can't miss or double-count a hand settling meanwhile.
+        NOWAIT: raises OperationalError rather than queue behind (and so
+        hold up) a settlement.
+        """
+        self.db.execute(
+            select(Wallet.id)
+            .where(Wallet.user_id == user_id)
+            .with_for_update(nowait=True)
+        )
+        self.db.execute(
+            select(BlackjackGame.id)
+            .where(BlackjackGame.user_id == user_id, BlackjackGame.is_over == False)
+            .with_for_update(nowait=True)
+        )
+
+    def first_finished_id(self) -> Optional[int]:
+        return self.db.execute(
+            select(func.min(BlackjackGame.id)).where(BlackjackGame.is_over == True)
+        ).scalar()
+
+    def finished_games(self, user_id: int, batch_size: int) -> "Result":
+        """(id, status, bet_minor) of every finished game of the player, streamed."""
+        return self.db.execute(
+            select(BlackjackGame.id, BlackjackGame.status, BlackjackGame.bet_minor)
+            .where(BlackjackGame.user_id == user_id, BlackjackGame.is_over == True)
+            .execution_options(yield_per=batch_size)
+        )
+
+    def replace(self, totals: Dict[int, Dict[str, int]]) -> None:
+        for user_id, values in totals.items():
+            self.db.execute(_upsert(self.db, user_id, values, replace=True))
+
+
+class AsyncPlayerStatsRepository:
+    """Async counterpart of PlayerStatsRepository (DB_ASYNC_MODE)."""
+
+    def __init__(self, db: "AsyncSession"):
+        self.db = db
+
+    async def get(self, user_id: int) -> Optional[PlayerStats]:
+        return await self.db.get(PlayerStats, user_id)
+
+    async def record(self, user_id: int, result: str, bet: int, payout: int) -> None:
+        await self.db.execute(
+            _upsert(self.db, user_id, stats_delta(result, bet, payout))
+        )
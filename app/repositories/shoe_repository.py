@@ -0,0 +1,54 @@
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.models.shoe import BlackjackShoe
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class ShoeRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_for_update(self, user_id: int) -> Optional[BlackjackShoe]:
+        """Locks the user's shoe so concurrent actions never deal the same card."""
+        return (
+            self.db.query(BlackjackShoe)
+            .filter(BlackjackShoe.user_id == user_id)
+            .with_for_update()
+            .first()
+        )
+
+    def save(self, shoe: BlackjackShoe) -> BlackjackShoe:
+        self.db.add(shoe)
+        self.db.flush()
+        return shoe
+
+    def update_state(self, user_id: int, values: dict) -> None:
+        self.db.execute(
+            update(BlackjackShoe)
+            .where(BlackjackShoe.user_id == user_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+class AsyncShoeRepository:
+    """Async counterpart of ShoeRepository (DB_ASYNC_MODE)."""
+
+    def __init__(self, db: "AsyncSession"):
+        self.db = db
+
+    async def get_for_update(self, user_id: int) -> Optional[BlackjackShoe]:
+        result = await self.db.execute(
+            select(BlackjackShoe)
+            .where(BlackjackShoe.user_id == user_id)
+            .with_for_update()
+        )
+        return result.scalars().first()
+
+    async def save(self, shoe: BlackjackShoe) -> BlackjackShoe:
+        self.db.add(shoe)
+        await self.db.flush()
+        return shoe
@@ -1,7 +1,22 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models.user import User
+from typing import TYPE_CHECKING, List, Optional
 
+from app.core.money import to_minor
 from app.models.wallet import Wallet
+from app.models.wallet_transaction import WalletTransaction
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+STARTING_BALANCE = 1000.0
+
+
+def _opening_entry(user_id: int) -> WalletTransaction:
+    return WalletTransaction(
+        user_id=user_id, amount=to_minor(STARTING_BALANCE), kind="opening"
+    )
 
 
 class UserRepository:
@@ -11,6 +26,14 @@ class UserRepository:
     def get_by_username(self, username: str) -> User:
         return self.db.query(User).filter(User.username == username).first()
 
+    def get_ids_after(self, after_id: int, limit: int) -> List[int]:
+        """Next user ids in order, for batch jobs."""
+        return list(
+            self.db.execute(
+                select(User.id).where(User.id > after_id).order_by(User.id).limit(limit)
+            ).scalars()
+        )
+
     def create_user_with_wallet(self, username: str, hashed_password: str) -> User:
         """
         Creates both User and Wallet in a single transaction.
@@ -20,10 +43,34 @@ class UserRepository:
         self.db.add(new_user)
         self.db.flush()  # Obtain new_user.id without committing yet
 
-        # Initialize wallet with a starting balance (e.g., 1000 units)
-        new_wallet = Wallet(user_id=new_user.id, balance=1000.0)
-        self.db.add(new_wallet)
+        # Initialize wallet with a starting balance (e.g., 1000 units),
+        # recorded as the first ledger entry
+        self.db.add(Wallet(user_id=new_user.id))
+        self.db.add(_opening_entry(new_user.id))
 
         self.db.commit()
-        self.db.refresh(new_user)
+        return new_user
+
+
+class AsyncUserRepository:
+    """Async counterpart of UserRepository (DB_ASYNC_MODE)."""
+
+    def __init__(self, db: "AsyncSession"):
+        self.db = db
+
+    async def get_by_username(self, username: str) -> Optional[User]:
+        result = await self.db.execute(select(User).where(User.username == username))
+        return result.scalars().first()
+
+    async def create_user_with_wallet(
+        self, username: str, hashed_password: str
+    ) -> User:
+        new_user = User(username=username, hashed_password=hashed_password)
+        self.db.add(new_user)
+        await self.db.flush()
+
+        self.db.add(Wallet(user_id=new_user.id))
+        self.db.add(_opening_entry(new_user.id))
+
+        await self.db.commit()
         return new_user
@@ -1,5 +1,99 @@
+from sqlalchemy import func, select, text, update
 from sqlalchemy.orm import Session
+from app.core.money import from_minor
+from app.models.blackjack_game import BlackjackGame
 from app.models.wallet import Wallet
+from app.models.wallet_transaction import WalletTransaction
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _balance_stmt(user_id: int, for_update: bool = False):
+    """Snapshot plus the ledger tail after it, in minor units (None if no wallet)."""
+    tail = (
+        select(func.coalesce(func.sum(WalletTransaction.amount), 0))
+        .where(
+            WalletTransaction.user_id == Wallet.user_id,
+            WalletTransaction.id > Wallet.snapshot_txn_id,
+        )
+        .scalar_subquery()
+    )
+    stmt = select(Wallet.snapshot_balance + tail).where(Wallet.user_id == user_id)
+    if for_update:
+        # Serializes debits per user; the row itself is not written
+        stmt = stmt.with_for_update(of=Wallet)
+    return stmt
+
+
+def _entry(
+    user_id: int,
+    amount: int,
+    kind: str,
+    game: Optional[BlackjackGame],
+    game_id: Optional[int] = None,
+) -> WalletTransaction:
+    if game is not None:
+        return WalletTransaction(user_id=user_id, amount=amount, kind=kind, game=game)
+    return WalletTransaction(user_id=user_id, amount=amount, kind=kind, game_id=game_id)
+
+
+# Entries the compactor may fold, timed by the database clock. On Postgres
+# the cutoff also stays a second before the start of every open transaction
+# that has written: an entry still uncommitted was stamped (at INSERT) after
+# its transaction began, so it is newer than the cutoff, and every entry
+# older than the cutoff drew a lower id. The role must see the app's other sessions in
+# pg_stat_activity (same role or pg_read_all_stats).
+COMPACTABLE_SQL = {
+    "postgresql": text(
+        "wallet_transactions.created_at < LEAST("
+        "clock_timestamp() - make_interval(secs => :lag), "
+        "(SELECT min(xact_start) - interval '1 second' FROM pg_stat_activity "
+        "WHERE backend_xid IS NOT NULL AND datname = current_database()))"
+    ),
+    # One writer at a time: uncommitted ids are above every committed one
+    "sqlite": text(
+        "wallet_transactions.created_at < datetime('now', '-' || :lag || ' seconds')"
+    ),
+}
+
+
+def _compaction_upto_stmt(dialect: str, watermark: int, lag: float, batch_size: int):
+    """Highest id among the next `batch_size` committed entries `lag` seconds old."""
+    ids = (
+        select(WalletTransaction.id)
+        .where(
+            WalletTransaction.id > watermark,
+            COMPACTABLE_SQL[dialect].bindparams(lag=lag),
+        )
+        .order_by(WalletTransaction.id)
+        .limit(batch_size)
+        .subquery()
+    )
+    return select(func.max(ids.c.id))
+
+
+def _compact_stmt(watermark: int, upto: int):
+    """Folds every entry up to `upto` into the snapshots of the wallets it touches."""
+    folded = (
+        select(func.coalesce(func.sum(WalletTransaction.amount), 0))
+        .where(
+            WalletTransaction.user_id == Wallet.user_id,
+            WalletTransaction.id > Wallet.snapshot_txn_id,
+            WalletTransaction.id <= upto,
+        )
+        .scalar_subquery()
+    )
+    touched = select(WalletTransaction.user_id).where(
+        WalletTransaction.id > watermark, WalletTransaction.id <= upto
+    )
+    return (
+        update(Wallet)
+        .where(Wallet.user_id.in_(touched), Wallet.snapshot_txn_id < upto)
+        .values(snapshot_balance=Wallet.snapshot_balance + folded, snapshot_txn_id=upto)
+        .execution_options(synchronize_session=False)
+    )
 
 
 class WalletRepository:
@@ -9,20 +103,105 @@ class WalletRepository:
     def get_by_user_id(self, user_id: int) -> Wallet:
         return self.db.query(Wallet).filter(Wallet.user_id == user_id).first()
 
-    def get_by_user_id_for_update(self, user_id: int) -> Wallet:
+    def get_balance(self, user_id: int) -> Optional[float]:
+        """Current balance, or None if the user has no wallet."""
+        minor = self.db.execute(_balance_stmt(user_id)).scalar_one_or_none()
+        return None if minor is None else from_minor(minor)
+
+    def debit(
+        self,
+        user_id: int,
+        amount: int,
+        kind: str = "bet",
+        game: Optional[BlackjackGame] = None,
+    ) -> Optional[float]:
         """
-        Locks the wallet row for the current transaction.
-        Crucial for preventing double-spending in concurrent games.
+        Appends a debit of `amount` minor units if the balance covers it. The
+        wallet row is locked (not updated) for the rest of the transaction so
+        concurrent debits can't both pass the check. Returns the new balance,
+        or None if funds are insufficient or the wallet doesn't exist.
         """
-        return (
-            self.db.query(Wallet)
-            .filter(Wallet.user_id == user_id)
-            .with_for_update()
-            .first()
-        )
+        balance = self.db.execute(
+            _balance_stmt(user_id, for_update=True)
+        ).scalar_one_or_none()
+        if balance is None or balance < amount:
+            return None
+        self.db.add(_entry(user_id, -amount, kind, game))
+        return from_minor(balance - amount)
+
+    def credit(
+        self,
+        user_id: int,
+        amount: int,
+        kind: str,
+        game: Optional[BlackjackGame] = None,
+        game_id: Optional[int] = None,
+    ) -> WalletTransaction:
+        """
+        Appends a credit of `amount` minor units; a pure INSERT at flush, no
+        wallet read or lock. Link it with `game` (may be unflushed) or a known
+        `game_id`.
+        """
+        entry = _entry(user_id, amount, kind, game, game_id)
+        self.db.add(entry)
+        return entry
+
+    def snapshot_watermark(self) -> int:
+        """Every ledger entry up to this id is already folded into a snapshot."""
+        return self.db.execute(select(func.max(Wallet.snapshot_txn_id))).scalar() or 0
+
+    def compact(self, watermark: int, lag: float, batch_size: int) -> int:
+        """
+        Rolls snapshots forward over the next batch of entries at least `lag`
+        seconds old (see COMPACTABLE_SQL). Returns the new watermark
+        (unchanged if nothing to do).
+        """
+        dialect = self.db.get_bind().dialect.name
+        upto = self.db.execute(
+            _compaction_upto_stmt(dialect, watermark, lag, batch_size)
+        ).scalar()
+        if upto is None:
+            return watermark
+        self.db.execute(_compact_stmt(watermark, upto))
+        return upto
+
+
+class AsyncWalletRepository:
+    """Async counterpart of WalletRepository (DB_ASYNC_MODE)."""
+
+    def __init__(self, db: "AsyncSession"):
+        self.db = db
+
+    async def get_by_user_id(self, user_id: int) -> Optional[Wallet]:
+        result = await self.db.execute(select(Wallet).where(Wallet.user_id == user_id))
+        return result.scalars().first()
+
+    async def get_balance(self, user_id: int) -> Optional[float]:
+        result = await self.db.execute(_balance_stmt(user_id))
+        minor = result.scalar_one_or_none()
+        return None if minor is None else from_minor(minor)
+
+    async def debit(
+        self,
+        user_id: int,
+        amount: int,
+        kind: str = "bet",
+        game: Optional[BlackjackGame] = None,
+    ) -> Optional[float]:
+        result = await self.db.execute(_balance_stmt(user_id, for_update=True))
+        balance = result.scalar_one_or_none()
+        if balance is None or balance < amount:
+            return None
+        self.db.add(_entry(user_id, -amount, kind, game))
+        return from_minor(balance - amount)
 
-    def update(self, wallet: Wallet) -> Wallet:
-        self.db.add(wallet)
-        # Flush ensures changes are sent to DB but transaction remains open for service logic
-        self.db.flush()
-        return wallet
+    async def credit(
+        self,
+        user_id: int,
+        amount: int,
+        kind: str,
+        game: Optional[BlackjackGame] = None,
+    ) -> WalletTransaction:
+        entry = _entry(user_id, amount, kind, game)
+        self.db.add(entry)
+        return entry
@@ -1,9 +1,26 @@
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Union, Optional
+from pydantic import BaseModel, Field, ConfigDict, model_validator
+from typing import Dict, List, Literal, Union, Optional
+from app.core.money import Amount
 
 
 class GameStartRequest(BaseModel):
-    bet_amount: float = Field(..., gt=0, description="The amount you want to wager")
+    bet_amount: Amount = Field(..., gt=0, description="The amount you want to wager")
+
+
+class WsAction(BaseModel):
+    """One WebSocket frame's action; its "id" is echoed back and not validated."""
+
+    op: Literal["start", "hit", "stand", "get"]
+    bet_amount: Optional[Amount] = Field(None, gt=0)
+    game_id: Optional[int] = None
+
+    @model_validator(mode="after")
+    def _check_arguments(self) -> "WsAction":
+        if self.op == "start" and self.bet_amount is None:
+            raise ValueError("bet_amount is required")
+        if self.op != "start" and self.game_id is None:
+            raise ValueError("game_id is required")
+        return self
 
 
 class GameData(BaseModel):
@@ -25,3 +42,47 @@ class GameResponse(BaseModel):
     success: bool
     data: Optional[GameData] = None
     message: Optional[str] = None
+
+
+class AdviceData(BaseModel):
+    game_id: int
+    player_score: int
+    dealer_up_card: str
+    stand_ev: float  # Expected net result per unit bet
+    hit_ev: float
+    recommendation: str  # "hit" or "stand"
+    dealer_outcomes: Dict[str, float]  # Final dealer total (or "bust") -> probability
+
+
+class AdviceResponse(BaseModel):
+    success: bool
+    data: Optional[AdviceData] = None
+    message: Optional[str] = None
+
+
+class GameHistoryPage(BaseModel):
+    items: List[GameData]
+    next_cursor: Optional[int] = None  # Pass as ?cursor= for the next page
+
+
+class GameHistoryResponse(BaseModel):
+    success: bool
+    data: Optional[GameHistoryPage] = None
+    message: Optional[str] = None
+
+
+class PlayerStatsData(BaseModel):
+    hands_played: int
+    wins: int
+    losses: int
+    pushes: int
+    blackjacks: int
+    total_wagered: float
+    net_result: float  # Payouts minus bets
+    biggest_win: float  # Best net result of a single hand
+
+
+class PlayerStatsResponse(BaseModel):
+    success: bool
+    data: Optional[PlayerStatsData] = None
+    message: Optional[str] = None
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
+from app.core.money import Amount
 
 
 class WalletBase(BaseModel):
@@ -7,7 +8,7 @@ class WalletBase(BaseModel):
 
 
 class WalletDeposit(BaseModel):
-    amount: float = Field(..., gt=0, description="Amount to add to wallet")
+    amount: Amount = Field(..., gt=0, description="Amount to add to wallet")
 
 
 class WalletOut(WalletBase):
@@ -1,38 +1,120 @@
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
 from app.core import security
-from app.repositories.user_repository import UserRepository
+from app.db.session import SessionLocal
+from app.repositories.user_repository import AsyncUserRepository, UserRepository
 from app.schemas.user_schema import UserCreate, Token
+from app.core.metrics import timed
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+username_taken = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Username already registered",
+)
 
 
 class AuthService:
-    def __init__(self, db: Session):
-        self.db = db
-        self.user_repo = UserRepository(db)
+    """
+    Sync-session auth. The methods are coroutines so the routes can await
+    the bcrypt pool instead of parking a request thread on it. Each DB step
+    is one threadpool call with its own short session, so a login storm
+    holds neither threads nor pool connections while hashing.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+
+    def _username_taken(self, username: str) -> bool:
+        with self.session_factory() as db:
+            return UserRepository(db).get_by_username(username) is not None
+
+    def _create_user(self, username: str, hashed_password: str) -> int:
+        with self.session_factory() as db:
+            try:
+                user = UserRepository(db).create_user_with_wallet(
+                    username, hashed_password
+                )
+            except IntegrityError:
+                # Registered concurrently since the check
+                raise username_taken
+            return user.id
+
+    def _credentials(self, username: str) -> Optional[Tuple[int, str]]:
+        with self.session_factory() as db:
+            user = UserRepository(db).get_by_username(username)
+            return (user.id, user.hashed_password) if user else None
+
+    @timed("auth.register_user")
+    async def register_user(self, user_in: UserCreate) -> Token:
+        if await run_in_threadpool(self._username_taken, user_in.username):
+            raise username_taken
+        hashed_pw = await security.password_hasher.hash_async(user_in.password)
+        user_id = await run_in_threadpool(
+            self._create_user, user_in.username, hashed_pw
+        )
+
+        access_token = security.create_access_token(subject=user_id)
+        return Token(access_token=access_token, token_type="bearer")
 
-    def register_user(self, user_in: UserCreate) -> Token:
-        if self.user_repo.get_by_username(user_in.username):
+    @timed("auth.authenticate")
+    async def authenticate(self, username: str, password: str) -> Token:
+        credentials = await run_in_threadpool(self._credentials, username)
+        if not credentials or not await security.password_hasher.verify_async(
+            password, credentials[1]
+        ):
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already registered",
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect username or password",
             )
 
-        hashed_pw = security.get_password_hash(user_in.password)
-        user = self.user_repo.create_user_with_wallet(user_in.username, hashed_pw)
+        access_token = security.create_access_token(subject=credentials[0])
+        return Token(access_token=access_token, token_type="bearer")
+
+
+class AsyncAuthService:
+    """Async counterpart of AuthService (DB_ASYNC_MODE)."""
+
+    def __init__(self, db: "AsyncSession"):
+        self.db = db
+        self.user_repo = AsyncUserRepository(db)
+
+    @timed("auth.register_user")
+    async def register_user(self, user_in: UserCreate) -> Token:
+        taken = await self.user_repo.get_by_username(user_in.username) is not None
+        await self.db.rollback()  # hand the connection back while hashing
+        if taken:
+            raise username_taken
+
+        hashed_pw = await security.password_hasher.hash_async(user_in.password)
+        try:
+            user = await self.user_repo.create_user_with_wallet(
+                user_in.username, hashed_pw
+            )
+        except IntegrityError:
+            await self.db.rollback()
+            raise username_taken
 
         access_token = security.create_access_token(subject=user.id)
         return Token(access_token=access_token, token_type="bearer")
 
-    def authenticate(self, username: str, password: str) -> Token:
-        print("USERNAME", username)
-        print("PASSWORD", password)
-        user = self.user_repo.get_by_username(username)
-        print("LOGIN USER", user)
-        if not user or not security.verify_password(password, user.hashed_password):
+    @timed("auth.authenticate")
+    async def authenticate(self, username: str, password: str) -> Token:
+        user = await self.user_repo.get_by_username(username)
+        credentials = (user.id, user.hashed_password) if user else None
+        await self.db.rollback()  # hand the connection back while verifying
+        if not credentials or not await security.password_hasher.verify_async(
+            password, credentials[1]
+        ):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
             )
 
-        access_token = security.create_access_token(subject=user.id)
+        access_token = security.create_access_token(subject=credentials[0])
         return Token(access_token=access_token, token_type="bearer")
@@ -0,0 +1,190 @@
+import json
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Type
+
+from app.core.logger import get_logger
+from app.services.blackjack_engine import BlackjackEngine
+
+logger = get_logger(__name__)
+
+BUST = 0  # Final-total key for a busted dealer
+
+# Dealer final-total distribution per up-card value: {up: {final: p}}
+DealerTable = Dict[int, Dict[int, float]]
+RulesKey = Tuple
+
+
+def rules_key(engine: Type[BlackjackEngine] = BlackjackEngine) -> RulesKey:
+    """Everything dealer_play and determine_result depend on."""
+    return (
+        tuple(engine.CARD_VALUES[card] for card in engine.CARDS),
+        engine.CARD_VALUES["A"],
+        engine.DEALER_STANDS_ON,
+        engine.BLACKJACK,
+    )
+
+
+def _add_card(
+    total: int, soft: int, value: int, ace: int, bj: int
+) -> Tuple[int, int]:
+    """
+    Adds one card the way calculate_score would score the hand; `soft` counts
+    aces still valued at 11 (at most one once the hand is normalized).
+    """
+    total += value
+    if value == ace:
+        soft += 1
+    while total > bj and soft:
+        total -= 10
+        soft -= 1
+    return total, soft
+
+
+def build_dealer_table(key: RulesKey) -> DealerTable:
+    """
+    Exact final-total probabilities for every dealer up-card on an infinite
+    deck, by memoized recursion over (total, soft) dealer states.
+    """
+    values, ace, stands_on, bj = key
+    p_card = 1 / len(values)
+
+    @lru_cache(maxsize=None)
+    def finals(total: int, soft: int) -> Tuple[Tuple[int, float], ...]:
+        if total > bj:
+            return ((BUST, 1.0),)
+        if total >= stands_on:
+            return ((total, 1.0),)
+        dist: Dict[int, float] = {}
+        for value in values:
+            for final, p in finals(*_add_card(total, soft, value, ace, bj)):
+                dist[final] = dist.get(final, 0.0) + p * p_card
+        return tuple(sorted(dist.items()))
+
+    return {
+        up: dict(finals(*_add_card(0, 0, up, ace, bj)))
+        for up in sorted(set(values))
+    }
+
+
+_tables: Dict[RulesKey, DealerTable] = {}
+_tables_lock = threading.Lock()
+
+
+def get_dealer_table(engine: Type[BlackjackEngine] = BlackjackEngine) -> DealerTable:
+    """Returns the table for the engine's current rules, building it once."""
+    key = rules_key(engine)
+    table = _tables.get(key)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(key)
+            if table is None:
+                table = _tables[key] = build_dealer_table(key)
+    return table
+
+
+def save_dealer_table(
+    path: str, engine: Type[BlackjackEngine] = BlackjackEngine
+) -> None:
+    table = get_dealer_table(engine)
+    payload = {
+        "rules": list(rules_key(engine)),
+        "table": {
+            str(up): {str(final): p for final, p in dist.items()}
+            for up, dist in table.items()
+        },
+    }
+    Path(path).write_text(json.dumps(payload))
+
+
+def load_dealer_table(
+    path: Optional[str], engine: Type[BlackjackEngine] = BlackjackEngine
+) -> None:
+    """
+    Warms the cache at startup, from `path` when it holds a table for the
+    current rules, otherwise by building it (and writing it back to `path`).
+    """
+    key = rules_key(engine)
+    if path and Path(path).exists():
+        payload = json.loads(Path(path).read_text())
+        stored = tuple(
+            tuple(item) if isinstance(item, list) else item
+            for item in payload["rules"]
+        )
+        if stored == key:
+            with _tables_lock:
+                _tables[key] = {
+                    int(up): {int(final): p for final, p in dist.items()}
+                    for up, dist in payload["table"].items()
+                }
+            return
+        logger.warning("Dealer table at %s is for other rules; rebuilding", path)
+
+    get_dealer_table(engine)
+    if path:
+        save_dealer_table(path, engine)
+
+
+def _hand_state(hand: List[str], engine: Type[BlackjackEngine]) -> Tuple[int, int]:
+    _, ace, _, bj = rules_key(engine)
+    total, soft = 0, 0
+    for card in hand:
+        total, soft = _add_card(total, soft, engine.CARD_VALUES[card], ace, bj)
+    return total, soft
+
+
+def advise(
+    player_hand: List[str],
+    dealer_up_card: str,
+    engine: Type[BlackjackEngine] = BlackjackEngine,
+) -> Dict:
+    """
+    Exact EV (per unit bet) of standing vs. hitting for an active hand, assuming
+    optimal play after a hit. Dealer odds come from the cached table; the
+    player side is a small memoized recursion over (total, soft).
+    """
+    values, ace, _, bj = rules_key(engine)
+    p_card = 1 / len(values)
+    dealer = get_dealer_table(engine)[engine.CARD_VALUES[dealer_up_card]]
+
+    win = engine.PAYOUT_MULTIPLIERS["player_win"] - 1
+    push = engine.PAYOUT_MULTIPLIERS["push"] - 1
+    loss = engine.PAYOUT_MULTIPLIERS["dealer_win"] - 1
+
+    @lru_cache(maxsize=None)
+    def stand_ev(total: int) -> float:
+        ev = 0.0
+        for final, p in dealer.items():
+            if final == BUST or total > final:
+                ev += p * win
+            elif total == final:
+                ev += p * push
+            else:
+                ev += p * loss
+        return ev
+
+    @lru_cache(maxsize=None)
+    def hit_ev(total: int, soft: int) -> float:
+        ev = 0.0
+        for value in values:
+            new_total, new_soft = _add_card(total, soft, value, ace, bj)
+            if new_total > bj:
+                ev += p_card * loss
+            else:
+                ev += p_card * max(stand_ev(new_total), hit_ev(new_total, new_soft))
+        return ev
+
+    total, soft = _hand_state(player_hand, engine)
+    stand = stand_ev(total)
+    hit = hit_ev(total, soft)
+    return {
+        "player_score": total,
+        "dealer_up_card": dealer_up_card,
+        "stand_ev": stand,
+        "hit_ev": hit,
+        "recommendation": "hit" if hit > stand else "stand",
+        "dealer_outcomes": {
+            ("bust" if final == BUST else str(final)): p for final, p in dealer.items()
+        },
+    }
@@ -1,5 +1,6 @@
-import secrets
-from typing import List, Tuple
+from typing import List, Optional, Tuple, Type
+from app.services.card_rng import EntropyPool, RandomSource
+from app.services.shoe import Shoe
 
 
 class BlackjackEngine:
@@ -29,10 +30,42 @@ class BlackjackEngine:
         "A": 11,
     }
 
+    # Compact storage: each card is its index in CARDS
+    CARD_CODES = {card: code for code, card in enumerate(CARDS)}
+
+    BLACKJACK = 21
+    DEALER_STANDS_ON = 17
+
+    # Card source; swap via with_rng() for deterministic tests
+    rng: RandomSource = EntropyPool()
+
+    # Total returned to the player (stake included) per result
+    PAYOUT_MULTIPLIERS = {
+        "blackjack": 2.5,  # 3 to 2 payout + original bet
+        "player_win": 2.0,  # Double the bet
+        "push": 1.0,  # Return original bet
+        "dealer_win": 0.0,
+    }
+
+    @classmethod
+    def with_rng(cls, rng: RandomSource) -> Type["BlackjackEngine"]:
+        """Returns an engine class that draws cards from the given source."""
+        return type(cls.__name__, (cls,), {"rng": rng})
+
+    @classmethod
+    def new_shoe(cls, decks: int, penetration: float) -> Shoe:
+        """Shuffles a fresh multi-deck shoe using the engine's RNG."""
+        return Shoe.shuffled(decks, penetration, cls.rng, len(cls.CARDS))
+
     @classmethod
-    def draw_card(cls) -> str:
-        """Draws a single card rank using cryptographically secure RNG."""
-        return secrets.choice(cls.CARDS)
+    def draw_card(cls, shoe: Optional[Shoe] = None) -> str:
+        """
+        Draws a single card rank: from the shoe when one is in play, otherwise
+        from the engine's CSPRNG-backed source (infinite deck).
+        """
+        if shoe is not None:
+            return cls.CARDS[shoe.draw()]
+        return cls.CARDS[cls.rng.randbelow(len(cls.CARDS))]
 
     @classmethod
     def calculate_score(cls, hand: List[str]) -> int:
@@ -46,27 +79,62 @@ class BlackjackEngine:
         aces = hand.count("A")
 
         # If score is over 21 and we have aces, convert 11s to 1s
-        while score > 21 and aces > 0:
+        while score > cls.BLACKJACK and aces > 0:
             score -= 10
             aces -= 1
 
         return score
 
+    @classmethod
+    def add_to_score(cls, score: int, soft_aces: int, card: str) -> Tuple[int, int]:
+        """
+        Incremental form of calculate_score: folds one card into a running
+        (score, soft_aces) pair, where soft_aces counts Aces still worth 11.
+        """
+        score += cls.CARD_VALUES[card]
+        if card == "A":
+            soft_aces += 1
+        while score > cls.BLACKJACK and soft_aces > 0:
+            score -= 10
+            soft_aces -= 1
+        return score, soft_aces
+
+    @classmethod
+    def score_state(cls, hand: List[str]) -> Tuple[int, int]:
+        """(score, soft_aces) for a whole hand; score matches calculate_score."""
+        score, soft_aces = 0, 0
+        for card in hand:
+            score, soft_aces = cls.add_to_score(score, soft_aces, card)
+        return score, soft_aces
+
+    @classmethod
+    def encode_hand(cls, hand: List[str]) -> bytes:
+        return bytes(cls.CARD_CODES[card] for card in hand)
+
+    @classmethod
+    def decode_hand(cls, data: bytes) -> List[str]:
+        return [cls.CARDS[code] for code in data]
+
     @classmethod
     def is_blackjack(cls, hand: List[str]) -> bool:
         """Returns True if the initial 2-card hand is exactly 21."""
-        return len(hand) == 2 and cls.calculate_score(hand) == 21
+        return len(hand) == 2 and cls.calculate_score(hand) == cls.BLACKJACK
 
     @classmethod
-    def dealer_play(cls, current_hand: List[str]) -> List[str]:
+    def dealer_play(
+        cls, current_hand: List[str], shoe: Optional[Shoe] = None
+    ) -> List[str]:
         """
         Standard Dealer AI:
         Dealer must hit until their score is at least 17.
         """
         hand = list(current_hand)  # Work on a copy to maintain purity
+        score, soft_aces = cls.score_state(hand)
 
-        while cls.calculate_score(hand) < 17:
-            hand.append(cls.draw_card())
+        while score < cls.DEALER_STANDS_ON:
+            card = cls.draw_card(shoe)
+            hand.append(card)
+            score, soft_aces = cls.add_to_score(score, soft_aces, card)
 
         return hand
 
@@ -76,15 +144,19 @@ class BlackjackEngine:
         Determines the game outcome status.
         Returns: 'player_win', 'dealer_win', 'push', or 'blackjack'
         """
-        p_score = cls.calculate_score(player_hand)
-        d_score = cls.calculate_score(dealer_hand)
+        return cls.compare_scores(
+            cls.calculate_score(player_hand), cls.calculate_score(dealer_hand)
+        )
 
+    @classmethod
+    def compare_scores(cls, p_score: int, d_score: int) -> str:
+        """determine_result for already-computed scores."""
         # 1. Player Bust
-        if p_score > 21:
+        if p_score > cls.BLACKJACK:
             return "dealer_win"
 
         # 2. Dealer Bust
-        if d_score > 21:
+        if d_score > cls.BLACKJACK:
             return "player_win"
 
         # 3. Score Comparison
@@ -96,8 +168,10 @@ class BlackjackEngine:
             return "push"
 
     @classmethod
-    def get_initial_deal(cls) -> Tuple[List[str], List[str]]:
+    def get_initial_deal(
+        cls, shoe: Optional[Shoe] = None
+    ) -> Tuple[List[str], List[str]]:
         """Utility to deal the starting 2 cards for both parties."""
-        player_hand = [cls.draw_card(), cls.draw_card()]
-        dealer_hand = [cls.draw_card(), cls.draw_card()]
+        player_hand = [cls.draw_card(shoe), cls.draw_card(shoe)]
+        dealer_hand = [cls.draw_card(shoe), cls.draw_card(shoe)]
         return player_hand, dealer_hand
@@ -1,124 +1,464 @@
+import asyncio
+from typing import TYPE_CHECKING, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from app.repositories.blackjack_repository import BlackjackRepository
-from app.repositories.wallet_repository import WalletRepository
+from app.core.config import settings
+from app.repositories.blackjack_repository import (
+    AsyncBlackjackRepository,
+    BlackjackRepository,
+)
+from app.repositories.player_stats_repository import (
+    AsyncPlayerStatsRepository,
+    PlayerStatsRepository,
+    empty_stats,
+)
+from app.repositories.shoe_repository import AsyncShoeRepository, ShoeRepository
+from app.repositories.wallet_repository import AsyncWalletRepository, WalletRepository
+from app.services import blackjack_advisor
 from app.services.blackjack_engine import BlackjackEngine
+from app.services.settlement_queue import Settlement, settlement_queue
+from app.services.shoe import Shoe
 from app.models.blackjack_game import BlackjackGame
+from app.models.player_stats import PlayerStats
+from app.models.shoe import BlackjackShoe
 from app.schemas.blackjack_schema import GameData
+from app.core.metrics import timed
+from app.core.money import from_minor, scale_minor, to_minor
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
-class BlackjackService:
+# Columns a settlement writes back to the game row
+SETTLED_COLUMNS = (
+    "player_cards",
+    "player_score",
+    "player_soft_aces",
+    "dealer_cards",
+    "dealer_score",
+    "dealer_soft_aces",
+    "status",
+    "is_over",
+)
+
+
+class _BlackjackServiceBase:
+    """DB-independent helpers shared by the sync and async services."""
+
+    engine: BlackjackEngine
+
+    def _resume_shoe(self, row: Optional[BlackjackShoe], new_round: bool) -> Shoe:
+        """
+        Rebuilds the user's shoe from its row. A fresh one is shuffled when
+        there is none or the deck count changed, and a new round past the cut
+        card reshuffles.
+        """
+        decks = settings.SHOE_DECKS
+        if row is None or row.decks != decks:
+            return self.engine.new_shoe(decks, settings.SHOE_PENETRATION)
+
+        shoe = Shoe(
+            row.cards,
+            row.position,
+            row.cut_index,
+            decks,
+            settings.SHOE_PENETRATION,
+            self.engine.rng,
+            len(self.engine.CARDS),
+        )
+        if new_round and shoe.needs_reshuffle:
+            shoe.reshuffle()
+        return shoe
+
+    def _apply_shoe(
+        self, row: Optional[BlackjackShoe], shoe: Shoe, user_id: int
+    ) -> BlackjackShoe:
+        """Copies shoe state back; the card array is only rewritten on reshuffle."""
+        if row is None:
+            row = BlackjackShoe(user_id=user_id)
+        if shoe.reshuffled or row.cards is None:
+            row.cards = shoe.cards
+            row.decks = shoe.decks
+            row.cut_index = shoe.cut_index
+        row.position = shoe.position
+        return row
+
+    def _new_game(self, user_id: int, bet_amount: float) -> BlackjackGame:
+        return BlackjackGame(
+            user_id=user_id,
+            bet_minor=to_minor(bet_amount),
+            status="active",
+            is_over=False,
+        )
+
+    def _close_game(self, game: BlackjackGame, result: str) -> int:
+        """Marks the game finished and returns the payout owed, in minor units."""
+        game.status = result
+        game.is_over = True
+        return scale_minor(game.bet_minor, self.engine.PAYOUT_MULTIPLIERS[result])
+
+    def _queued_settlement(
+        self,
+        game: BlackjackGame,
+        result: str,
+        loaded_cards: bytes,
+        shoe_row: Optional[BlackjackShoe],
+        shoe: Optional[Shoe],
+    ) -> Optional[Settlement]:
+        """
+        Closes the game and packages its writes for the group-commit queue.
+        None when the queue is off (or the shoe row is new, which needs an
+        INSERT); the caller then settles inline.
+        """
+        if not settlement_queue.enabled or (shoe is not None and shoe_row is None):
+            return None
+        payout = self._close_game(game, result)
+        shoe_values = None
+        if shoe is not None:
+            shoe_values = {"position": shoe.position}
+            if shoe.reshuffled:
+                shoe_values.update(
+                    cards=shoe.cards, decks=shoe.decks, cut_index=shoe.cut_index
+                )
+        return Settlement(
+            game_id=game.id,
+            user_id=game.user_id,
+            expected_player_cards=loaded_cards,
+            game_values={name: getattr(game, name) for name in SETTLED_COLUMNS},
+            payout=payout,
+            bet_minor=game.bet_minor,
+            shoe_values=shoe_values,
+        )
+
+    def _advise(self, game: BlackjackGame, user_id: int) -> dict:
+        """Exact hit/stand EV from the player's view (dealer hole card unknown)."""
+        if not game or game.user_id != user_id or game.is_over:
+            raise HTTPException(
+                status_code=400, detail="Invalid game or game already finished"
+            )
+        advice = blackjack_advisor.advise(
+            game.player_hand, game.dealer_hand[0], type(self.engine)
+        )
+        return {"game_id": game.id, **advice}
+
+    def _history_page(self, games: List[BlackjackGame], limit: int) -> dict:
+        """Formats a page fetched with limit + 1 rows (the extra row means more)."""
+        page = games[:limit]
+        return {
+            "items": [self.get_game_state_formatted(game) for game in page],
+            "next_cursor": page[-1].id if len(games) > limit else None,
+        }
+
+    def _stats_data(self, row: Optional[PlayerStats]) -> dict:
+        """Player stats in API units; all zero before the first settled hand."""
+        stats = empty_stats()
+        if row is not None:
+            stats = {name: getattr(row, name) for name in stats}
+        for name in ("total_wagered", "net_result", "biggest_win"):
+            stats[name] = from_minor(stats[name])
+        return stats
+
+    def get_game_state_formatted(self, game: BlackjackGame) -> dict:
+        """Logic to hide dealer's second card if game is active."""
+        dealer_hand = game.dealer_hand
+        dealer_score = None
+
+        if not game.is_over:
+            # Hide second card for player
+            dealer_hand = [dealer_hand[0], "??"]
+            dealer_score = self.engine.CARD_VALUES[dealer_hand[0]]
+        else:
+            dealer_score = game.dealer_score
+
+        return {
+            "game_id": game.id,
+            "player_hand": game.player_hand,
+            "dealer_hand": dealer_hand,
+            "player_score": game.player_score,
+            "dealer_score": dealer_score,
+            "status": game.status,
+            "is_over": game.is_over,
+            "bet_amount": game.bet_amount,
+        }
+
+
+class BlackjackService(_BlackjackServiceBase):
     def __init__(self, db: Session):
         self.db = db
         self.repo = BlackjackRepository(db)
         self.wallet_repo = WalletRepository(db)
+        self.shoe_repo = ShoeRepository(db)
+        self.stats_repo = PlayerStatsRepository(db)
         self.engine = BlackjackEngine()
 
+    def _load_shoe(
+        self, user_id: int, new_round: bool = False
+    ) -> Tuple[Optional[BlackjackShoe], Optional[Shoe]]:
+        """Locks and resumes the user's shoe; (None, None) on the infinite deck."""
+        if not settings.SHOE_DECKS:
+            return None, None
+        row = self.shoe_repo.get_for_update(user_id)
+        return row, self._resume_shoe(row, new_round)
+
+    def _save_shoe(
+        self, user_id: int, row: Optional[BlackjackShoe], shoe: Optional[Shoe]
+    ) -> None:
+        if shoe is not None:
+            self.shoe_repo.save(self._apply_shoe(row, shoe, user_id))
+
+    @timed("blackjack.start_game")
     def start_game(self, user_id: int, bet_amount: float) -> BlackjackGame:
-        # 1. Check for existing active game
+        # 1. Deduct funds (ledger entry; linked to the game once it's flushed).
+        # The debit locks the wallet row, so concurrent starts for one user
+        # queue here and each sees the game the previous one committed.
+        game = self._new_game(user_id, bet_amount)
+        if self.wallet_repo.debit(user_id, game.bet_minor, game=game) is None:
+            raise HTTPException(status_code=400, detail="Insufficient funds")
+
+        # 2. Check for existing active game
         if self.repo.get_active_game(user_id):
+            self.db.rollback()
             raise HTTPException(
                 status_code=400, detail="Finish your current game first"
             )
 
-        # 2. Lock wallet and deduct funds (Pessimistic lock via Repository)
-        wallet = self.wallet_repo.get_by_user_id_for_update(user_id)
-        if not wallet or wallet.balance < bet_amount:
-            raise HTTPException(status_code=400, detail="Insufficient funds")
-
-        wallet.balance -= bet_amount
-
         # 3. Deal initial hands
-        p_hand, d_hand = self.engine.get_initial_deal()
-
-        game = BlackjackGame(
-            user_id=user_id,
-            bet_amount=bet_amount,
-            player_hand=p_hand,
-            dealer_hand=d_hand,
-            status="active",
-            is_over=False,
-        )
+        shoe_row, shoe = self._load_shoe(user_id, new_round=True)
+        p_hand, d_hand = self.engine.get_initial_deal(shoe)
+        self._save_shoe(user_id, shoe_row, shoe)
+        game.player_hand = p_hand
+        game.dealer_hand = d_hand
 
         # 4. Immediate Blackjack check (Natural 21)
         if self.engine.is_blackjack(p_hand):
-            self._settle_game(game, wallet, "blackjack")
+            self._settle_game(game, "blackjack")
 
         self.repo.create(game)
         self.db.commit()  # Atomic: bet deducted and game created together
         return game
 
+    @timed("blackjack.hit")
     def hit(self, user_id: int, game_id: int) -> BlackjackGame:
-        game = self.repo.get_by_id(game_id)
-        if not game or game.user_id != user_id or game.is_over:
+        game = self.repo.get_playable_for_update(game_id, user_id)
+        if not game:
             raise HTTPException(
                 status_code=400, detail="Invalid game or game already finished"
             )
 
-        # Draw card
-        game.player_hand.append(self.engine.draw_card())
+        # Draw card; the running score is updated in place
+        loaded_cards = game.player_cards
+        shoe_row, shoe = self._load_shoe(user_id)
+        game.add_player_card(self.engine.draw_card(shoe))
 
         # Check if player busted
-        if self.engine.calculate_score(game.player_hand) > 21:
-            wallet = self.wallet_repo.get_by_user_id_for_update(user_id)
-            self._settle_game(game, wallet, "dealer_win")
+        if game.player_score > self.engine.BLACKJACK:
+            self._finish_game(
+                game,
+                "dealer_win",
+                loaded_cards,
+                shoe_row,
+                shoe,
+                "Invalid game or game already finished",
+            )
+            return game
 
+        self._save_shoe(user_id, shoe_row, shoe)
         self.db.commit()
         return game
 
+    @timed("blackjack.stand")
     def stand(self, user_id: int, game_id: int) -> BlackjackGame:
-        game = self.repo.get_by_id(game_id)
-        if not game or game.user_id != user_id or game.is_over:
+        game = self.repo.get_playable_for_update(game_id, user_id)
+        if not game:
             raise HTTPException(status_code=400, detail="Invalid game state")
 
         # Dealer takes their turn
-        game.dealer_hand = self.engine.dealer_play(game.dealer_hand)
+        loaded_cards = game.player_cards
+        shoe_row, shoe = self._load_shoe(user_id)
+        game.dealer_hand = self.engine.dealer_play(game.dealer_hand, shoe)
 
         # Determine result
-        result = self.engine.determine_result(game.player_hand, game.dealer_hand)
+        result = self.engine.compare_scores(game.player_score, game.dealer_score)
 
         # Settle funds
-        wallet = self.wallet_repo.get_by_user_id_for_update(user_id)
-        self._settle_game(game, wallet, result)
+        self._finish_game(
+            game, result, loaded_cards, shoe_row, shoe, "Invalid game state"
+        )
+        return game
 
-        self.db.commit()
+    def _finish_game(
+        self,
+        game: BlackjackGame,
+        result: str,
+        loaded_cards: bytes,
+        shoe_row: Optional[BlackjackShoe],
+        shoe: Optional[Shoe],
+        stale_detail: str,
+    ) -> None:
+        """Settles and commits a finished hand, via the group-commit queue if on."""
+        settlement = self._queued_settlement(game, result, loaded_cards, shoe_row, shoe)
+        if settlement is None:
+            self._save_shoe(game.user_id, shoe_row, shoe)
+            self._settle_game(game, result)
+            self.db.commit()
+            return
+
+        # Release the row locks before waiting; the worker re-checks the game
+        self.db.expunge(game)
+        self.db.rollback()
+        if not settlement_queue.submit(settlement).result():
+            raise HTTPException(status_code=400, detail=stale_detail)
+
+    def _settle_game(self, game: BlackjackGame, result: str) -> None:
+        """Internal helper to close the game, credit any payout and count it."""
+        payout = self._close_game(game, result)
+        if payout > 0:
+            self.wallet_repo.credit(game.user_id, payout, kind="payout", game=game)
+        self.stats_repo.record(game.user_id, result, game.bet_minor, payout)
+
+    def get_stats(self, user_id: int) -> dict:
+        return self._stats_data(self.stats_repo.get(user_id))
+
+    def get_advice(self, user_id: int, game_id: int) -> dict:
+        return self._advise(self.repo.get_by_id(game_id), user_id)
+
+    def get_history(
+        self, user_id: int, limit: int, cursor: Optional[int] = None
+    ) -> dict:
+        games = self.repo.get_user_history(user_id, limit + 1, before_id=cursor)
+        return self._history_page(games, limit)
+
+
+class AsyncBlackjackService(_BlackjackServiceBase):
+    """Async counterpart of BlackjackService (DB_ASYNC_MODE)."""
+
+    def __init__(self, db: "AsyncSession"):
+        self.db = db
+        self.repo = AsyncBlackjackRepository(db)
+        self.wallet_repo = AsyncWalletRepository(db)
+        self.shoe_repo = AsyncShoeRepository(db)
+        self.stats_repo = AsyncPlayerStatsRepository(db)
+        self.engine = BlackjackEngine()
+
+    async def _load_shoe(
+        self, user_id: int, new_round: bool = False
+    ) -> Tuple[Optional[BlackjackShoe], Optional[Shoe]]:
+        if not settings.SHOE_DECKS:
+            return None, None
+        row = await self.shoe_repo.get_for_update(user_id)
+        return row, self._resume_shoe(row, new_round)
+
+    async def _save_shoe(
+        self, user_id: int, row: Optional[BlackjackShoe], shoe: Optional[Shoe]
+    ) -> None:
+        if shoe is not None:
+            await self.shoe_repo.save(self._apply_shoe(row, shoe, user_id))
+
+    @timed("blackjack.start_game")
+    async def start_game(self, user_id: int, bet_amount: float) -> BlackjackGame:
+        game = self._new_game(user_id, bet_amount)
+        if await self.wallet_repo.debit(user_id, game.bet_minor, game=game) is None:
+            raise HTTPException(status_code=400, detail="Insufficient funds")
+
+        if await self.repo.get_active_game(user_id):
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=400, detail="Finish your current game first"
+            )
+
+        shoe_row, shoe = await self._load_shoe(user_id, new_round=True)
+        p_hand, d_hand = self.engine.get_initial_deal(shoe)
+        await self._save_shoe(user_id, shoe_row, shoe)
+        game.player_hand = p_hand
+        game.dealer_hand = d_hand
+
+        if self.engine.is_blackjack(p_hand):
+            await self._settle_game(game, "blackjack")
+
+        await self.repo.create(game)
+        await self.db.commit()
         return game
 
-    def _settle_game(self, game: BlackjackGame, wallet, result: str):
-        """Internal helper to calculate payouts and close game."""
-        game.status = result
-        game.is_over = True
+    @timed("blackjack.hit")
+    async def hit(self, user_id: int, game_id: int) -> BlackjackGame:
+        game = await self.repo.get_playable_for_update(game_id, user_id)
+        if not game:
+            raise HTTPException(
+                status_code=400, detail="Invalid game or game already finished"
+            )
+
+        loaded_cards = game.player_cards
+        shoe_row, shoe = await self._load_shoe(user_id)
+        game.add_player_card(self.engine.draw_card(shoe))
+
+        if game.player_score > self.engine.BLACKJACK:
+            await self._finish_game(
+                game,
+                "dealer_win",
+                loaded_cards,
+                shoe_row,
+                shoe,
+                "Invalid game or game already finished",
+            )
+            return game
+
+        await self._save_shoe(user_id, shoe_row, shoe)
+        await self.db.commit()
+        return game
+
+    @timed("blackjack.stand")
+    async def stand(self, user_id: int, game_id: int) -> BlackjackGame:
+        game = await self.repo.get_playable_for_update(game_id, user_id)
+        if not game:
+            raise HTTPException(status_code=400, detail="Invalid game state")
 
-        payout = 0
-        if result == "blackjack":
-            payout = game.bet_amount * 2.5  # 3 to 2 payout + original bet
-        elif result == "player_win":
-            payout = game.bet_amount * 2  # Double the bet
-        elif result == "push":
-            payout = game.bet_amount  # Return original bet
+        loaded_cards = game.player_cards
+        shoe_row, shoe = await self._load_shoe(user_id)
+        game.dealer_hand = self.engine.dealer_play(game.dealer_hand, shoe)
 
+        result = self.engine.compare_scores(game.player_score, game.dealer_score)
+
+        await self._finish_game(
+            game, result, loaded_cards, shoe_row, shoe, "Invalid game state"
+        )
+        return game
+
+    async def _finish_game(
+        self,
+        game: BlackjackGame,
+        result: str,
+        loaded_cards: bytes,
+        shoe_row: Optional[BlackjackShoe],
+        shoe: Optional[Shoe],
+        stale_detail: str,
+    ) -> None:
+        settlement = self._queued_settlement(game, result, loaded_cards, shoe_row, shoe)
+        if settlement is None:
+            await self._save_shoe(game.user_id, shoe_row, shoe)
+            await self._settle_game(game, result)
+            await self.db.commit()
+            return
+
+        self.db.expunge(game)
+        await self.db.rollback()
+        if not await asyncio.wrap_future(settlement_queue.submit(settlement)):
+            raise HTTPException(status_code=400, detail=stale_detail)
+
+    async def _settle_game(self, game: BlackjackGame, result: str) -> None:
+        payout = self._close_game(game, result)
         if payout > 0:
-            wallet.balance += payout
+            await self.wallet_repo.credit(
+                game.user_id, payout, kind="payout", game=game
+            )
+        await self.stats_repo.record(game.user_id, result, game.bet_minor, payout)
 
-    def get_game_state_formatted(self, game: BlackjackGame) -> dict:
-        """Logic to hide dealer's second card if game is active."""
-        dealer_hand = game.dealer_hand
-        dealer_score = None
+    async def get_stats(self, user_id: int) -> dict:
+        return self._stats_data(await self.stats_repo.get(user_id))
 
-        if not game.is_over:
-            # Hide second card for player
-            dealer_hand = [game.dealer_hand[0], "??"]
-            dealer_score = self.engine.calculate_score([game.dealer_hand[0]])
-        else:
-            dealer_score = self.engine.calculate_score(game.dealer_hand)
+    async def get_advice(self, user_id: int, game_id: int) -> dict:
+        return self._advise(await self.repo.get_by_id(game_id), user_id)
 
-        return {
-            "game_id": game.id,
-            "player_hand": game.player_hand,
-            "dealer_hand": dealer_hand,
-            "player_score": self.engine.calculate_score(game.player_hand),
-            "dealer_score": dealer_score,
-            "status": game.status,
-            "is_over": game.is_over,
-            "bet_amount": game.bet_amount,
-        }
+    async def get_history(
+        self, user_id: int, limit: int, cursor: Optional[int] = None
+    ) -> dict:
+        games = await self.repo.get_user_history(user_id, limit + 1, before_id=cursor)
+        return self._history_page(games, limit)
@@ -0,0 +1,371 @@
+"""
+Vectorized Monte Carlo simulator for the BlackjackEngine rules.
+
+Plays hands in NumPy batches using the engine's own card values, ace
+handling, dealer threshold and payout multipliers, so re-running it after a
+rule change re-certifies the RTP / house edge. Batches are spread across a
+process pool.
+
+With `decks` set it deals from multi-deck shoes like the service does with
+SHOE_DECKS: many shoes play side by side, each reshuffled at the start of
+the first round after its cut card (or on the spot if a round runs out).
+The CLI defaults to the service's SHOE_DECKS / SHOE_PENETRATION settings.
+
+    python -m app.services.blackjack_simulator --hands 10000000 --workers 8
+
+Requires numpy.
+"""
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.services.blackjack_engine import BlackjackEngine
+from app.services.shoe import SUITS, Shoe
+
+# Outcome codes, indexing into OUTCOMES
+OUTCOMES = ["dealer_win", "push", "player_win", "blackjack"]
+LOSS, PUSH, WIN, NATURAL = range(len(OUTCOMES))
+
+CARD_VALUES = np.array(
+    [BlackjackEngine.CARD_VALUES[card] for card in BlackjackEngine.CARDS],
+    dtype=np.int16,
+)
+ACE_VALUE = BlackjackEngine.CARD_VALUES["A"]
+PAYOUTS = np.array(
+    [BlackjackEngine.PAYOUT_MULTIPLIERS[outcome] for outcome in OUTCOMES]
+)
+
+# Shoes played side by side per chunk; each plays hands/SHOE_LANES rounds
+SHOE_LANES = 10_000
+
+# draw(mask) -> one card index per hand; only hands in mask take a card
+Draw = Callable[[np.ndarray], np.ndarray]
+
+
+def _add_cards(
+    totals: np.ndarray, soft_aces: np.ndarray, cards: np.ndarray, mask: np.ndarray
+) -> None:
+    """
+    Adds card indices to the hands selected by mask, in place.
+    Mirrors calculate_score: aces count 11 and drop to 1 while over 21.
+    """
+    values = CARD_VALUES[cards]
+    totals += np.where(mask, values, 0)
+    soft_aces += (mask & (values == ACE_VALUE)).astype(soft_aces.dtype)
+
+    over = (totals > BlackjackEngine.BLACKJACK) & (soft_aces > 0)
+    while over.any():
+        totals -= np.where(over, 10, 0).astype(totals.dtype)
+        soft_aces -= over.astype(soft_aces.dtype)
+        over = (totals > BlackjackEngine.BLACKJACK) & (soft_aces > 0)
+
+
+def _play_round(n: int, draw: Draw, stand_on: int) -> np.ndarray:
+    """
+    Plays one hand in each of n lanes and returns the outcome codes.
+    The player hits until reaching `stand_on`; the dealer follows dealer_play.
+    """
+    all_hands = np.ones(n, dtype=bool)
+
+    p_total = np.zeros(n, dtype=np.int16)
+    p_soft = np.zeros(n, dtype=np.int8)
+    d_total = np.zeros(n, dtype=np.int16)
+    d_soft = np.zeros(n, dtype=np.int8)
+
+    # Initial deal, same order as get_initial_deal
+    _add_cards(p_total, p_soft, draw(all_hands), all_hands)
+    _add_cards(p_total, p_soft, draw(all_hands), all_hands)
+    _add_cards(d_total, d_soft, draw(all_hands), all_hands)
+    _add_cards(d_total, d_soft, draw(all_hands), all_hands)
+
+    natural = p_total == BlackjackEngine.BLACKJACK
+
+    # Player turn
+    drawing = ~natural & (p_total < stand_on)
+    while drawing.any():
+        _add_cards(p_total, p_soft, draw(drawing), drawing)
+        drawing &= p_total < stand_on
+
+    busted = p_total > BlackjackEngine.BLACKJACK
+
+    # Dealer turn, only for hands that reach a stand
+    drawing = ~natural & ~busted & (d_total < BlackjackEngine.DEALER_STANDS_ON)
+    while drawing.any():
+        _add_cards(d_total, d_soft, draw(drawing), drawing)
+        drawing &= d_total < BlackjackEngine.DEALER_STANDS_ON
+
+    # Same precedence as determine_result
+    outcome = np.full(n, LOSS, dtype=np.int8)
+    dealer_bust = d_total > BlackjackEngine.BLACKJACK
+    outcome[dealer_bust | (p_total > d_total)] = WIN
+    outcome[~dealer_bust & (p_total == d_total)] = PUSH
+    outcome[busted] = LOSS
+    outcome[natural] = NATURAL
+    return outcome
+
+
+def simulate_batch(n: int, rng: np.random.Generator, stand_on: int) -> np.ndarray:
+    """Plays n infinite-deck hands and returns outcome counts indexed like OUTCOMES."""
+    n_cards = len(BlackjackEngine.CARDS)
+
+    def draw(mask: np.ndarray) -> np.ndarray:
+        return rng.integers(0, n_cards, n, dtype=np.int8)
+
+    return np.bincount(_play_round(n, draw, stand_on), minlength=len(OUTCOMES))
+
+
+class ShoeLanes:
+    """
+    `lanes` independent shoes as one (lanes, cards) array with a position
+    per lane, following Shoe's draw and reshuffle rules.
+    """
+
+    def __init__(
+        self, lanes: int, decks: int, penetration: float, rng: np.random.Generator
+    ):
+        ranks = len(BlackjackEngine.CARDS)
+        self.fresh = np.tile(np.arange(ranks, dtype=np.int8), decks * SUITS)
+        self.cut_index = Shoe.cut_index_for(len(self.fresh), penetration)
+        self.rng = rng
+        self.cards = np.empty((lanes, len(self.fresh)), dtype=np.int8)
+        self.position = np.zeros(lanes, dtype=np.int32)
+        self._reshuffle(np.ones(lanes, dtype=bool))
+
+    def _reshuffle(self, mask: np.ndarray) -> None:
+        lanes = np.flatnonzero(mask)
+        if len(lanes):
+            decks = np.tile(self.fresh, (len(lanes), 1))
+            self.cards[lanes] = self.rng.permuted(decks, axis=1)
+            self.position[lanes] = 0
+
+    def new_round(self) -> None:
+        """Reshuffles the shoes whose cut card has come out."""
+        self._reshuffle(self.position >= self.cut_index)
+
+    def draw(self, mask: np.ndarray) -> np.ndarray:
+        self._reshuffle(mask & (self.position >= self.cards.shape[1]))
+        position = np.minimum(self.position, self.cards.shape[1] - 1)
+        cards = self.cards[np.arange(len(position)), position]
+        self.position += mask
+        return cards
+
+
+def simulate_shoe_batch(n: int, shoes: ShoeLanes, stand_on: int) -> np.ndarray:
+    """Plays one round in each of the first n shoes; returns outcome counts."""
+    shoes.new_round()
+    outcome = _play_round(len(shoes.position), shoes.draw, stand_on)
+    return np.bincount(outcome[:n], minlength=len(OUTCOMES))
+
+
+def _run_chunk(args) -> np.ndarray:
+    n, seed, stand_on, batch_size, decks, penetration = args
+    rng = np.random.default_rng(seed)
+    counts = np.zeros(len(OUTCOMES), dtype=np.int64)
+    remaining = n
+    if decks:
+        # Rounds run one after another per shoe, so shoes carry over
+        shoes = ShoeLanes(min(n, SHOE_LANES), decks, penetration, rng)
+        while remaining > 0:
+            size = min(len(shoes.position), remaining)
+            counts += simulate_shoe_batch(size, shoes, stand_on)
+            remaining -= size
+        return counts
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        counts += simulate_batch(size, rng, stand_on)
+        remaining -= size
+    return counts
+
+
+def summarize(counts: np.ndarray) -> Dict:
+    """RTP, outcome distribution and per-hand variance from outcome counts."""
+    hands = int(counts.sum())
+    probs = counts / hands
+    rtp = float((probs * PAYOUTS).sum())
+    # Net result per unit staked is payout - 1
+    variance = float((probs * (PAYOUTS - 1 - (rtp - 1)) ** 2).sum())
+    stderr = math.sqrt(variance / hands)
+    return {
+        "hands": hands,
+        "rtp": rtp,
+        "house_edge": 1 - rtp,
+        "rtp_95ci": [rtp - 1.96 * stderr, rtp + 1.96 * stderr],
+        "variance": variance,
+        "std_dev": math.sqrt(variance),
+        "outcomes": {
+            name: {"count": int(c), "share": float(p)}
+            for name, c, p in zip(OUTCOMES, counts, probs)
+        },
+    }
+
+
+def simulate(
+    hands: int,
+    workers: int = 0,
+    seed: Optional[int] = None,
+    stand_on: int = BlackjackEngine.DEALER_STANDS_ON,
+    batch_size: int = 1_000_000,
+    decks: int = 0,
+    penetration: float = 0.75,
+) -> Dict:
+    """
+    Plays `hands` hands across `workers` processes (0 = all cores), from
+    `decks`-deck shoes or an infinite deck when decks is 0.
+    """
+    workers = workers or os.cpu_count() or 1
+    # At least one chunk per worker, more for large runs to even out the load
+    chunks = min(hands, max(workers, min(workers * 4, hands // batch_size))) or 1
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    sizes = [hands // chunks + (1 if i < hands % chunks else 0) for i in range(chunks)]
+    jobs = [
+        (size, s, stand_on, batch_size, decks, penetration)
+        for size, s in zip(sizes, seeds)
+    ]
+
+    start = time.perf_counter()
+    if workers == 1:
+        results: List[np.ndarray] = [_run_chunk(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_run_chunk, jobs))
+    elapsed = time.perf_counter() - start
+
+    report = summarize(np.sum(results, axis=0))
+    report.update(
+        {
+            "stand_on": stand_on,
+            "decks": decks,
+            "penetration": penetration if decks else None,
+            "workers": workers,
+            "chunks": chunks,
+            "seed": seed,
+            "elapsed_s": elapsed,
+            "hands_per_s": hands / elapsed if elapsed else None,
+        }
+    )
+    return report
+
+
+def simulate_scalar(
+    hands: int,
+    stand_on: int = BlackjackEngine.DEALER_STANDS_ON,
+    decks: int = 0,
+    penetration: float = 0.75,
+) -> Dict:
+    """
+    Plays hands one at a time through BlackjackEngine itself (and one Shoe
+    when decks is set). Slow; used to cross-check the vectorized path.
+    """
+    engine = BlackjackEngine
+    shoe = engine.new_shoe(decks, penetration) if decks else None
+    counts = np.zeros(len(OUTCOMES), dtype=np.int64)
+    for _ in range(hands):
+        if shoe is not None and shoe.needs_reshuffle:
+            shoe.reshuffle()
+        player, dealer = engine.get_initial_deal(shoe)
+        if engine.is_blackjack(player):
+            result = "blackjack"
+        else:
+            while engine.calculate_score(player) < stand_on:
+                player.append(engine.draw_card(shoe))
+            if engine.calculate_score(player) > engine.BLACKJACK:
+                result = "dealer_win"
+            else:
+                dealer = engine.dealer_play(dealer, shoe)
+                result = engine.determine_result(player, dealer)
+        counts[OUTCOMES.index(result)] += 1
+    return summarize(counts)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Monte Carlo RTP / house-edge report for BlackjackEngine rules."
+    )
+    parser.add_argument("--hands", type=int, default=10_000_000)
+    parser.add_argument("--workers", type=int, default=0, help="0 = all cores")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--stand-on",
+        type=int,
+        default=BlackjackEngine.DEALER_STANDS_ON,
+        help="player strategy: hit below this score",
+    )
+    parser.add_argument("--batch-size", type=int, default=1_000_000)
+    parser.add_argument(
+        "--decks",
+        type=int,
+        default=None,
+        help="shoe size, 0 = infinite deck (default: SHOE_DECKS)",
+    )
+    parser.add_argument(
+        "--penetration",
+        type=float,
+        default=None,
+        help="cut card position (default: SHOE_PENETRATION)",
+    )
+    parser.add_argument(
+        "--crosscheck",
+        type=int,
+        default=0,
+        metavar="N",
+        help="also play N hands through BlackjackEngine and report both",
+    )
+    parser.add_argument("--json", action="store_true", help="print the raw report")
+    args = parser.parse_args(argv)
+    if args.decks is None or args.penetration is None:
+        # Match the game the service deals
+        from app.core.config import settings
+
+        if args.decks is None:
+            args.decks = settings.SHOE_DECKS
+        if args.penetration is None:
+            args.penetration = settings.SHOE_PENETRATION
+
+    report = simulate(
+        args.hands,
+        args.workers,
+        args.seed,
+        args.stand_on,
+        args.batch_size,
+        args.decks,
+        args.penetration,
+    )
+    if args.crosscheck:
+        report["crosscheck"] = simulate_scalar(
+            args.crosscheck, args.stand_on, args.decks, args.penetration
+        )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f"{report['hands']:,} hands in {report['elapsed_s']:.2f}s "
+        f"({report['hands_per_s']:,.0f} hands/s, {report['workers']} workers)"
+    )
+    if report["decks"]:
+        print(
+            f"Dealt from {report['decks']}-deck shoes, cut at "
+            f"{report['penetration']:.0%}"
+        )
+    else:
+        print("Dealt from an infinite deck (SHOE_DECKS=0)")
+    lo, hi = report["rtp_95ci"]
+    print(f"RTP        {report['rtp']:.5%}  (95% CI {lo:.5%} .. {hi:.5%})")
+    print(f"House edge {report['house_edge']:.5%}")
+    print(f"Std dev    {report['std_dev']:.5f} per unit bet")
+    for name, row in report["outcomes"].items():
+        print(f"  {name:<11} {row['share']:.5%}  ({row['count']:,})")
+    if args.crosscheck:
+        print(f"Engine crosscheck RTP {report['crosscheck']['rtp']:.5%} "
+              f"over {report['crosscheck']['hands']:,} hands")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import os
+import random
+import secrets
+import threading
+import time
+from typing import Dict, List, Protocol, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class RandomSource(Protocol):
+    """What BlackjackEngine needs from an RNG: unbiased integers in [0, n)."""
+
+    def randbelow(self, n: int) -> int: ...
+
+
+class SystemRandomSource:
+    """One OS CSPRNG call per draw (the original `secrets.choice` behaviour)."""
+
+    def randbelow(self, n: int) -> int:
+        return secrets.randbelow(n)
+
+
+class SeededRandomSource:
+    """Deterministic, NOT cryptographically secure. For tests and replays only."""
+
+    def __init__(self, seed: int):
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def randbelow(self, n: int) -> int:
+        with self._lock:
+            return self._random.randrange(n)
+
+
+class EntropyPool:
+    """
+    Buffers large blocks of os.urandom and hands out unbiased integers from
+    them with rejection sampling, so drawing a card is a list pop instead of
+    a syscall.
+
+    - Small ranges (n <= 256, which covers card indices) are pre-sampled a
+      whole block at a time into a per-n queue; larger ones (shoe shuffles)
+      read multi-byte values from a raw buffered block.
+    - Thread-safe: a lock guards the buffers.
+    - Fork-safe: a child process discards the inherited buffers, so parent
+      and child never hand out the same values.
+    - Buffers are refreshed once they are `max_age` seconds old even if not
+      used up, so entropy isn't held in memory indefinitely.
+    """
+
+    def __init__(self, block_size: int = 4096, max_age: float = 30.0):
+        self.block_size = block_size
+        self.max_age = max_age
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        # The lock may have been held by another thread at fork time
+        self._lock = threading.Lock()
+        self._queues: Dict[int, List[int]] = {}
+        self._expires: Dict[int, float] = {}
+        self._raw = b""
+        self._raw_pos = 0
+        self._raw_expires = 0.0
+        self._pid = os.getpid()
+
+    def _fill_small(self, n: int, now: float) -> List[int]:
+        # Bytes >= limit would make the low residues more likely; drop them
+        limit = 256 - 256 % n
+        queue = [b % n for b in os.urandom(self.block_size) if b < limit]
+        self._queues[n] = queue
+        self._expires[n] = now + self.max_age
+        self._pid = os.getpid()
+        return queue
+
+    def randbelow(self, n: int) -> int:
+        if n <= 0:
+            raise ValueError("n must be positive")
+        if n > 256:
+            return self._randbelow_large(n)
+        now = time.monotonic()
+        with self._lock:
+            queue = self._queues.get(n)
+            if not queue or self._expires[n] < now or self._pid != os.getpid():
+                queue = self._fill_small(n, now)
+            return queue.pop()
+
+    def _take_bytes(self, k: int) -> bytes:
+        """Next k raw buffered bytes. Caller holds the lock."""
+        now = time.monotonic()
+        if (
+            self._raw_pos + k > len(self._raw)
+            or self._raw_expires < now
+            or self._pid != os.getpid()
+        ):
+            self._raw = os.urandom(max(self.block_size, k))
+            self._raw_pos = 0
+            self._raw_expires = now + self.max_age
+            self._pid = os.getpid()
+        start = self._raw_pos
+        self._raw_pos = start + k
+        return self._raw[start : start + k]
+
+    def _randbelow_large(self, n: int) -> int:
+        k = ((n - 1).bit_length() + 7) // 8
+        span = 1 << (8 * k)
+        limit = span - span % n
+        with self._lock:
+            while True:
+                value = int.from_bytes(self._take_bytes(k), "big")
+                if value < limit:
+                    return value % n
+
+    def choice(self, seq: Sequence[T]) -> T:
+        return seq[self.randbelow(len(seq))]
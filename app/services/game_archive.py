@@ -0,0 +1,243 @@
+"""
+Cold archival of finished blackjack games.
+
+Finished games older than GAME_ARCHIVE_AFTER_DAYS are appended to gzipped
+NDJSON files, one per user shard and UTC creation day
+(`blackjack_games/000042/2026-10-18.ndjson.gz` under GAME_ARCHIVE_DIR; a
+shard is a run of ARCHIVE_SHARD_USERS user ids), and deleted from the hot
+table one chunk per transaction. A chunk is fsynced before its delete
+commits, so a crash can at worst archive a chunk twice. A game always lands
+in the same file, so `read_archive()` drops repeats per file and yields each
+game once. Records have the API's game fields plus user_id and created_at;
+`read_archive()` streams them back for history and export tooling, reading
+only the player's shard when given a user. Batch jobs walking users in id
+order read one shard at a time.
+
+On Postgres the job also keeps blackjack_games' id-range partitions
+PARTITIONS_AHEAD ahead of the id sequence and drops those it has emptied.
+Ids that overran the partitions sit in the DEFAULT partition until a run
+creates their partition and moves them out of DEFAULT; a run that can't
+create one logs an error.
+Run it on one instance, e.g. nightly:
+
+    python -m app.services.game_archive --older-than-days 90
+"""
+import argparse
+import gzip
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+import orjson
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.db.session import SessionLocal
+from app.repositories.blackjack_repository import BlackjackRepository
+from app.repositories.partition_repository import GamePartitionRepository
+from app.services.game_export import history_record, utc
+
+logger = get_logger(__name__)
+
+ARCHIVE_SUBDIR = "blackjack_games"
+PARTITIONS_AHEAD = 2
+ARCHIVE_SHARD_USERS = 10_000  # part of the on-disk layout; changing it strands files
+DDL_LOCK_TIMEOUT_MS = 2000
+
+
+def _encode(record: dict) -> bytes:
+    # user_id is written first whatever history_record's key order, so
+    # read_archive can match a player's lines on _user_prefix() unparsed
+    return orjson.dumps({"user_id": record["user_id"], **record}) + b"\n"
+
+
+def _user_prefix(user_id: int) -> bytes:
+    return b'{"user_id":%d,' % user_id
+
+
+def _append(path: Path, records: List[dict]) -> None:
+    """Adds one gzip member to the file (readers see members as one stream)."""
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="ab") as out:
+            out.write(b"".join(_encode(r) for r in records))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def user_shard(user_id: int) -> int:
+    return user_id // ARCHIVE_SHARD_USERS
+
+
+def _shard_dir(shard: int) -> str:
+    return f"{shard:06d}"
+
+
+def archive_files(archive_dir: str, shard: Optional[int] = None) -> List[Path]:
+    """Archive files (only one shard's if given), oldest day first per shard."""
+    root = Path(archive_dir) / ARCHIVE_SUBDIR
+    if shard is not None:
+        return sorted((root / _shard_dir(shard)).glob("*.ndjson.gz"))
+    return sorted(root.glob("*/*.ndjson.gz"))
+
+
+def read_archive(
+    archive_dir: str, user_id: Optional[int] = None, shard: Optional[int] = None
+) -> Iterator[dict]:
+    """
+    Archived game records: all of them, one user's (oldest first) or one
+    shard's. Each game is yielded once even if a crash archived it twice.
+    """
+    prefix = None if user_id is None else _user_prefix(user_id)
+    if user_id is not None:
+        shard = user_shard(user_id)
+    for path in archive_files(archive_dir, shard):
+        seen = set()  # game ids in this file; a repeat can't be in another
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                if prefix is not None and not line.startswith(prefix):
+                    continue  # another player's game, skipped unparsed
+                record = orjson.loads(line)
+                if user_id is not None and record["user_id"] != user_id:
+                    continue
+                if record["game_id"] not in seen:
+                    seen.add(record["game_id"])
+                    yield record
+
+
+class GameArchiver:
+    def __init__(
+        self,
+        archive_dir: str,
+        older_than_days: float,
+        chunk_size: int,
+        partition_size: int,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.archive_dir = Path(archive_dir) / ARCHIVE_SUBDIR
+        self.older_than_days = older_than_days
+        self.chunk_size = chunk_size
+        self.partition_size = partition_size
+        self.session_factory = session_factory
+
+    def archive(self) -> int:
+        """Moves every eligible game to the archive; returns how many."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.older_than_days)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        after_id, archived = 0, 0
+        while True:
+            with self.session_factory() as db:
+                repo = BlackjackRepository(db)
+                games = repo.get_after(after_id, self.chunk_size)
+                by_file: Dict[Path, List[dict]] = {}
+                reached_cutoff = False
+                for game in games:
+                    if utc(game.created_at) >= cutoff:
+                        # Ids follow creation order: the rest are newer still
+                        reached_cutoff = True
+                        break
+                    after_id = game.id
+                    if game.is_over:  # abandoned active games stay put
+                        day = utc(game.created_at).date().isoformat()
+                        shard = _shard_dir(user_shard(game.user_id))
+                        path = self.archive_dir / shard / f"{day}.ndjson.gz"
+                        by_file.setdefault(path, []).append(history_record(game))
+                for path, records in by_file.items():
+                    path.parent.mkdir(exist_ok=True)
+                    _append(path, records)
+                game_ids = [r["game_id"] for rs in by_file.values() for r in rs]
+                if game_ids:
+                    archived += repo.delete_many(game_ids)
+                    db.commit()
+            if reached_cutoff or len(games) < self.chunk_size:
+                return archived
+
+    def maintain_partitions(self) -> Dict[str, List[str]]:
+        """Creates partitions ahead of the id sequence, drops emptied old ones."""
+        created, dropped = [], []
+        with self.session_factory() as db:
+            repo = GamePartitionRepository(db)
+            if not repo.is_partitioned():
+                return {"created": created, "dropped": dropped}
+            last_id = repo.last_id()
+            partitions = repo.get_all()
+            ranges = [p for p in partitions if p.start is not None]
+            default = next((p.name for p in partitions if p.start is None), None)
+            end = max((p.end for p in ranges), default=0)
+            while end <= last_id + PARTITIONS_AHEAD * self.partition_size:
+                try:
+                    name = repo.create(
+                        end, end + self.partition_size, default, DDL_LOCK_TIMEOUT_MS
+                    )
+                    db.commit()
+                    created.append(name)
+                except Exception:
+                    # New ids keep landing in DEFAULT until a later run succeeds
+                    db.rollback()
+                    logger.error(
+                        "Could not create partition for ids %d-%d; new games "
+                        "are going to the DEFAULT partition",
+                        end,
+                        end + self.partition_size,
+                        exc_info=True,
+                    )
+                    break
+                end += self.partition_size
+
+            # A partition a whole partition below the sequence gets no new rows
+            for partition in ranges:
+                if partition.end + self.partition_size > last_id:
+                    break
+                if not repo.is_empty(partition.name):
+                    continue
+                try:
+                    repo.drop(partition.name, DDL_LOCK_TIMEOUT_MS)
+                    db.commit()
+                    dropped.append(partition.name)
+                except Exception:
+                    db.rollback()
+                    logger.warning("Could not drop partition %s", partition.name)
+        return {"created": created, "dropped": dropped}
+
+    def run(self) -> dict:
+        archived = self.archive()
+        partitions = self.maintain_partitions()
+        logger.info(
+            "Archived %d games; partitions created %s, dropped %s",
+            archived,
+            partitions["created"],
+            partitions["dropped"],
+        )
+        return {"archived": archived, **partitions}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Archive finished blackjack games and maintain partitions."
+    )
+    parser.add_argument("--dir", default=settings.GAME_ARCHIVE_DIR)
+    parser.add_argument(
+        "--older-than-days", type=float, default=settings.GAME_ARCHIVE_AFTER_DAYS
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=settings.GAME_ARCHIVE_CHUNK_SIZE
+    )
+    args = parser.parse_args(argv)
+
+    archiver = GameArchiver(
+        args.dir,
+        args.older_than_days,
+        args.chunk_size,
+        settings.GAME_PARTITION_SIZE,
+    )
+    report = archiver.run()
+    print(
+        f"Archived {report['archived']:,} games to {archiver.archive_dir}; "
+        f"partitions created {len(report['created'])}, "
+        f"dropped {len(report['dropped'])}"
+    )
+
+
+if __name__ == "__main__":
+    main()
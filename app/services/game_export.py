@@ -0,0 +1,160 @@
+"""
+Full game-history exports as NDJSON or CSV.
+
+Rows come off a server-side cursor in batches of EXPORT_BATCH_SIZE and are
+encoded straight from the result tuples, so memory stays flat however long
+the history is. Each export opens its own read session (replica when
+available) for as long as the response streams. Records have the same
+fields as archived games (see app.services.game_archive), which can be
+streamed in ahead of the live rows. A game still in the table after being
+archived (the archiver crashed before its delete) is only sent once.
+"""
+import csv
+import io
+from datetime import datetime, timezone
+from itertools import islice
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional
+
+import orjson
+from starlette.concurrency import iterate_in_threadpool
+
+from app.core.money import from_minor
+from app.db import session as db_session
+from app.repositories.blackjack_repository import (
+    AsyncBlackjackRepository,
+    BlackjackRepository,
+)
+from app.services.blackjack_engine import BlackjackEngine
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FIELDS = (
+    "game_id",
+    "user_id",
+    "created_at",
+    "player_hand",
+    "dealer_hand",
+    "player_score",
+    "dealer_score",
+    "status",
+    "is_over",
+    "bet_amount",
+)
+
+
+def utc(value: datetime) -> datetime:
+    # SQLite hands back naive UTC timestamps
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def history_record(game) -> dict:
+    """
+    Export/archive record from a history row or a BlackjackGame. The dealer's
+    hole card stays hidden while the game is active, as in the API.
+    """
+    dealer_hand = BlackjackEngine.decode_hand(game.dealer_cards or b"")
+    dealer_score = game.dealer_score
+    if not game.is_over:
+        dealer_hand = [dealer_hand[0], "??"]
+        dealer_score = BlackjackEngine.CARD_VALUES[dealer_hand[0]]
+    return {
+        "game_id": game.id,
+        "user_id": game.user_id,
+        "created_at": utc(game.created_at).isoformat(),
+        "player_hand": BlackjackEngine.decode_hand(game.player_cards or b""),
+        "dealer_hand": dealer_hand,
+        "player_score": game.player_score,
+        "dealer_score": dealer_score,
+        "status": game.status,
+        "is_over": game.is_over,
+        "bet_amount": from_minor(game.bet_minor),
+    }
+
+
+def encode_ndjson(records: List[dict]) -> bytes:
+    return b"".join(orjson.dumps(record) + b"\n" for record in records)
+
+
+def _csv_value(value):
+    return " ".join(value) if isinstance(value, list) else value
+
+
+def encode_csv(records: List[dict]) -> bytes:
+    """CSV rows in EXPORT_FIELDS order; hands are space-separated cards."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for record in records:
+        writer.writerow([_csv_value(record[field]) for field in EXPORT_FIELDS])
+    return buf.getvalue().encode()
+
+
+def _csv_header() -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(EXPORT_FIELDS)
+    return buf.getvalue().encode()
+
+
+# format -> (encoder, media type, header)
+EXPORT_FORMATS: Dict[str, tuple] = {
+    "ndjson": (encode_ndjson, "application/x-ndjson", b""),
+    "csv": (encode_csv, "text/csv; charset=utf-8", _csv_header()),
+}
+
+
+def _batches(records: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    records = iter(records)
+    while batch := list(islice(records, size)):
+        yield batch
+
+
+def _tracked(records: Iterable[dict], seen: set) -> Iterator[dict]:
+    for record in records:
+        seen.add(record["game_id"])
+        yield record
+
+
+def _unseen(rows, seen: set) -> List[dict]:
+    return [r for r in map(history_record, rows) if r["game_id"] not in seen]
+
+
+def stream_history(
+    user_id: int,
+    fmt: str,
+    archived: Optional[Iterable[dict]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[bytes]:
+    """Encoded chunks: `archived` records first, then the live games by id."""
+    encode, _, header = EXPORT_FORMATS[fmt]
+    if header:
+        yield header
+    archived_ids = set()  # one player's archived games
+    if archived is not None:
+        for batch in _batches(_tracked(archived, archived_ids), batch_size):
+            yield encode(batch)
+    with db_session.read_session_factory(user_id)() as db:
+        result = BlackjackRepository(db).stream_user_history(user_id, batch_size)
+        for rows in result.partitions():
+            yield encode(_unseen(rows, archived_ids))
+
+
+async def stream_history_async(
+    user_id: int,
+    fmt: str,
+    archived: Optional[Iterable[dict]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """Async counterpart of stream_history; archive files are read in a thread."""
+    encode, _, header = EXPORT_FORMATS[fmt]
+    if header:
+        yield header
+    archived_ids = set()
+    if archived is not None:
+        batches = _batches(_tracked(archived, archived_ids), batch_size)
+        async for batch in iterate_in_threadpool(batches):
+            yield encode(batch)
+    async with db_session.async_read_session_factory(user_id)() as db:
+        result = await AsyncBlackjackRepository(db).stream_user_history(
+            user_id, batch_size
+        )
+        async for rows in result.partitions():
+            yield encode(_unseen(rows, archived_ids))
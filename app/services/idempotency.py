@@ -0,0 +1,217 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Hashable, Optional, Union
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.repositories.idempotency_repository import IdempotencyRepository
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    content_type: Optional[str]
+    body: bytes
+
+
+class IdempotencyError(Exception):
+    """A retry that can't be answered: key reused, or first request still running."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _mismatch() -> IdempotencyError:
+    return IdempotencyError(
+        422, "Idempotency-Key was already used for a different request"
+    )
+
+
+def _still_running() -> IdempotencyError:
+    return IdempotencyError(
+        409, "A request with this Idempotency-Key is still in progress"
+    )
+
+
+@dataclass
+class _Pending:
+    fingerprint: str
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class InMemoryIdempotencyStore:
+    """
+    Per-process store: completed responses in an LRU bounded by `maxsize`
+    with a TTL, plus the requests still running. A duplicate of a running
+    request waits on its event for up to `wait` seconds. Only sees retries
+    that reach the same worker.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, wait: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.wait = wait
+        self._done: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._pending: Dict[Hashable, _Pending] = {}
+
+    async def begin(
+        self, user_id: int, key: str, fingerprint: str
+    ) -> Optional[StoredResponse]:
+        """None if the caller now owns the key; otherwise the stored response."""
+        ident = (user_id, key)
+        deadline = time.monotonic() + self.wait
+        while True:
+            entry = self._done.get(ident)
+            if entry is not None:
+                stored_fingerprint, response, expires_at = entry
+                if expires_at > time.monotonic():
+                    if stored_fingerprint != fingerprint:
+                        raise _mismatch()
+                    self._done.move_to_end(ident)
+                    return response
+                del self._done[ident]
+
+            pending = self._pending.get(ident)
+            if pending is None:
+                self._pending[ident] = _Pending(fingerprint)
+                return None
+            if pending.fingerprint != fingerprint:
+                raise _mismatch()
+            try:
+                await asyncio.wait_for(pending.done.wait(), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                raise _still_running()
+            # Finished (replay it) or abandoned (claim it): look again
+
+    async def complete(self, user_id: int, key: str, response: StoredResponse) -> None:
+        ident = (user_id, key)
+        pending = self._pending.pop(ident, None)
+        if pending is None:
+            return
+        self._done[ident] = (pending.fingerprint, response, time.monotonic() + self.ttl)
+        while len(self._done) > self.maxsize:
+            self._done.popitem(last=False)
+        pending.done.set()
+
+    async def abandon(self, user_id: int, key: str) -> None:
+        pending = self._pending.pop((user_id, key), None)
+        if pending is not None:
+            pending.done.set()
+
+
+class DatabaseIdempotencyStore:
+    """
+    Shared store for multi-worker deployments, on the idempotency_keys table.
+    The first request claims the key with an INSERT; duplicates on any worker
+    poll the row every `poll_interval` seconds for up to `wait` seconds.
+
+    A claim expires after `lease` seconds, so one left behind by a crashed
+    worker stops blocking retries; a stored response expires after `ttl`.
+    Expired rows are purged at most once per `purge_interval`.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        wait: float,
+        lease: float = 60.0,
+        poll_interval: float = 0.05,
+        purge_interval: float = 60.0,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.ttl = ttl
+        self.wait = wait
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.purge_interval = purge_interval
+        self.session_factory = session_factory
+        self._next_purge = 0.0
+
+    def _claim(
+        self, user_id: int, key: str, fingerprint: str
+    ) -> Union[bool, StoredResponse]:
+        """True if claimed, False if still running elsewhere, else the response."""
+        now = datetime.now(timezone.utc)
+        with self.session_factory() as db:
+            repo = IdempotencyRepository(db)
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + self.purge_interval
+                repo.delete_expired(now)
+            else:
+                repo.delete_expired(now, user_id, key)
+            claimed = repo.claim(
+                user_id, key, fingerprint, now + timedelta(seconds=self.lease)
+            )
+            db.commit()
+            if claimed:
+                return True
+            row = repo.get(user_id, key)
+            if row is None:  # released or purged in between; try again
+                return False
+            if row.fingerprint != fingerprint:
+                raise _mismatch()
+            if row.status_code is None:
+                return False
+            return StoredResponse(row.status_code, row.content_type, row.body)
+
+    def _complete(self, user_id: int, key: str, response: StoredResponse) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        with self.session_factory() as db:
+            IdempotencyRepository(db).complete(
+                user_id,
+                key,
+                response.status_code,
+                response.content_type,
+                response.body,
+                expires_at,
+            )
+            db.commit()
+
+    def _release(self, user_id: int, key: str) -> None:
+        with self.session_factory() as db:
+            IdempotencyRepository(db).release(user_id, key)
+            db.commit()
+
+    async def begin(
+        self, user_id: int, key: str, fingerprint: str
+    ) -> Optional[StoredResponse]:
+        deadline = time.monotonic() + self.wait
+        while True:
+            result = await asyncio.to_thread(self._claim, user_id, key, fingerprint)
+            if result is True:
+                return None
+            if result is not False:
+                return result
+            if time.monotonic() >= deadline:
+                raise _still_running()
+            await asyncio.sleep(self.poll_interval)
+
+    async def complete(self, user_id: int, key: str, response: StoredResponse) -> None:
+        await asyncio.to_thread(self._complete, user_id, key, response)
+
+    async def abandon(self, user_id: int, key: str) -> None:
+        await asyncio.to_thread(self._release, user_id, key)
+
+
+def build_store(backend: str):
+    if backend == "database":
+        return DatabaseIdempotencyStore(
+            ttl=settings.IDEMPOTENCY_TTL_SECONDS, wait=settings.IDEMPOTENCY_WAIT_SECONDS
+        )
+    if backend == "memory":
+        return InMemoryIdempotencyStore(
+            maxsize=settings.IDEMPOTENCY_MAX_ENTRIES,
+            ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+            wait=settings.IDEMPOTENCY_WAIT_SECONDS,
+        )
+    raise ValueError(f"Unknown IDEMPOTENCY_BACKEND {backend!r} (memory or database)")
+
+
+idempotency_store = build_store(settings.IDEMPOTENCY_BACKEND)
@@ -0,0 +1,157 @@
+"""
+Rebuilds player_stats from game history, for the first deploy of the table
+or after a drift. Players are walked in id order, --batch-size ids per
+lookup, and each is rebuilt in its own short transaction that holds off
+only that player's settlements (see PlayerStatsRepository.lock_player)
+while it recounts and overwrites their row. A player whose rows are locked
+by a settlement is skipped and retried, so the backfill never holds up the
+settlement worker for longer than one player's recount.
+
+Archived games are counted too when an archive directory is given, each
+once: repeats in the archive are dropped, and so are live rows of games
+already archived (left behind by an archiver crash). The archive is summed
+one user shard at a time, as the walk reaches it. Don't run the archiver
+at the same time, or games it moves meanwhile are missed.
+
+    python -m app.services.player_stats --archive-dir archive
+"""
+import argparse
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.money import scale_minor, to_minor
+from app.db.session import SessionLocal
+from app.repositories.player_stats_repository import (
+    PlayerStatsRepository,
+    empty_stats,
+    merge_stats,
+    stats_delta,
+)
+from app.repositories.user_repository import UserRepository
+from app.services.blackjack_engine import BlackjackEngine
+from app.services.game_archive import read_archive, user_shard
+
+logger = get_logger(__name__)
+
+STREAM_BATCH_SIZE = 1000
+# Seconds to wait before each retry of players skipped over a held lock
+RETRY_DELAYS = (0.05, 0.2, 1.0, 5.0)
+
+# Per-player archived totals, and archived game ids that may still be live
+Archived = Tuple[Dict[int, Dict[str, int]], Set[int]]
+
+
+def _hand_delta(status: str, bet: int) -> Dict[str, int]:
+    payout = scale_minor(bet, BlackjackEngine.PAYOUT_MULTIPLIERS[status])
+    return stats_delta(status, bet, payout)
+
+
+class PlayerStatsBackfill:
+    def __init__(
+        self,
+        batch_size: int,
+        archive_dir: Optional[str] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.batch_size = batch_size
+        self.archive_dir = archive_dir
+        self.session_factory = session_factory
+
+    def _archived_totals(self, shard: int, live_from: Optional[int]) -> Archived:
+        """
+        Totals for the players of one archive shard, in one streaming pass,
+        and the shard's archived game ids from `live_from` on: only those
+        can still have a live row, since the archiver deletes in id order.
+        """
+        totals: Dict[int, Dict[str, int]] = {}
+        overlap: Set[int] = set()
+        for record in read_archive(self.archive_dir, shard=shard):
+            if live_from is not None and record["game_id"] >= live_from:
+                overlap.add(record["game_id"])
+            total = totals.setdefault(record["user_id"], empty_stats())
+            bet = to_minor(record["bet_amount"])
+            merge_stats(total, _hand_delta(record["status"], bet))
+        return totals, overlap
+
+    def _rebuild_player(self, user_id: int, archived: Archived) -> bool:
+        """Recounts one player in its own transaction; False if a lock was held."""
+        totals, archived_ids = archived
+        with self.session_factory() as db:
+            repo = PlayerStatsRepository(db)
+            try:
+                repo.lock_player(user_id)
+            except OperationalError:
+                db.rollback()
+                return False
+            total = dict(totals.get(user_id) or empty_stats())
+            result = repo.finished_games(user_id, STREAM_BATCH_SIZE)
+            for rows in result.partitions():
+                for game_id, status, bet in rows:
+                    if game_id not in archived_ids:
+                        merge_stats(total, _hand_delta(status, bet))
+            repo.replace({user_id: total})
+            db.commit()
+        return True
+
+    def _retry(self, user_ids: List[int], archived: Archived) -> None:
+        for delay in RETRY_DELAYS:
+            if not user_ids:
+                return
+            time.sleep(delay)
+            user_ids = [u for u in user_ids if not self._rebuild_player(u, archived)]
+        if user_ids:
+            logger.warning("Player stats not rebuilt (rows kept locked): %s", user_ids)
+
+    def run(self) -> int:
+        """Rebuilds every player's row; returns how many players."""
+        live_from, shard = None, None
+        archived: Archived = ({}, set())
+        if self.archive_dir:
+            with self.session_factory() as db:
+                live_from = PlayerStatsRepository(db).first_finished_id()
+        skipped: List[int] = []
+        after_id, players = 0, 0
+        while True:
+            with self.session_factory() as db:
+                user_ids = UserRepository(db).get_ids_after(after_id, self.batch_size)
+            if not user_ids:
+                break
+            for user_id in user_ids:
+                if self.archive_dir and user_shard(user_id) != shard:
+                    # Finish the previous shard while its totals are loaded
+                    self._retry(skipped, archived)
+                    skipped = []
+                    shard = user_shard(user_id)
+                    archived = self._archived_totals(shard, live_from)
+                if not self._rebuild_player(user_id, archived):
+                    skipped.append(user_id)
+            after_id = user_ids[-1]
+            players += len(user_ids)
+            logger.info("Player stats rebuilt up to user %d", after_id)
+        self._retry(skipped, archived)
+        return players
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild player_stats from game history."
+    )
+    parser.add_argument("--batch-size", type=int, default=500, help="players per id lookup")
+    parser.add_argument(
+        "--archive-dir",
+        default=None,
+        help=f"also count archived games (e.g. {settings.GAME_ARCHIVE_DIR})",
+    )
+    args = parser.parse_args(argv)
+
+    players = PlayerStatsBackfill(args.batch_size, args.archive_dir).run()
+    print(f"Rebuilt stats for {players:,} players")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import asyncio
+import math
+from typing import Callable, Optional
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.db import session as db_session
+from app.db.session import ReplicaRouter, replica_router
+
+logger = get_logger(__name__)
+
+
+class ReplicaLagMonitor:
+    """
+    Background task that measures replica lag every `interval` seconds and
+    hands it to the router, which sends reads to the primary while the
+    replica is too far behind. A failed check counts as infinite lag, so an
+    unreachable replica takes no reads until it answers again.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        router: ReplicaRouter = replica_router,
+        measure: Callable[[], float] = db_session.measure_replica_lag,
+    ):
+        self.interval = interval
+        self.router = router
+        self.measure = measure
+        self._task: Optional[asyncio.Task] = None
+
+    async def check_once(self) -> float:
+        try:
+            lag = await asyncio.to_thread(self.measure)
+        except Exception:
+            logger.exception("Replica lag check failed")
+            lag = math.inf
+        if (lag > self.router.max_lag) != (self.router.lag > self.router.max_lag):
+            logger.warning("Replica lag %.3fs (limit %.3fs)", lag, self.router.max_lag)
+        self.router.lag = lag
+        return lag
+
+    async def _run(self) -> None:
+        while True:
+            await self.check_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        # Nothing to watch without a replica
+        if db_session.replica_engine is None or self.interval <= 0:
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+replica_monitor = ReplicaLagMonitor(
+    interval=settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS
+)
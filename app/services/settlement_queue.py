@@ -0,0 +1,161 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.db.session import SessionLocal, replica_router
+from app.repositories.blackjack_repository import BlackjackRepository
+from app.repositories.player_stats_repository import PlayerStatsRepository
+from app.repositories.shoe_repository import ShoeRepository
+from app.repositories.wallet_repository import WalletRepository
+
+logger = get_logger(__name__)
+
+SETTLEMENT_BATCH = metrics.registry.register(
+    metrics.Histogram(
+        "settlement_batch_size",
+        "Settlements committed per group commit.",
+        buckets=metrics.COUNT_BUCKETS,
+    )
+)
+
+
+@dataclass
+class Settlement:
+    """Everything a finished hand writes, computed by the request."""
+
+    game_id: int
+    user_id: int
+    expected_player_cards: bytes  # player hand the request loaded
+    game_values: dict  # final hand, scores, status, is_over
+    payout: int  # minor units
+    bet_minor: int
+    shoe_values: Optional[dict] = None
+
+
+_STOP = object()
+
+
+class SettlementQueue:
+    """
+    Group commit for finished hands. Requests release their row locks and
+    enqueue a Settlement; one worker thread writes up to `batch_size` of them
+    per transaction, waiting at most `max_delay` seconds to fill a batch, so
+    a busy server pays one commit (fsync) per batch instead of per hand.
+
+    Each future resolves after its batch commits: True once durable, False
+    if the game changed or finished in the meantime (nothing was written),
+    or with the exception if the commit failed.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        max_delay: float,
+        enabled: bool = False,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.enabled = enabled
+        self.session_factory = session_factory
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, settlement: Settlement) -> Future:
+        # Started lazily so importing this module never spawns a thread
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(
+                        target=self._run, name="settlement-commit", daemon=True
+                    )
+                    self._worker.start()
+        future: Future = Future()
+        self._queue.put((settlement, future))
+        return future
+
+    def _next_batch(self) -> Optional[list]:
+        item = self._queue.get()
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Finish this batch, then stop
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            SETTLEMENT_BATCH.observe(len(batch))
+            try:
+                applied = self._commit([settlement for settlement, _ in batch])
+            except Exception as exc:
+                logger.exception("Settlement batch of %d failed", len(batch))
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), ok in zip(batch, applied):
+                future.set_result(ok)
+
+    def _commit(self, batch: List[Settlement]) -> List[bool]:
+        with self.session_factory() as db:
+            games = BlackjackRepository(db)
+            wallets = WalletRepository(db)
+            shoes = ShoeRepository(db)
+            stats = PlayerStatsRepository(db)
+            applied = []
+            for s in batch:
+                ok = games.finish_if_unchanged(
+                    s.game_id, s.expected_player_cards, s.game_values
+                )
+                if ok:
+                    if s.payout > 0:
+                        wallets.credit(s.user_id, s.payout, "payout", game_id=s.game_id)
+                    stats.record(
+                        s.user_id, s.game_values["status"], s.bet_minor, s.payout
+                    )
+                    if s.shoe_values:
+                        shoes.update_state(s.user_id, s.shoe_values)
+                applied.append(ok)
+            db.commit()
+        # One session serves many users, so the commit hook can't tag it
+        for s, ok in zip(batch, applied):
+            if ok:
+                replica_router.mark_write(s.user_id)
+        return applied
+
+    def shutdown(self) -> None:
+        if self._worker is not None:
+            self._queue.put(_STOP)
+            self._worker.join()
+            self._worker = None
+
+
+settlement_queue = SettlementQueue(
+    batch_size=settings.SETTLEMENT_BATCH_SIZE,
+    max_delay=settings.SETTLEMENT_MAX_DELAY_MS / 1000,
+    enabled=settings.SETTLEMENT_GROUP_COMMIT,
+)
@@ -0,0 +1,78 @@
+from app.services.card_rng import RandomSource
+
+SUITS = 4
+
+
+class Shoe:
+    """
+    A multi-deck shoe as a compact pre-shuffled array of card codes.
+
+    Each byte is a rank index (into BlackjackEngine.CARDS), so an 8-deck shoe
+    is 416 bytes and a draw is a pointer bump. Once `position` passes the cut
+    card the shoe is reshuffled at the start of the next round; if a round
+    runs past the last card it is reshuffled on the spot.
+    """
+
+    def __init__(
+        self,
+        cards: bytes,
+        position: int,
+        cut_index: int,
+        decks: int,
+        penetration: float,
+        rng: RandomSource,
+        ranks: int,
+    ):
+        self.cards = cards
+        self.position = position
+        self.cut_index = cut_index
+        self.decks = decks
+        self.penetration = penetration
+        self.rng = rng
+        self.ranks = ranks
+        # Set when `cards` was replaced and has to be persisted again
+        self.reshuffled = False
+
+    @classmethod
+    def shuffled(
+        cls, decks: int, penetration: float, rng: RandomSource, ranks: int
+    ) -> "Shoe":
+        shoe = cls(b"", 0, 0, decks, penetration, rng, ranks)
+        shoe.reshuffle()
+        return shoe
+
+    @staticmethod
+    def cut_index_for(size: int, penetration: float) -> int:
+        return max(1, min(size, int(size * penetration)))
+
+    def reshuffle(self) -> None:
+        """Fisher-Yates over decks * 4 copies of every rank."""
+        cards = bytearray(
+            code for _ in range(self.decks * SUITS) for code in range(self.ranks)
+        )
+        randbelow = self.rng.randbelow
+        for i in range(len(cards) - 1, 0, -1):
+            j = randbelow(i + 1)
+            cards[i], cards[j] = cards[j], cards[i]
+
+        self.cards = bytes(cards)
+        self.position = 0
+        self.cut_index = self.cut_index_for(len(cards), self.penetration)
+        self.reshuffled = True
+
+    @property
+    def needs_reshuffle(self) -> bool:
+        """True once the cut card has come out."""
+        return self.position >= self.cut_index
+
+    def draw(self) -> int:
+        if self.position >= len(self.cards):
+            self.reshuffle()
+        code = self.cards[self.position]
+        self.position += 1
+        return code
+
+    @property
+    def remaining(self) -> int:
+        return len(self.cards) - self.position
+
@@ -1,7 +1,13 @@
+from typing import TYPE_CHECKING
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from app.repositories.wallet_repository import WalletRepository
-from app.models.wallet import Wallet
+from app.core.money import to_minor
+from app.repositories.wallet_repository import AsyncWalletRepository, WalletRepository
+from app.schemas.wallet_schema import WalletOut
+from app.core.metrics import timed
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 
 class WalletService:
@@ -9,35 +15,69 @@ class WalletService:
         self.db = db
         self.repo = WalletRepository(db)
 
-    def get_user_balance(self, user_id: int) -> Wallet:
-        wallet = self.repo.get_by_user_id(user_id)
-        if not wallet:
+    def get_user_balance(self, user_id: int) -> WalletOut:
+        balance = self.repo.get_balance(user_id)
+        if balance is None:
             raise HTTPException(status_code=404, detail="Wallet not found")
-        return wallet
+        return WalletOut(user_id=user_id, balance=balance)
 
-    def deposit(self, user_id: int, amount: float) -> Wallet:
-        """Atomic deposit operation."""
-        wallet = self.repo.get_by_user_id_for_update(user_id)
-        if not wallet:
+    @timed("wallet.deposit")
+    def deposit(self, user_id: int, amount: float) -> WalletOut:
+        """Appends a deposit entry and returns the balance including it."""
+        self.repo.credit(user_id, to_minor(amount), kind="deposit")
+        self.db.flush()
+        balance = self.repo.get_balance(user_id)
+        if balance is None:
+            self.db.rollback()
             raise HTTPException(status_code=404, detail="Wallet not found")
 
-        wallet.balance += amount
-        self.repo.update(wallet)
         self.db.commit()
-        self.db.refresh(wallet)
-        return wallet
+        return WalletOut(user_id=user_id, balance=balance)
 
-    def deduct_funds(self, user_id: int, amount: float) -> Wallet:
+    def deduct_funds(self, user_id: int, amount: float) -> WalletOut:
         """
         Securely deduct funds. This should be called by the Blackjack Service.
         Note: We don't commit here if this is part of a larger game transaction.
         """
-        wallet = self.repo.get_by_user_id_for_update(user_id)
-        if wallet.balance < amount:
+        balance = self.repo.debit(user_id, to_minor(amount))
+        if balance is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient funds"
             )
+        return WalletOut(user_id=user_id, balance=balance)
+
+
+class AsyncWalletService:
+    """Async counterpart of WalletService (DB_ASYNC_MODE)."""
+
+    def __init__(self, db: "AsyncSession"):
+        self.db = db
+        self.repo = AsyncWalletRepository(db)
+
+    async def get_user_balance(self, user_id: int) -> WalletOut:
+        balance = await self.repo.get_balance(user_id)
+        if balance is None:
+            raise HTTPException(status_code=404, detail="Wallet not found")
+        return WalletOut(user_id=user_id, balance=balance)
 
-        wallet.balance -= amount
-        self.repo.update(wallet)
-        return wallet
+    @timed("wallet.deposit")
+    async def deposit(self, user_id: int, amount: float) -> WalletOut:
+        """Appends a deposit entry and returns the balance including it."""
+        await self.repo.credit(user_id, to_minor(amount), kind="deposit")
+        await self.db.flush()
+        balance = await self.repo.get_balance(user_id)
+        if balance is None:
+            await self.db.rollback()
+            raise HTTPException(status_code=404, detail="Wallet not found")
+
+        await self.db.commit()
+        return WalletOut(user_id=user_id, balance=balance)
+
+    async def deduct_funds(self, user_id: int, amount: float) -> WalletOut:
+        """Securely deduct funds without committing."""
+        balance = await self.repo.debit(user_id, to_minor(amount))
+        if balance is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient funds"
+            )
+        return WalletOut(user_id=user_id, balance=balance)
@@ -0,0 +1,81 @@
+import asyncio
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.db.session import SessionLocal
+from app.repositories.wallet_repository import WalletRepository
+
+logger = get_logger(__name__)
+
+
+class WalletSnapshotCompactor:
+    """
+    Background task that rolls wallet snapshots forward over the ledger, so
+    a balance read only sums the last few seconds of entries.
+
+    Ledger ids are assigned at INSERT but become visible at COMMIT, so an
+    entry is only folded once it is `lag` seconds old by the database clock
+    and older than every open writing transaction, meaning any entry with a
+    lower id has committed (see WalletRepository.compact). Each batch is one
+    UPDATE in its own transaction. Run it on a single instance.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        lag: float,
+        batch_size: int,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.interval = interval
+        self.lag = lag
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+        self._watermark: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def compact_once(self) -> int:
+        """Folds all committed entries `lag` old; returns how many ids it advanced."""
+        with self.session_factory() as db:
+            repo = WalletRepository(db)
+            if self._watermark is None:
+                self._watermark = repo.snapshot_watermark()
+            start = self._watermark
+            while True:
+                upto = repo.compact(self._watermark, self.lag, self.batch_size)
+                if upto == self._watermark:
+                    break
+                db.commit()
+                self._watermark = upto
+        return self._watermark - start
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.compact_once)
+            except Exception:
+                logger.exception("Wallet snapshot compaction failed")
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+wallet_compactor = WalletSnapshotCompactor(
+    interval=settings.WALLET_SNAPSHOT_INTERVAL_SECONDS,
+    lag=settings.WALLET_SNAPSHOT_LAG_SECONDS,
+    batch_size=settings.WALLET_SNAPSHOT_BATCH_SIZE,
+)
@@ -0,0 +1,34 @@
+"""
+Boots the FastAPI app against a throwaway SQLite database for benchmarks.
+
+Import this module before anything under `app`, since settings are read at
+import time. Set DATABASE_URL to benchmark against a real Postgres instead.
+"""
+import os
+import tempfile
+
+_tmp_dir = tempfile.mkdtemp(prefix="casino-bench-")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp_dir}/bench.db")
+# Benchmarks drive many users from one address; measure the app, not the 429s
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from app.db.session import Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import (  # noqa: E402,F401
+    blackjack_game,
+    idempotency_key,
+    player_stats,
+    shoe,
+    user,
+    wallet,
+)
+
+
+def create_schema() -> None:
+    """Creates tables directly when running against the SQLite stand-in."""
+    if engine.dialect.name == "sqlite":
+        Base.metadata.create_all(engine)
+
+
+__all__ = ["app", "create_schema"]
@@ -0,0 +1,66 @@
+"""
+Cards per second: secrets.choice vs. the buffered EntropyPool.
+
+    python -m benchmarks.bench_card_rng --cards 1000000 --threads 4
+"""
+import argparse
+import secrets
+import threading
+import time
+
+from app.services.blackjack_engine import BlackjackEngine
+from app.services.card_rng import EntropyPool
+
+CARDS = BlackjackEngine.CARDS
+
+
+def _secrets_choice(n: int) -> None:
+    for _ in range(n):
+        secrets.choice(CARDS)
+
+
+def _pool_choice(pool: EntropyPool):
+    def run(n: int) -> None:
+        for _ in range(n):
+            pool.choice(CARDS)
+
+    return run
+
+
+def _engine_draw(n: int) -> None:
+    for _ in range(n):
+        BlackjackEngine.draw_card()
+
+
+def measure(fn, cards: int, threads: int) -> float:
+    per_thread = cards // threads
+    workers = [threading.Thread(target=fn, args=(per_thread,)) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Card RNG microbenchmark")
+    parser.add_argument("--cards", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--block-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    cases = {
+        "secrets.choice": _secrets_choice,
+        f"EntropyPool({args.block_size})": _pool_choice(EntropyPool(args.block_size)),
+        "BlackjackEngine.draw_card": _engine_draw,
+    }
+    baseline = None
+    for name, fn in cases.items():
+        rate = measure(fn, args.cards, args.threads)
+        baseline = baseline or rate
+        print(f"{name:<28} {rate:>12,.0f} cards/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
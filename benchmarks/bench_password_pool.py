@@ -0,0 +1,108 @@
+"""
+Login throughput vs. game latency, with and without the bcrypt pool.
+
+Runs a login storm against the app while a second set of clients polls a
+cheap authenticated endpoint, and reports both sides for each mode.
+
+    python -m benchmarks.bench_password_pool --logins 200 --concurrency 64
+
+Requires httpx.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks._app import app, create_schema
+from app.core.security import password_hasher
+
+import httpx
+
+
+async def _register(client: httpx.AsyncClient, username: str) -> str:
+    r = await client.post(
+        "/api/auth/register", json={"username": username, "password": "password123"}
+    )
+    r.raise_for_status()
+    return r.json()["data"]["access_token"]
+
+
+async def _login_storm(client, username, total, concurrency, results):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            r = await client.post(
+                "/api/auth/login",
+                json={"username": username, "password": "password123"},
+            )
+            results["ok" if r.status_code == 200 else str(r.status_code)] = (
+                results.get("ok" if r.status_code == 200 else str(r.status_code), 0)
+                + 1
+            )
+
+    await asyncio.gather(*(one() for _ in range(total)))
+
+
+async def _game_poller(client, token, stop: asyncio.Event, latencies):
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/wallet/me", headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_mode(enabled: bool, logins: int, concurrency: int, pollers: int):
+    password_hasher.enabled = enabled
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        tag = f"{'pool' if enabled else 'inline'}-{time.monotonic_ns()}"
+        token = await _register(client, f"poller-{tag}")
+        await _register(client, f"storm-{tag}")
+
+        latencies: list = []
+        results: dict = {}
+        stop = asyncio.Event()
+        poll_tasks = [
+            asyncio.create_task(_game_poller(client, token, stop, latencies))
+            for _ in range(pollers)
+        ]
+        start = time.perf_counter()
+        await _login_storm(client, f"storm-{tag}", logins, concurrency, results)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*poll_tasks)
+
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0] * 99
+    return {
+        "mode": "pool" if enabled else "inline",
+        "logins_per_s": results.get("ok", 0) / elapsed,
+        "login_results": results,
+        "game_requests": len(latencies),
+        "game_p50_ms": q[49],
+        "game_p95_ms": q[94],
+        "game_p99_ms": q[98],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--pollers", type=int, default=4)
+    args = parser.parse_args()
+
+    create_schema()
+    for enabled in (False, True):
+        row = asyncio.run(run_mode(enabled, args.logins, args.concurrency, args.pollers))
+        print(
+            "{mode:>6}: {logins_per_s:7.1f} logins/s {login_results} | "
+            "wallet/me n={game_requests} p50={game_p50_ms:.1f}ms "
+            "p95={game_p95_ms:.1f}ms p99={game_p99_ms:.1f}ms".format(**row)
+        )
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Serialization cost per response: response_model validation vs. respond().
+
+"before" is what FastAPI does with a dict and a response_model: validate it
+into the model, dump the model to JSON bytes, wrap them in a Response.
+"json" and "msgpack" are respond(): the dict goes straight to orjson or
+msgpack. Each row times building the whole Response object.
+
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --repeats 15 --min-time 0.1
+"""
+import argparse
+
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+from benchmarks.micro import _game, measure
+from app.core import serialization
+from app.schemas.blackjack_schema import (
+    AdviceResponse,
+    GameHistoryResponse,
+    GameResponse,
+)
+from app.schemas.user_schema import AuthResponse
+from app.schemas.wallet_schema import WalletOut, WalletResponse
+from app.services.blackjack_advisor import advise
+from app.services.blackjack_service import BlackjackService
+
+
+def build_payloads() -> list:
+    """(name, response_model, content) shaped like the routes' return values."""
+    service = BlackjackService(None)  # get_game_state_formatted never touches the DB
+    state = service.get_game_state_formatted(_game(False))
+    history = [service.get_game_state_formatted(_game(True)) for _ in range(20)]
+    return [
+        (
+            "auth.login",
+            AuthResponse,
+            {
+                "success": True,
+                "message": "Login successful",
+                "data": {"access_token": "x" * 140, "token_type": "bearer"},
+            },
+        ),
+        (
+            "wallet.me",
+            WalletResponse,
+            {
+                "success": True,
+                "message": "Balance retrieved",
+                "data": WalletOut(user_id=1, balance=1234.5),
+            },
+        ),
+        (
+            "blackjack.start",
+            GameResponse,
+            {"success": True, "message": "Game started", "data": state},
+        ),
+        (
+            "blackjack.advice",
+            AdviceResponse,
+            {
+                "success": True,
+                "message": "Recommended: hit",
+                "data": {"game_id": 1, **advise(["10", "6"], "K")},
+            },
+        ),
+        (
+            "blackjack.history[20]",
+            GameHistoryResponse,
+            {"success": True, "data": {"items": history, "next_cursor": 1}},
+        ),
+    ]
+
+
+def encoders(model, content) -> list:
+    adapter = TypeAdapter(model)
+
+    def before():
+        body = adapter.dump_json(adapter.validate_python(content))
+        return Response(body, media_type="application/json")
+
+    return [
+        ("before", before),
+        ("json", lambda: serialization.ORJSONResponse(content)),
+        ("msgpack", lambda: serialization.MsgPackResponse(content)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per repeat")
+    args = parser.parse_args()
+
+    print(f"{'response':<24}{'before':>10}{'json':>10}{'msgpack':>10}   bytes (json/msgpack)")
+    for name, model, content in build_payloads():
+        medians, sizes = [], []
+        for _, fn in encoders(model, content):
+            medians.append(measure(fn, args.repeats, args.warmup, args.min_time)["median_ns"])
+            sizes.append(len(fn().body))
+        print(
+            f"{name:<24}"
+            + "".join(f"{ns / 1000:8.2f}us" for ns in medians)
+            + f"   {sizes[1]}/{sizes[2]}  ({medians[0] / medians[1]:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
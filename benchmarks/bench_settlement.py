@@ -0,0 +1,98 @@
+"""
+Settlements per second: one commit per hand vs. the group-commit queue.
+
+Starts one game per user, then stands all of them from --concurrency
+threads and times it, for each mode.
+
+    python -m benchmarks.bench_settlement --users 200 --concurrency 16 --rounds 3
+
+Against the SQLite stand-in every commit is an fsync of the database file;
+set DATABASE_URL to measure Postgres.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from benchmarks._app import create_schema
+from app.core.security import get_password_hash
+from app.db.session import SessionLocal
+from app.repositories.user_repository import UserRepository
+from app.services.blackjack_service import BlackjackService
+from app.services.settlement_queue import SETTLEMENT_BATCH, settlement_queue
+
+
+def _create_users(count: int, tag: str) -> list:
+    hashed = get_password_hash("password123")
+    with SessionLocal() as db:
+        repo = UserRepository(db)
+        return [
+            repo.create_user_with_wallet(f"settle-{tag}-{i}", hashed).id
+            for i in range(count)
+        ]
+
+
+def _start_games(user_ids: list) -> list:
+    """Returns (user_id, game_id) for games still waiting on a stand."""
+    games = []
+    with SessionLocal() as db:
+        service = BlackjackService(db)
+        for user_id in user_ids:
+            game = service.start_game(user_id, 1.0)
+            if not game.is_over:
+                games.append((user_id, game.id))
+    return games
+
+
+def _stand(args) -> bool:
+    user_id, game_id = args
+    with SessionLocal() as db:
+        try:
+            BlackjackService(db).stand(user_id, game_id)
+            return True
+        except HTTPException:
+            return False
+
+
+def run_mode(group_commit: bool, user_ids: list, concurrency: int, rounds: int):
+    settlement_queue.enabled = group_commit
+    settled, elapsed = 0, 0.0
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(rounds):
+            games = _start_games(user_ids)
+            start = time.perf_counter()
+            settled += sum(pool.map(_stand, games))
+            elapsed += time.perf_counter() - start
+    return settled, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    create_schema()
+    user_ids = _create_users(args.users, str(time.monotonic_ns()))
+    print(
+        f"batch_size={settlement_queue.batch_size} "
+        f"max_delay={settlement_queue.max_delay * 1000:.1f}ms"
+    )
+    for group_commit in (False, True):
+        batches_before = SETTLEMENT_BATCH.count()
+        settled, elapsed = run_mode(group_commit, user_ids, args.concurrency, args.rounds)
+        line = (
+            f"{'group' if group_commit else 'single':>6}: {settled} settlements in "
+            f"{elapsed:.2f}s = {settled / elapsed:8.1f}/s"
+        )
+        if group_commit:
+            batches = SETTLEMENT_BATCH.count() - batches_before
+            line += f" (avg batch {settled / max(1, batches):.1f})"
+        print(line)
+    settlement_queue.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+End-to-end load test of the game flow.
+
+Each virtual user plays register -> login -> (start -> hit* -> stand ->
+wallet/me) x rounds, with at most --concurrency users in flight. Reports
+throughput and p50/p95/p99 latency per endpoint, plus SQL statements per
+request from the server's /metrics, and writes everything to a JSON file.
+
+    python -m benchmarks.load_test --users 200 --concurrency 32 --rounds 5
+    python -m benchmarks.load_test --baseline results/main.json --threshold 0.2
+
+By default the app runs in-process on a throwaway SQLite database (set
+DATABASE_URL for Postgres). --base-url targets a running server instead.
+A run exits non-zero when --baseline is given and any endpoint's p95
+regressed by more than --threshold. Requires httpx.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+PASSWORD = "password123"
+ENDPOINTS = ("register", "login", "start", "hit", "stand", "wallet_me")
+
+
+def _parse_query_counts(text: str) -> Dict[str, List[float]]:
+    """{route: [requests, statements]} from db_queries_per_request in /metrics."""
+    counts: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0])
+    for line in text.splitlines():
+        for suffix, slot in (("_count", 0), ("_sum", 1)):
+            prefix = f"db_queries_per_request{suffix}{{"
+            if line.startswith(prefix):
+                labels, value = line[len(prefix):].rsplit("} ", 1)
+                route = labels.split('route="', 1)[1].rstrip('"')
+                counts[route][slot] = float(value)
+    return counts
+
+
+async def _scrape(client: httpx.AsyncClient) -> Dict[str, List[float]]:
+    r = await client.get("/metrics")
+    return _parse_query_counts(r.text) if r.status_code == 200 else {}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def call(self, endpoint: str, request) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            r = await request
+        except httpx.HTTPError as exc:
+            self.errors[endpoint][type(exc).__name__] += 1
+            return None
+        self.latencies[endpoint].append((time.perf_counter() - start) * 1000)
+        if r.status_code >= 400:
+            self.errors[endpoint][str(r.status_code)] += 1
+        return r
+
+
+async def _session(client, rec: Recorder, username: str, args) -> None:
+    creds = {"username": username, "password": PASSWORD}
+    r = await rec.call("register", client.post("/api/auth/register", json=creds))
+    if r is None or r.status_code != 200:
+        return
+    r = await rec.call("login", client.post("/api/auth/login", json=creds))
+    if r is None or r.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {r.json()['data']['access_token']}"}
+
+    for _ in range(args.rounds):
+        r = await rec.call(
+            "start",
+            client.post(
+                "/api/blackjack/start", json={"bet_amount": args.bet}, headers=headers
+            ),
+        )
+        if r is None or r.status_code != 200:
+            break
+        game = r.json()["data"]
+        # Simple player: hit below --stand-on, like most real sessions
+        hits = 0
+        while not game["is_over"] and game["player_score"] < args.stand_on:
+            if hits >= args.max_hits:
+                break
+            r = await rec.call(
+                "hit",
+                client.post(f"/api/blackjack/{game['game_id']}/hit", headers=headers),
+            )
+            if r is None or r.status_code != 200:
+                return
+            game = r.json()["data"]
+            hits += 1
+        if not game["is_over"]:
+            await rec.call(
+                "stand",
+                client.post(f"/api/blackjack/{game['game_id']}/stand", headers=headers),
+            )
+        await rec.call("wallet_me", client.get("/api/wallet/me", headers=headers))
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value}
+    q = statistics.quantiles(samples, n=100)
+    return {"p50_ms": q[49], "p95_ms": q[94], "p99_ms": q[98]}
+
+
+async def run(args) -> dict:
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        from benchmarks._app import app, create_schema
+
+        create_schema()
+        transport, base_url = httpx.ASGITransport(app=app), "http://loadtest"
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, limits=limits, timeout=args.timeout
+    ) as client:
+        rec = Recorder()
+        tag = time.strftime("%H%M%S") + str(time.monotonic_ns() % 10000)
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def user(i: int):
+            async with sem:
+                await _session(client, rec, f"lt{tag}u{i}", args)
+
+        before = await _scrape(client)
+        start = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(args.users)))
+        elapsed = time.perf_counter() - start
+        after = await _scrape(client)
+
+    endpoints = {}
+    for name in ENDPOINTS:
+        samples = rec.latencies.get(name, [])
+        endpoints[name] = {
+            "requests": len(samples),
+            "rps": len(samples) / elapsed,
+            "mean_ms": statistics.fmean(samples) if samples else 0.0,
+            **_percentiles(samples),
+            "errors": dict(rec.errors.get(name, {})),
+        }
+
+    queries = {}
+    for route, (count, total) in after.items():
+        old_count, old_total = before.get(route, (0.0, 0.0))
+        if route != "/metrics" and count > old_count:
+            queries[route] = round((total - old_total) / (count - old_count), 2)
+
+    total_requests = sum(e["requests"] for e in endpoints.values())
+    return {
+        "config": {
+            k: v for k, v in vars(args).items() if k not in ("baseline", "output")
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "target": args.base_url or "in-process",
+        },
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "elapsed_s": elapsed,
+        "total_requests": total_requests,
+        "throughput_rps": total_requests / elapsed,
+        "endpoints": endpoints,
+        "queries_per_request": queries,
+    }
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> List[str]:
+    """Endpoints whose p95 grew by more than `threshold` (0.2 = 20%)."""
+    regressions = []
+    for name, row in result["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(name)
+        if not old or not old["p95_ms"] or not row["requests"]:
+            continue
+        change = row["p95_ms"] / old["p95_ms"] - 1
+        print(f"  {name:<10} p95 {old['p95_ms']:8.2f} -> {row['p95_ms']:8.2f}ms ({change:+.0%})")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=5, help="games per user")
+    parser.add_argument("--bet", type=float, default=10.0)
+    parser.add_argument("--stand-on", type=int, default=17)
+    parser.add_argument("--max-hits", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--base-url", help="load a running server instead")
+    parser.add_argument("--output", default="load_test_results.json")
+    parser.add_argument("--baseline", help="earlier results JSON to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+
+    print(
+        f"{result['total_requests']} requests in {result['elapsed_s']:.1f}s "
+        f"({result['throughput_rps']:.1f} req/s)"
+    )
+    for name, row in result["endpoints"].items():
+        print(
+            f"  {name:<10} n={row['requests']:<6} {row['rps']:7.1f}/s "
+            f"p50={row['p50_ms']:7.2f} p95={row['p95_ms']:7.2f} "
+            f"p99={row['p99_ms']:7.2f}ms errors={row['errors'] or '-'}"
+        )
+    for route, per_request in sorted(result["queries_per_request"].items()):
+        print(f"  {per_request:5.2f} queries/request  {route}")
+
+    with open(args.output, "w") as fh:
+        json.dump(result, fh, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(result, json.load(fh), args.threshold)
+        if regressions:
+            print(f"p95 regressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
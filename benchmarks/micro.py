@@ -0,0 +1,203 @@
+"""
+Microbenchmarks for the pure functions on every request path.
+
+Each case is calibrated to run for at least --min-time per repeat, warmed
+up, then timed for --repeats repeats with the GC disabled (like timeit).
+Per-call min/median/mean/stdev are reported; --save writes them as a
+baseline and --compare fails (exit 1) when any median regressed by more
+than --threshold.
+
+    python -m benchmarks.micro --save benchmarks/baseline.json
+    python -m benchmarks.micro --compare benchmarks/baseline.json --threshold 0.15
+    python -m benchmarks.micro --filter engine.
+
+Baselines are only comparable on the same machine and Python build.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+# Settings are read at import time; nothing here connects to the database
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/micro.db")
+
+from app.core import serialization  # noqa: E402
+from app.core.rate_limit import InMemoryRateLimitBackend, Limit  # noqa: E402
+from app.models import shoe, user, wallet  # noqa: E402,F401
+from app.models.blackjack_game import BlackjackGame  # noqa: E402
+from app.schemas.blackjack_schema import GameResponse  # noqa: E402
+from app.schemas.wallet_schema import WalletResponse  # noqa: E402
+from app.services.blackjack_engine import BlackjackEngine  # noqa: E402
+from app.services.blackjack_service import BlackjackService  # noqa: E402
+
+Case = Tuple[str, Callable[[], object]]
+
+
+def _game(is_over: bool) -> BlackjackGame:
+    return BlackjackGame(
+        id=1,
+        user_id=1,
+        bet_minor=1000,
+        player_hand=["10", "6", "3"],
+        dealer_hand=["K", "7"],
+        status="player_win" if is_over else "active",
+        is_over=is_over,
+    )
+
+
+def build_cases() -> List[Case]:
+    engine = BlackjackEngine
+    service = BlackjackService(None)  # get_game_state_formatted never touches the DB
+    active, finished = _game(False), _game(True)
+    state = service.get_game_state_formatted(active)
+    game_payload = {"success": True, "message": "Game started", "data": state}
+    buckets = InMemoryRateLimitBackend(max_keys=1000)
+    unlimited = Limit(rate=1e9, burst=10, concurrency=0)
+    wallet_payload = {
+        "success": True,
+        "message": "Balance retrieved",
+        "data": {"user_id": 1, "balance": 1234.5},
+    }
+
+    return [
+        ("engine.calculate_score", lambda: engine.calculate_score(["A", "7", "A", "9"])),
+        ("engine.draw_card", engine.draw_card),
+        ("engine.get_initial_deal", engine.get_initial_deal),
+        ("engine.dealer_play", lambda: engine.dealer_play(["6", "5"])),
+        (
+            "engine.determine_result",
+            lambda: engine.determine_result(["10", "6", "3"], ["K", "7"]),
+        ),
+        (
+            "service.get_game_state_formatted[active]",
+            lambda: service.get_game_state_formatted(active),
+        ),
+        (
+            "service.get_game_state_formatted[over]",
+            lambda: service.get_game_state_formatted(finished),
+        ),
+        # What FastAPI does with a response_model: validate, then dump to JSON
+        (
+            "schema.GameResponse",
+            lambda: GameResponse.model_validate(game_payload).model_dump_json(),
+        ),
+        (
+            "schema.WalletResponse",
+            lambda: WalletResponse.model_validate(wallet_payload).model_dump_json(),
+        ),
+        (
+            "rate_limit.take[memory]",
+            lambda: buckets.take_now("blackjack:user:1", unlimited),
+        ),
+        # What respond() does instead: encode the dict once
+        ("serialization.json", lambda: serialization.dumps(game_payload)),
+        (
+            "serialization.msgpack",
+            lambda: serialization.MsgPackResponse(game_payload).body,
+        ),
+    ]
+
+
+def _time_loops(fn: Callable, loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        fn()
+    return time.perf_counter() - start
+
+
+def measure(fn: Callable, repeats: int, warmup: int, min_time: float) -> Dict:
+    loops = 1
+    while _time_loops(fn, loops) < min_time:
+        loops *= 2
+    for _ in range(warmup):
+        _time_loops(fn, loops)
+
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        per_call = [_time_loops(fn, loops) / loops * 1e9 for _ in range(repeats)]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return {
+        "loops": loops,
+        "min_ns": min(per_call),
+        "median_ns": statistics.median(per_call),
+        "mean_ns": statistics.fmean(per_call),
+        "stdev_ns": statistics.stdev(per_call) if repeats > 1 else 0.0,
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    regressions = []
+    for name, row in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            print(f"  {name:<42} (new)")
+            continue
+        change = row["median_ns"] / old["median_ns"] - 1
+        flag = "  REGRESSION" if change > threshold else ""
+        print(
+            f"  {name:<42} {old['median_ns']:10.0f} -> {row['median_ns']:10.0f}ns "
+            f"({change:+.1%}){flag}"
+        )
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per repeat")
+    parser.add_argument("--filter", default="", help="only cases containing this")
+    parser.add_argument("--save", help="write results as a baseline JSON")
+    parser.add_argument("--compare", help="baseline JSON to check against")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args()
+
+    results = {}
+    for name, fn in build_cases():
+        if args.filter not in name:
+            continue
+        row = measure(fn, args.repeats, args.warmup, args.min_time)
+        results[name] = row
+        print(
+            f"{name:<44} median {row['median_ns']:10.0f}ns  "
+            f"min {row['min_ns']:10.0f}ns  "
+            f"±{row['stdev_ns'] / row['mean_ns']:5.1%}  ({row['loops']} loops)"
+        )
+
+    if args.save:
+        with open(args.save, "w") as fh:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "results": results,
+                },
+                fh,
+                indent=2,
+            )
+        print(f"Baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(results, json.load(fh), args.threshold)
+        if regressions:
+            print(f"Median regressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
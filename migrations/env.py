@@ -17,6 +17,10 @@ from app.db.session import Base
 from app.models.user import User
 from app.models.wallet import Wallet
 from app.models.blackjack_game import BlackjackGame
+from app.models.shoe import BlackjackShoe
+from app.models.wallet_transaction import WalletTransaction
+from app.models.idempotency_key import IdempotencyKey
+from app.models.player_stats import PlayerStats
 
 
 # Interpret the config file for Python logging.
@@ -0,0 +1,40 @@
+"""blackjack_shoe_model
+
+Revision ID: 5b1e9c07d2aa
+Revises: 86f129629e84
+Create Date: 2026-10-18 09:12:40.512307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e9c07d2aa'
+down_revision: Union[str, Sequence[str], None] = '86f129629e84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('blackjack_shoes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('decks', sa.Integer(), nullable=False),
+    sa.Column('cards', sa.LargeBinary(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('cut_index', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_index(op.f('ix_blackjack_shoes_id'), 'blackjack_shoes', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_blackjack_shoes_id'), table_name='blackjack_shoes')
+    op.drop_table('blackjack_shoes')
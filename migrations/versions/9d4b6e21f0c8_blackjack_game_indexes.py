@@ -0,0 +1,58 @@
+"""blackjack_game_indexes
+
+Partial unique index on the active game per user and a composite
+(user_id, id DESC) index for history. Built CONCURRENTLY on Postgres so the
+table stays writable; the unique index fails if a user already has more
+than one unfinished game, which has to be resolved first.
+
+Revision ID: 9d4b6e21f0c8
+Revises: c3a8f41d7e26
+Create Date: 2026-10-18 10:41:05.630714
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4b6e21f0c8'
+down_revision: Union[str, Sequence[str], None] = 'c3a8f41d7e26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_blackjack_games_active_user',
+            'blackjack_games',
+            ['user_id'],
+            unique=True,
+            postgresql_where=sa.text('is_over = false'),
+            sqlite_where=sa.text('is_over = 0'),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_blackjack_games_user_id_id_desc',
+            'blackjack_games',
+            ['user_id', sa.text('id DESC')],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_blackjack_games_user_id_id_desc',
+            table_name='blackjack_games',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'uq_blackjack_games_active_user',
+            table_name='blackjack_games',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,55 @@
+"""bet_minor_units
+
+Stores each game's bet as the integer minor units its ledger entry debited
+(bet_amount float -> bet_minor bigint), so payouts are computed from what
+was actually paid. Bets are converted from the float and then taken from
+the game's 'bet' ledger entry where there is one, which also corrects
+games whose bet had fractions of a cent.
+
+Revision ID: a9c2e7f41d38
+Revises: f1a7c3e5b902
+Create Date: 2026-10-18 22:41:09.518233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c2e7f41d38'
+down_revision: Union[str, Sequence[str], None] = 'f1a7c3e5b902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        'blackjack_games',
+        'bet_amount',
+        type_=sa.BigInteger(),
+        existing_type=sa.Float(),
+        existing_nullable=False,
+        postgresql_using='round(bet_amount * 100)::bigint',
+    )
+    op.alter_column('blackjack_games', 'bet_amount', new_column_name='bet_minor')
+    op.execute(
+        'UPDATE blackjack_games g SET bet_minor = -t.amount '
+        'FROM wallet_transactions t '
+        "WHERE t.game_id = g.id AND t.kind = 'bet' AND g.bet_minor <> -t.amount"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('blackjack_games', 'bet_minor', new_column_name='bet_amount')
+    op.alter_column(
+        'blackjack_games',
+        'bet_amount',
+        type_=sa.Float(),
+        existing_type=sa.BigInteger(),
+        existing_nullable=False,
+        postgresql_using='bet_amount / 100.0',
+    )
@@ -0,0 +1,139 @@
+"""compact_hand_storage
+
+Replaces the JSON player_hand/dealer_hand columns with one-byte-per-card
+binary columns plus persisted running scores and soft-ace counts.
+
+Revision ID: c3a8f41d7e26
+Revises: 5b1e9c07d2aa
+Create Date: 2026-10-18 10:03:27.118392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a8f41d7e26'
+down_revision: Union[str, Sequence[str], None] = '5b1e9c07d2aa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of the card encoding at the time of this migration
+CARDS = ["2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A"]
+VALUES = [2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11]
+CODES = {card: code for code, card in enumerate(CARDS)}
+BATCH_SIZE = 5000
+
+games = sa.table(
+    'blackjack_games',
+    sa.column('id', sa.Integer),
+    sa.column('player_hand', sa.JSON),
+    sa.column('dealer_hand', sa.JSON),
+    sa.column('player_cards', sa.LargeBinary),
+    sa.column('player_score', sa.SmallInteger),
+    sa.column('player_soft_aces', sa.SmallInteger),
+    sa.column('dealer_cards', sa.LargeBinary),
+    sa.column('dealer_score', sa.SmallInteger),
+    sa.column('dealer_soft_aces', sa.SmallInteger),
+)
+
+HAND_COLUMNS = [
+    'player_cards', 'player_score', 'player_soft_aces',
+    'dealer_cards', 'dealer_score', 'dealer_soft_aces',
+]
+
+
+def _score(codes):
+    score, soft = 0, 0
+    for code in codes:
+        score += VALUES[code]
+        if CARDS[code] == "A":
+            soft += 1
+        while score > 21 and soft:
+            score -= 10
+            soft -= 1
+    return score, soft
+
+
+def _batches(conn, *columns):
+    """Yields rows in id order, BATCH_SIZE at a time (keyset, not OFFSET)."""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(games.c.id, *columns)
+            .where(games.c.id > last_id)
+            .order_by(games.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('blackjack_games', sa.Column('player_cards', sa.LargeBinary(), nullable=True))
+    op.add_column('blackjack_games', sa.Column('player_score', sa.SmallInteger(), nullable=True))
+    op.add_column('blackjack_games', sa.Column('player_soft_aces', sa.SmallInteger(), nullable=True))
+    op.add_column('blackjack_games', sa.Column('dealer_cards', sa.LargeBinary(), nullable=True))
+    op.add_column('blackjack_games', sa.Column('dealer_score', sa.SmallInteger(), nullable=True))
+    op.add_column('blackjack_games', sa.Column('dealer_soft_aces', sa.SmallInteger(), nullable=True))
+
+    conn = op.get_bind()
+    update = (
+        games.update()
+        .where(games.c.id == sa.bindparam('_id'))
+        .values({name: sa.bindparam(name) for name in HAND_COLUMNS})
+    )
+    for rows in _batches(conn, games.c.player_hand, games.c.dealer_hand):
+        params = []
+        for row in rows:
+            player = [CODES[card] for card in row.player_hand or []]
+            dealer = [CODES[card] for card in row.dealer_hand or []]
+            p_score, p_soft = _score(player)
+            d_score, d_soft = _score(dealer)
+            params.append({
+                '_id': row.id,
+                'player_cards': bytes(player),
+                'player_score': p_score,
+                'player_soft_aces': p_soft,
+                'dealer_cards': bytes(dealer),
+                'dealer_score': d_score,
+                'dealer_soft_aces': d_soft,
+            })
+        conn.execute(update, params)
+
+    for name in HAND_COLUMNS:
+        op.alter_column('blackjack_games', name, nullable=False)
+    op.drop_column('blackjack_games', 'player_hand')
+    op.drop_column('blackjack_games', 'dealer_hand')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('blackjack_games', sa.Column('player_hand', sa.JSON(), nullable=True))
+    op.add_column('blackjack_games', sa.Column('dealer_hand', sa.JSON(), nullable=True))
+
+    conn = op.get_bind()
+    update = (
+        games.update()
+        .where(games.c.id == sa.bindparam('_id'))
+        .values(player_hand=sa.bindparam('player_hand'), dealer_hand=sa.bindparam('dealer_hand'))
+    )
+    for rows in _batches(conn, games.c.player_cards, games.c.dealer_cards):
+        conn.execute(update, [
+            {
+                '_id': row.id,
+                'player_hand': [CARDS[code] for code in row.player_cards or b""],
+                'dealer_hand': [CARDS[code] for code in row.dealer_cards or b""],
+            }
+            for row in rows
+        ])
+
+    op.alter_column('blackjack_games', 'player_hand', nullable=False)
+    op.alter_column('blackjack_games', 'dealer_hand', nullable=False)
+    for name in HAND_COLUMNS:
+        op.drop_column('blackjack_games', name)
@@ -0,0 +1,45 @@
+"""ledger_insert_time
+
+Stamps wallet_transactions.created_at with clock_timestamp() (the time of
+the INSERT) instead of now() (the start of the transaction), which the
+snapshot compactor relies on to tell committed entries from ones still in
+flight. Existing rows keep their timestamps.
+
+Revision ID: c6d1e8b3f925
+Revises: a9c2e7f41d38
+Create Date: 2026-10-18 23:52:17.330418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6d1e8b3f925'
+down_revision: Union[str, Sequence[str], None] = 'a9c2e7f41d38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        'wallet_transactions',
+        'created_at',
+        server_default=sa.text('clock_timestamp()'),
+        existing_type=sa.DateTime(timezone=True),
+        existing_nullable=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        'wallet_transactions',
+        'created_at',
+        server_default=sa.text('now()'),
+        existing_type=sa.DateTime(timezone=True),
+        existing_nullable=False,
+    )
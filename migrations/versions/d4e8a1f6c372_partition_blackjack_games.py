@@ -0,0 +1,174 @@
+"""partition_blackjack_games
+
+Rebuilds blackjack_games as a Postgres table range-partitioned by id, one
+partition per PARTITION_SIZE ids plus a DEFAULT catch-all, and adds
+created_at (backfilled from each game's first ledger entry) for archival.
+Games from before the ledger have no entry to date them; they get the Unix
+epoch so the first archive run moves them out.
+app.services.game_archive creates partitions ahead of the id sequence and
+drops the ones it has emptied.
+
+Partitioning costs two cross-table guarantees:
+- The partial unique index on the active game per user can't span
+  partitions; start_game now checks under the wallet row lock instead.
+- wallet_transactions.game_id loses its foreign key, since ledger entries
+  stay after their game is archived.
+
+The rows are copied under an exclusive lock, so run it in a maintenance
+window. Postgres only.
+
+Revision ID: d4e8a1f6c372
+Revises: b7c3d9e2a415
+Create Date: 2026-10-18 19:12:36.804117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e8a1f6c372'
+down_revision: Union[str, Sequence[str], None] = 'b7c3d9e2a415'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITION_SIZE = 1_000_000
+PARTITIONS_AHEAD = 2
+
+COLUMNS = (
+    'id, user_id, bet_amount, player_cards, player_score, player_soft_aces, '
+    'dealer_cards, dealer_score, dealer_soft_aces, status, is_over'
+)
+
+
+def _game_columns():
+    return [
+        sa.Column(
+            'id',
+            sa.Integer(),
+            server_default=sa.text("nextval('blackjack_games_id_seq')"),
+            nullable=False,
+        ),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('bet_amount', sa.Float(), nullable=False),
+        sa.Column('player_cards', sa.LargeBinary(), nullable=False),
+        sa.Column('player_score', sa.SmallInteger(), nullable=False),
+        sa.Column('player_soft_aces', sa.SmallInteger(), nullable=False),
+        sa.Column('dealer_cards', sa.LargeBinary(), nullable=False),
+        sa.Column('dealer_score', sa.SmallInteger(), nullable=False),
+        sa.Column('dealer_soft_aces', sa.SmallInteger(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('is_over', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    ]
+
+
+def _detach_old_table() -> None:
+    """Moves the current table aside, keeping the id sequence alive."""
+    op.execute('ALTER SEQUENCE blackjack_games_id_seq OWNED BY NONE')
+    op.execute('ALTER TABLE blackjack_games RENAME TO blackjack_games_old')
+    op.execute('ALTER INDEX blackjack_games_pkey RENAME TO blackjack_games_old_pkey')
+
+
+def _finish_swap() -> None:
+    op.execute('DROP TABLE blackjack_games_old')
+    op.execute('ALTER SEQUENCE blackjack_games_id_seq OWNED BY blackjack_games.id')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_constraint(
+        'wallet_transactions_game_id_fkey', 'wallet_transactions', type_='foreignkey'
+    )
+    op.drop_index('ix_blackjack_games_user_id_id_desc', table_name='blackjack_games')
+    op.drop_index('uq_blackjack_games_active_user', table_name='blackjack_games')
+    op.drop_index('ix_blackjack_games_id', table_name='blackjack_games')
+    _detach_old_table()
+
+    op.create_table(
+        'blackjack_games',
+        *_game_columns(),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        postgresql_partition_by='RANGE (id)',
+    )
+    last_id = op.get_bind().execute(
+        sa.text('SELECT last_value FROM blackjack_games_id_seq')
+    ).scalar()
+    upper = (last_id // PARTITION_SIZE + 1 + PARTITIONS_AHEAD) * PARTITION_SIZE
+    for start in range(0, upper, PARTITION_SIZE):
+        op.execute(
+            f'CREATE TABLE blackjack_games_p{start} PARTITION OF blackjack_games '
+            f'FOR VALUES FROM ({start}) TO ({start + PARTITION_SIZE})'
+        )
+    op.execute(
+        'CREATE TABLE blackjack_games_default PARTITION OF blackjack_games DEFAULT'
+    )
+
+    # A game's bet is its first ledger entry, so it dates the game. Undated
+    # (pre-ledger) games are older than any archive cutoff
+    op.execute(
+        f'INSERT INTO blackjack_games ({COLUMNS}, created_at) '
+        f'SELECT {", ".join("g." + c for c in COLUMNS.split(", "))}, '
+        "COALESCE(t.created_at, 'epoch'::timestamptz) "
+        'FROM blackjack_games_old g LEFT JOIN ('
+        'SELECT game_id, MIN(created_at) AS created_at FROM wallet_transactions '
+        'WHERE game_id IS NOT NULL GROUP BY game_id'
+        ') t ON t.game_id = g.id'
+    )
+    _finish_swap()
+
+    op.create_index('ix_blackjack_games_id', 'blackjack_games', ['id'], unique=False)
+    op.create_index(
+        'ix_blackjack_games_active_user',
+        'blackjack_games',
+        ['user_id'],
+        postgresql_where=sa.text('is_over = false'),
+    )
+    op.create_index(
+        'ix_blackjack_games_user_id_id_desc',
+        'blackjack_games',
+        ['user_id', sa.text('id DESC')],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_blackjack_games_user_id_id_desc', table_name='blackjack_games')
+    op.drop_index('ix_blackjack_games_active_user', table_name='blackjack_games')
+    op.drop_index('ix_blackjack_games_id', table_name='blackjack_games')
+    _detach_old_table()
+
+    op.create_table('blackjack_games', *_game_columns())
+    op.execute(
+        f'INSERT INTO blackjack_games ({COLUMNS}) '
+        f'SELECT {COLUMNS} FROM blackjack_games_old'
+    )
+    _finish_swap()
+
+    op.create_index('ix_blackjack_games_id', 'blackjack_games', ['id'], unique=False)
+    op.create_index(
+        'uq_blackjack_games_active_user',
+        'blackjack_games',
+        ['user_id'],
+        unique=True,
+        postgresql_where=sa.text('is_over = false'),
+    )
+    op.create_index(
+        'ix_blackjack_games_user_id_id_desc',
+        'blackjack_games',
+        ['user_id', sa.text('id DESC')],
+    )
+    # Archived games are gone, so existing ledger rows aren't checked
+    op.execute(
+        'ALTER TABLE wallet_transactions ADD CONSTRAINT '
+        'wallet_transactions_game_id_fkey FOREIGN KEY (game_id) '
+        'REFERENCES blackjack_games (id) NOT VALID'
+    )
@@ -0,0 +1,65 @@
+"""wallet_ledger
+
+Replaces the mutable wallets.balance float with an append-only
+wallet_transactions ledger in integer minor units plus a per-wallet
+snapshot. Existing balances become one 'migration' entry each.
+
+Revision ID: e5f2a8c41b90
+Revises: 9d4b6e21f0c8
+Create Date: 2026-10-18 13:41:09.220614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f2a8c41b90'
+down_revision: Union[str, Sequence[str], None] = '9d4b6e21f0c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MINOR_UNITS = 100
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('wallet_transactions',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.BigInteger(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('game_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['game_id'], ['blackjack_games.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_wallet_transactions_user_id_id', 'wallet_transactions', ['user_id', 'id'], unique=False)
+
+    op.add_column('wallets', sa.Column('snapshot_balance', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('wallets', sa.Column('snapshot_txn_id', sa.BigInteger(), server_default='0', nullable=False))
+
+    op.execute(
+        "INSERT INTO wallet_transactions (user_id, amount, kind) "
+        f"SELECT user_id, CAST(ROUND(CAST(balance AS NUMERIC) * {MINOR_UNITS}) AS BIGINT), 'migration' "
+        "FROM wallets WHERE balance IS NOT NULL AND balance <> 0"
+    )
+    op.drop_column('wallets', 'balance')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('wallets', sa.Column('balance', sa.Float(), nullable=True))
+    op.execute(
+        "UPDATE wallets SET balance = (snapshot_balance + COALESCE(("
+        "SELECT SUM(t.amount) FROM wallet_transactions t "
+        "WHERE t.user_id = wallets.user_id AND t.id > wallets.snapshot_txn_id"
+        f"), 0)) / {MINOR_UNITS}.0"
+    )
+    op.drop_column('wallets', 'snapshot_txn_id')
+    op.drop_column('wallets', 'snapshot_balance')
+    op.drop_index('ix_wallet_transactions_user_id_id', table_name='wallet_transactions')
+    op.drop_table('wallet_transactions')
@@ -0,0 +1,43 @@
+"""player_stats
+
+Per-player running totals, updated as hands settle. Existing history is
+loaded afterwards with `python -m app.services.player_stats`.
+
+Revision ID: f1a7c3e5b902
+Revises: d4e8a1f6c372
+Create Date: 2026-10-18 21:04:52.371960
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a7c3e5b902'
+down_revision: Union[str, Sequence[str], None] = 'd4e8a1f6c372'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('player_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('hands_played', sa.Integer(), nullable=False),
+    sa.Column('wins', sa.Integer(), nullable=False),
+    sa.Column('losses', sa.Integer(), nullable=False),
+    sa.Column('pushes', sa.Integer(), nullable=False),
+    sa.Column('blackjacks', sa.Integer(), nullable=False),
+    sa.Column('total_wagered', sa.BigInteger(), nullable=False),
+    sa.Column('net_result', sa.BigInteger(), nullable=False),
+    sa.Column('biggest_win', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('player_stats')
@@ -0,0 +1,82 @@
+"""
+The app reads its settings at import time, so the environment is set up
+here before anything under `app` is imported: a throwaway SQLite database,
+no rate limiting, and the background snapshot compactor pushed out of the
+way so it can't run statements mid-test.
+"""
+import os
+import tempfile
+
+_tmp_dir = tempfile.mkdtemp(prefix="casino-tests-")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir}/test.db"
+os.environ["DB_ASYNC_MODE"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["SHOE_DECKS"] = "0"
+os.environ["SETTLEMENT_GROUP_COMMIT"] = "false"
+os.environ["WALLET_SNAPSHOT_INTERVAL_SECONDS"] = "3600"
+
+from typing import Dict, List  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.db.session import Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import (  # noqa: E402,F401
+    blackjack_game,
+    idempotency_key,
+    player_stats,
+    shoe,
+    user,
+    wallet,
+)
+from app.services.blackjack_engine import BlackjackEngine  # noqa: E402
+
+
+class StackedDeck:
+    """RandomSource that deals the given ranks in order."""
+
+    def __init__(self, cards: List[str]):
+        self.codes = [BlackjackEngine.CARD_CODES[card] for card in cards]
+
+    def randbelow(self, n: int) -> int:
+        return self.codes.pop(0)
+
+
+@pytest.fixture(scope="session")
+def client():
+    Base.metadata.create_all(engine)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def auth_headers(client, request) -> Dict[str, str]:
+    r = client.post(
+        "/api/auth/register",
+        json={"username": f"user-{request.node.name}", "password": "password123"},
+    )
+    return {"Authorization": f"Bearer {r.json()['data']['access_token']}"}
+
+
+@pytest.fixture
+def stack_deck(monkeypatch):
+    def stack(*cards: str) -> None:
+        monkeypatch.setattr(BlackjackEngine, "rng", StackedDeck(list(cards)))
+
+    return stack
+
+
+@pytest.fixture
+def sql_statements():
+    """Every statement sent to the primary while the test runs."""
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
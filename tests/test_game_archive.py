@@ -0,0 +1,179 @@
+"""
+Finished games older than the cutoff move to gzipped NDJSON files. A run
+that crashes between writing the files and deleting the rows is simply
+rerun, so readers must count each archived game once.
+"""
+import json
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.blackjack_game import BlackjackGame
+from app.models.user import User
+from app.repositories.blackjack_repository import BlackjackRepository
+from app.repositories.player_stats_repository import PlayerStatsRepository
+from app.services import player_stats
+from app.services.game_archive import (
+    GameArchiver,
+    archive_files,
+    read_archive,
+    user_shard,
+)
+from app.services.player_stats import PlayerStatsBackfill
+
+GAMES = 6
+
+
+@pytest.fixture
+def old_games(client, auth_headers, request):
+    """Plays GAMES finished hands dated in 2020; returns (user_id, game ids)."""
+    for _ in range(GAMES):
+        r = client.post(
+            "/api/blackjack/start", json={"bet_amount": 1}, headers=auth_headers
+        )
+        game = r.json()["data"]
+        if not game["is_over"]:
+            client.post(f"/api/blackjack/{game['game_id']}/stand", headers=auth_headers)
+    with SessionLocal() as db:
+        user_id = db.scalar(
+            select(User.id).where(User.username == f"user-{request.node.name}")
+        )
+        db.execute(
+            text(
+                "UPDATE blackjack_games SET created_at = "
+                "'2020-01-0' || (id % 3 + 1) || ' 10:00:00' WHERE user_id = :user_id"
+            ),
+            {"user_id": user_id},
+        )
+        db.commit()
+        game_ids = db.scalars(
+            select(BlackjackGame.id)
+            .where(BlackjackGame.user_id == user_id)
+            .order_by(BlackjackGame.id)
+        ).all()
+    assert len(game_ids) == GAMES
+    return user_id, game_ids
+
+
+def _crash(self, ids):
+    raise RuntimeError("crashed before the delete")
+
+
+def _archive(archive_dir, crash: bool = False) -> int:
+    """One archiver run; with `crash`, it dies after writing, before deleting."""
+    archiver = GameArchiver(str(archive_dir), 30, 4, 1000)
+    if not crash:
+        return archiver.archive()
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(BlackjackRepository, "delete_many", _crash)
+        with pytest.raises(RuntimeError):
+            archiver.archive()
+    return 0
+
+
+def _live_ids(user_id):
+    with SessionLocal() as db:
+        return db.scalars(
+            select(BlackjackGame.id).where(BlackjackGame.user_id == user_id)
+        ).all()
+
+
+def test_archive_round_trip(old_games, tmp_path):
+    user_id, game_ids = old_games
+
+    assert _archive(tmp_path) == GAMES
+
+    assert _live_ids(user_id) == []
+    records = list(read_archive(str(tmp_path), user_id))
+    assert sorted(r["game_id"] for r in records) == game_ids
+    assert {r["user_id"] for r in records} == {user_id}
+    assert all(r["is_over"] for r in records)
+    # One file per day, in the user's shard
+    files = archive_files(str(tmp_path), user_shard(user_id))
+    assert len(files) == 3
+    assert list(read_archive(str(tmp_path), user_id + 1)) == []
+
+
+def test_rerun_after_a_crash_reads_each_game_once(old_games, tmp_path):
+    user_id, game_ids = old_games
+
+    _archive(tmp_path, crash=True)
+    # The crashed run wrote the records but left the rows live
+    assert sorted(_live_ids(user_id)) == game_ids
+    assert _archive(tmp_path) == GAMES
+
+    records = list(read_archive(str(tmp_path), user_id))
+    assert sorted(r["game_id"] for r in records) == game_ids
+    assert len(list(read_archive(str(tmp_path)))) == GAMES
+
+
+def _exported_ids(client, headers):
+    r = client.get(
+        "/api/blackjack/history/export?include_archived=true", headers=headers
+    )
+    assert r.status_code == 200
+    return [json.loads(line)["game_id"] for line in r.text.splitlines()]
+
+
+def test_export_sends_each_game_once(
+    client, auth_headers, old_games, tmp_path, monkeypatch
+):
+    user_id, game_ids = old_games
+    monkeypatch.setattr(settings, "GAME_ARCHIVE_DIR", str(tmp_path))
+
+    # Archived and still live
+    _archive(tmp_path, crash=True)
+    assert sorted(_exported_ids(client, auth_headers)) == game_ids
+
+    # Archived twice
+    _archive(tmp_path)
+    assert sorted(_exported_ids(client, auth_headers)) == game_ids
+
+
+def _rebuilt_stats(client, headers, archive_dir=None):
+    PlayerStatsBackfill(100, archive_dir and str(archive_dir)).run()
+    return client.get("/api/blackjack/stats", headers=headers).json()["data"]
+
+
+def test_stats_backfill_counts_each_game_once(
+    client, auth_headers, old_games, tmp_path
+):
+    live = client.get("/api/blackjack/stats", headers=auth_headers).json()["data"]
+    assert live["hands_played"] == GAMES
+
+    _archive(tmp_path, crash=True)
+    assert _rebuilt_stats(client, auth_headers, tmp_path) == live
+    _archive(tmp_path)
+    assert _rebuilt_stats(client, auth_headers, tmp_path) == live
+    # Without the archive only live games are left to count
+    assert _rebuilt_stats(client, auth_headers)["hands_played"] == 0
+
+
+def test_stats_backfill_retries_locked_players(
+    client, auth_headers, old_games, monkeypatch
+):
+    live = client.get("/api/blackjack/stats", headers=auth_headers).json()["data"]
+    user_id, _ = old_games
+    lock_player = PlayerStatsRepository.lock_player
+    attempts = []
+
+    def busy_once(self, locked_id):
+        if locked_id == user_id:
+            attempts.append(locked_id)
+            if len(attempts) == 1:
+                raise OperationalError("SELECT ... NOWAIT", {}, Exception("locked"))
+        lock_player(self, locked_id)
+
+    monkeypatch.setattr(PlayerStatsRepository, "lock_player", busy_once)
+    monkeypatch.setattr(player_stats, "RETRY_DELAYS", (0,))
+    with SessionLocal() as db:
+        db.execute(
+            text("DELETE FROM player_stats WHERE user_id = :id"), {"id": user_id}
+        )
+        db.commit()
+
+    assert _rebuilt_stats(client, auth_headers) == live
+    assert len(attempts) == 2
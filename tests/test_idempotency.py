@@ -0,0 +1,108 @@
+"""
+A retry with the same Idempotency-Key gets the first response back without
+running again; reusing the key for a different request is refused.
+"""
+import asyncio
+
+import pytest
+
+from app.services.idempotency import (
+    DatabaseIdempotencyStore,
+    IdempotencyError,
+    InMemoryIdempotencyStore,
+    StoredResponse,
+)
+
+
+def _deposit(client, headers, key, amount=5):
+    return client.post(
+        "/api/wallet/deposit",
+        json={"amount": amount},
+        headers={**headers, "Idempotency-Key": key},
+    )
+
+
+def test_retry_is_replayed_once(client, auth_headers):
+    first = _deposit(client, auth_headers, "deposit-1")
+    retry = _deposit(client, auth_headers, "deposit-1")
+
+    assert first.status_code == retry.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.content == first.content
+    balance = client.get("/api/wallet/me", headers=auth_headers).json()["data"]
+    assert balance["balance"] == first.json()["data"]["balance"]
+
+
+def test_key_reused_for_another_body_is_422(client, auth_headers):
+    assert _deposit(client, auth_headers, "deposit-2", 5).status_code == 200
+
+    r = _deposit(client, auth_headers, "deposit-2", 6)
+
+    assert r.status_code == 422
+    assert "different request" in r.json()["detail"]
+
+
+def test_key_reused_for_another_path_is_422(client, auth_headers, stack_deck):
+    # Player 5 6 hits a 2; dealer 10 7
+    stack_deck("5", "6", "10", "7", "2")
+    r = client.post(
+        "/api/blackjack/start", json={"bet_amount": 1}, headers=auth_headers
+    )
+    game_id = r.json()["data"]["game_id"]
+    headers = {**auth_headers, "Idempotency-Key": "move-1"}
+    r = client.post(f"/api/blackjack/{game_id}/hit", headers=headers)
+    assert r.status_code == 200
+
+    r = client.post(f"/api/blackjack/{game_id}/stand", headers=headers)
+
+    assert r.status_code == 422
+    assert "different request" in r.json()["detail"]
+
+
+def test_keys_are_per_user(client, auth_headers):
+    r = client.post(
+        "/api/auth/register", json={"username": "other-user", "password": "password123"}
+    )
+    other = {"Authorization": f"Bearer {r.json()['data']['access_token']}"}
+
+    assert _deposit(client, auth_headers, "shared").status_code == 200
+    r = _deposit(client, other, "shared")
+
+    assert r.status_code == 200
+    assert "idempotent-replayed" not in r.headers
+
+
+@pytest.fixture(params=["memory", "database"])
+def store(client, request):
+    if request.param == "memory":
+        return InMemoryIdempotencyStore(maxsize=10, ttl=60, wait=0.1)
+    return DatabaseIdempotencyStore(ttl=60, wait=0.1, poll_interval=0.01)
+
+
+def test_store_replays_and_checks_fingerprints(store):
+    response = StoredResponse(200, "application/json", b'{"ok":true}')
+
+    async def scenario():
+        assert await store.begin(1, "k", "fp") is None
+        # A duplicate while the first is running waits, then gives up
+        with pytest.raises(IdempotencyError) as running:
+            await store.begin(1, "k", "fp")
+        assert running.value.status_code == 409
+
+        await store.complete(1, "k", response)
+        assert await store.begin(1, "k", "fp") == response
+        with pytest.raises(IdempotencyError) as mismatch:
+            await store.begin(1, "k", "other-fp")
+        assert mismatch.value.status_code == 422
+
+    asyncio.run(scenario())
+
+
+def test_store_abandoned_key_can_be_claimed_again(store):
+    async def scenario():
+        assert await store.begin(1, "abandoned", "fp") is None
+        await store.abandon(1, "abandoned")
+        assert await store.begin(1, "abandoned", "fp") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,49 @@
+"""
+Money is validated to whole cents on the way in and kept in integer minor
+units, so amounts that float arithmetic gets wrong still add up exactly.
+"""
+import pytest
+from pydantic import TypeAdapter, ValidationError
+
+from app.core.money import Amount, from_minor, scale_minor, to_minor
+
+amount = TypeAdapter(Amount)
+
+
+@pytest.mark.parametrize(
+    "value, minor", [(10, 1000), (0.1, 10), (0.29, 29), (1.15, 115), (19.99, 1999)]
+)
+def test_to_minor_is_exact(value, minor):
+    assert to_minor(value) == minor
+    assert from_minor(minor) == value
+
+
+@pytest.mark.parametrize("value", [0.005, 1.001, float("nan"), float("inf")])
+def test_amount_rejects_fractions_of_a_cent(value):
+    with pytest.raises(ValidationError):
+        amount.validate_python(value)
+
+
+def test_scale_minor_rounds_down():
+    # 3:2 blackjack on 0.15 is 0.375; the half cent is not paid out
+    assert scale_minor(15, 2.5) == 37
+    assert scale_minor(1000, 2.5) == 2500
+    assert scale_minor(999, 0) == 0
+
+
+def test_deposits_add_up_in_cents(client, auth_headers):
+    before = client.get("/api/wallet/me", headers=auth_headers).json()["data"]
+    for _ in range(3):
+        r = client.post(
+            "/api/wallet/deposit", json={"amount": 0.1}, headers=auth_headers
+        )
+        assert r.status_code == 200
+
+    after = r.json()["data"]
+    assert to_minor(after["balance"]) == to_minor(before["balance"]) + 30
+
+
+def test_deposit_of_a_fraction_of_a_cent_is_422(client, auth_headers):
+    r = client.post("/api/wallet/deposit", json={"amount": 0.005}, headers=auth_headers)
+
+    assert r.status_code == 422
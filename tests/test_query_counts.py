@@ -0,0 +1,62 @@
+"""
+Statements per request on the hot endpoints, with the principal cache warm
+and the infinite deck. A change here is a change to the request's DB round
+trips, so update the numbers deliberately.
+"""
+import pytest
+
+
+@pytest.fixture
+def warm_headers(client, auth_headers):
+    # First authenticated request fills the principal cache
+    client.get("/api/wallet/me", headers=auth_headers)
+    return auth_headers
+
+
+def _kinds(statements):
+    return [" ".join(s.split()[:3]) for s in statements]
+
+
+def test_wallet_me_is_one_select(client, warm_headers, sql_statements):
+    r = client.get("/api/wallet/me", headers=warm_headers)
+
+    assert r.status_code == 200
+    # Snapshot balance plus the ledger tail, in one statement
+    assert len(sql_statements) == 1, _kinds(sql_statements)
+
+
+def test_deposit(client, warm_headers, sql_statements):
+    r = client.post("/api/wallet/deposit", json={"amount": 5}, headers=warm_headers)
+
+    assert r.status_code == 200
+    # Ledger INSERT, then the balance read for the response
+    assert len(sql_statements) == 2, _kinds(sql_statements)
+
+
+def test_game_flow(client, warm_headers, stack_deck, sql_statements):
+    # Player 5 6, dealer 10 7 (stands), player hits a 9 and wins on 20
+    stack_deck("5", "6", "10", "7", "9")
+
+    r = client.post(
+        "/api/blackjack/start", json={"bet_amount": 10}, headers=warm_headers
+    )
+    assert r.status_code == 200
+    # Balance read under the wallet lock, active-game check, game INSERT,
+    # bet ledger INSERT
+    assert len(sql_statements) == 4, _kinds(sql_statements)
+    game_id = r.json()["data"]["game_id"]
+
+    sql_statements.clear()
+    r = client.post(f"/api/blackjack/{game_id}/hit", headers=warm_headers)
+    assert r.status_code == 200
+    assert r.json()["data"]["player_score"] == 20
+    # Playable-game SELECT ... FOR UPDATE, game UPDATE
+    assert len(sql_statements) == 2, _kinds(sql_statements)
+
+    sql_statements.clear()
+    r = client.post(f"/api/blackjack/{game_id}/stand", headers=warm_headers)
+    assert r.status_code == 200
+    assert r.json()["data"]["status"] == "player_win"
+    # Playable-game SELECT ... FOR UPDATE, player_stats upsert, game UPDATE,
+    # payout ledger INSERT
+    assert len(sql_statements) == 4, _kinds(sql_statements)
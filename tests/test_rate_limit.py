@@ -0,0 +1,139 @@
+"""
+Admission control: token buckets refill at `rate` up to `burst`, and a
+request or WebSocket action over the limit is refused with a wait to retry
+after. The suite runs with RATE_LIMIT_ENABLED off, so the middleware is
+wrapped around the app here with small limits.
+"""
+import asyncio
+import json
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import rate_limit
+from app.core.rate_limit import (
+    ConcurrencyLimiter,
+    InMemoryRateLimitBackend,
+    Limit,
+    SQLiteRateLimitBackend,
+)
+from app.endpoints.rate_limit import RateLimitMiddleware
+from app.main import app
+
+LIMIT = Limit(rate=2.0, burst=3, concurrency=0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    monkeypatch.setattr(rate_limit.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryRateLimitBackend(max_keys=100)
+    return SQLiteRateLimitBackend(str(tmp_path / "buckets.db"), max_keys=100)
+
+
+def test_bucket_allows_a_burst_then_refills(backend, clock):
+    assert [backend.take_now("k", LIMIT) for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Empty: one token is half a second away at 2 per second
+    assert backend.take_now("k", LIMIT) == pytest.approx(0.5)
+    assert backend.take_now("other", LIMIT) == 0.0
+
+    clock.now += 0.5
+    assert backend.take_now("k", LIMIT) == 0.0
+    assert backend.take_now("k", LIMIT) > 0
+
+    # Idle for long, the bucket holds `burst` tokens again, no more
+    clock.now += 60
+    assert [backend.take_now("k", LIMIT) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert backend.take_now("k", LIMIT) > 0
+
+
+def test_sqlite_backend_fails_open_when_locked(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    backend = SQLiteRateLimitBackend(path, max_keys=100)
+    for _ in range(LIMIT.burst):
+        backend.take_now("k", LIMIT)
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    errors = rate_limit.BACKEND_ERRORS.collect()
+    try:
+        # The bucket is empty, but the lookup times out and lets it through
+        assert asyncio.run(backend.take("k", LIMIT)) == 0.0
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+    assert rate_limit.BACKEND_ERRORS.collect() != errors
+
+
+def test_concurrency_cap():
+    limiter = ConcurrencyLimiter()
+    limit = Limit(rate=0, burst=0, concurrency=2)
+
+    assert limiter.try_acquire("wallet", limit)
+    assert limiter.try_acquire("wallet", limit)
+    assert not limiter.try_acquire("wallet", limit)
+    limiter.release("wallet")
+    assert limiter.try_acquire("wallet", limit)
+
+
+@pytest.fixture
+def limited(client):
+    """The app behind a limiter allowing a burst of 2 per group, barely refilling."""
+    limit = Limit(rate=0.01, burst=2, concurrency=5)
+    middleware = RateLimitMiddleware(
+        app,
+        backend=InMemoryRateLimitBackend(max_keys=100),
+        limits={"auth": limit, "wallet": limit, "blackjack": limit},
+    )
+    return TestClient(middleware), middleware
+
+
+def test_request_over_the_limit_is_429(limited, auth_headers):
+    limited_client, middleware = limited
+
+    statuses = [
+        limited_client.get("/api/wallet/me", headers=auth_headers).status_code
+        for _ in range(3)
+    ]
+
+    assert statuses == [200, 200, 429]
+    r = limited_client.get("/api/wallet/me", headers=auth_headers)
+    assert r.json()["detail"] == "Too many requests, slow down"
+    # 1 token at 0.01 per second
+    assert 90 <= int(r.headers["Retry-After"]) <= 100
+    # Other groups have their own buckets; slots were all given back
+    r = limited_client.get("/api/blackjack/stats", headers=auth_headers)
+    assert r.status_code == 200
+    assert middleware.concurrency.in_flight == {"wallet": 0, "blackjack": 0}
+
+
+def test_ws_action_over_the_limit_is_a_429_frame(limited, auth_headers):
+    limited_client, middleware = limited
+    token = auth_headers["Authorization"].split()[1]
+
+    # The handshake takes the first token
+    with limited_client.websocket_connect(f"/api/blackjack/ws?token={token}") as ws:
+        replies = []
+        for i in range(2):
+            ws.send_text(json.dumps({"op": "get", "game_id": 0, "id": i}))
+            replies.append(json.loads(ws.receive_text()))
+
+    assert replies[0]["status"] == 404
+    assert replies[1]["status"] == 429
+    assert replies[1]["retry_after"] > 0
+    assert middleware.concurrency.in_flight == {"blackjack": 0}
@@ -0,0 +1,92 @@
+"""
+Balances are the wallet snapshot plus the ledger tail after it; the
+compactor only moves entries from the tail into the snapshot, so a balance
+reads the same before and after it runs.
+"""
+import pytest
+from sqlalchemy import func, select, text
+
+from app.db.session import SessionLocal
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.models.wallet_transaction import WalletTransaction
+from app.services.wallet_snapshots import WalletSnapshotCompactor
+
+
+@pytest.fixture
+def wallet(client, auth_headers, request):
+    """Reads (wallet row, (last ledger id, ledger sum)) for the test user."""
+
+    def read():
+        with SessionLocal() as db:
+            user_id = db.scalar(
+                select(User.id).where(User.username == f"user-{request.node.name}")
+            )
+            row = db.scalars(select(Wallet).where(Wallet.user_id == user_id)).one()
+            ledger = select(
+                func.max(WalletTransaction.id), func.sum(WalletTransaction.amount)
+            ).where(WalletTransaction.user_id == user_id)
+            return row, db.execute(ledger).one()
+
+    return read
+
+
+def _balance(client, headers) -> float:
+    return client.get("/api/wallet/me", headers=headers).json()["data"]["balance"]
+
+
+def _age_ledger(seconds: int) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            text("UPDATE wallet_transactions SET created_at = datetime('now', :age)"),
+            {"age": f"-{seconds} seconds"},
+        )
+        db.commit()
+
+
+def test_compaction_keeps_the_balance(client, auth_headers, wallet):
+    for amount in (5, 0.25, 100):
+        client.post(
+            "/api/wallet/deposit", json={"amount": amount}, headers=auth_headers
+        )
+    before = _balance(client, auth_headers)
+    _age_ledger(3600)
+
+    # One entry per batch, so the watermark walks the ledger batch by batch
+    assert WalletSnapshotCompactor(0, lag=60, batch_size=1).compact_once() > 0
+
+    row, (last_id, total) = wallet()
+    assert row.snapshot_txn_id >= last_id
+    assert row.snapshot_balance == total
+    assert _balance(client, auth_headers) == before
+
+    r = client.post("/api/wallet/deposit", json={"amount": 1}, headers=auth_headers)
+    assert r.json()["data"]["balance"] == before + 1
+
+
+def test_recent_entries_stay_in_the_tail(client, auth_headers, wallet):
+    _age_ledger(3600)
+    WalletSnapshotCompactor(0, lag=60, batch_size=100).compact_once()
+    client.post("/api/wallet/deposit", json={"amount": 7}, headers=auth_headers)
+    before = _balance(client, auth_headers)
+
+    WalletSnapshotCompactor(0, lag=60, batch_size=100).compact_once()
+
+    row, (last_id, total) = wallet()
+    assert row.snapshot_txn_id < last_id
+    assert row.snapshot_balance == total - 700
+    assert _balance(client, auth_headers) == before
+
+
+def test_bet_beyond_the_balance_is_rejected(client, auth_headers, wallet):
+    balance = _balance(client, auth_headers)
+    _, (last_id, _) = wallet()
+
+    r = client.post(
+        "/api/blackjack/start", json={"bet_amount": balance + 1}, headers=auth_headers
+    )
+
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Insufficient funds"
+    assert wallet()[1][0] == last_id
+    assert _balance(client, auth_headers) == balance